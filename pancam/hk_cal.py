@@ -16,32 +16,45 @@ from pathlib import Path
 import logging
 
 import pancam_fns
+import manifest
+import session
 
 logger = logging.getLogger(__name__)
 status = logging.getLogger('status')
 
 
-def cal_HK(proc_dir):
+def cal_HK(proc_dir, sess=None):
     """Reads processed telemetery and outputs calibrated pandas pickle file.
 
     Arguments:
         proc_dir {pathlib.dir()} -- Folder containing processed TM pickle file.
 
+    Keyword Arguments:
+        sess {Session} -- session holding the RAW TM and keeping the
+                          calibrated table. (default: {None})
+
     Generates:
-        Cal_HKTM.pickle -- A pandas pickle file containing calibrated values.
+        Cal_HKTM.cols -- A columnar directory containing calibrated values.
 
     """
 
     logger.info("Calibrating TM HK Files")
 
     # Search for PanCam Processed Files
-    pik_file = pancam_fns.Find_Files(proc_dir, "*RAW_HKTM.pickle")
-    if not pik_file:
+    sess = session.Session.use(proc_dir, sess)
+    pik_file = sess.find('RAW_HKTM')
+    if pik_file is None:
         logger.warning("No files found - ABORTING")
         return
 
-    # Read RAW TM pickle file
-    raw = pd.read_pickle(pik_file[0])
+    cal_manifest = manifest.Manifest(proc_dir, "hk_cal")
+    if (pik_file.exists()) and cal_manifest.up_to_date([pik_file]):
+        logger.info("Calibrated TM up to date - skipping")
+        return
+
+    # Read RAW TM columns needed for calibration
+    raw = sess.get('RAW_HKTM', ['DT', 'Volt_Ref', 'Volt_6V0', 'Volt_1V5', 'Temp_LFW', 'Temp_RFW',
+                                                'Temp_HRC', 'Temp_LWAC', 'Temp_RWAC', 'Temp_LDO', 'Temp_HRCA'])
     ctm = pd.DataFrame()
     ctm['DT'] = raw['DT'].copy()
 
@@ -66,12 +79,14 @@ def cal_HK(proc_dir):
     ctm['Temp_LDO'] = raw['Temp_LDO'] * cal_a[5] / raw['Volt_Ref'] + cal_b[5]
     ctm['Temp_HRCA'] = raw['Temp_HRCA'] * cal_a[6] / raw['Volt_Ref'] + cal_b[6]
 
-    write_file = proc_dir / "Cal_HKTM.pickle"
-    pancam_fns.exist_unlink(write_file)
+    sess.put('Cal_HKTM', ctm, proc_dir / "Cal_HKTM.cols")
+    logger.info("PanCam Cal HK TM written.")
 
-    with open(write_file, 'w'):
-        ctm.to_pickle(write_file)
-        logger.info("PanCam Cal HK TM pickled.")
+    # The manifest fingerprints the RAW TM on disk
+    sess.save(['RAW_HKTM'])
+    cal_manifest.clear()
+    cal_manifest.record(pik_file, [proc_dir / "Cal_HKTM.cols"])
+    cal_manifest.save()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,337 @@
+# -*- coding: utf-8 -*-
+"""ICD parameter tables for the PanCam HK and H+S packets.
+
+Each parameter is described once by its bit position and the packet variant
+it belongs to. The tables are compiled into decode plans that are cached per
+packet length, so hk_raw.py and hs.py extract every column in a single pass
+over the packed packets and only select rows by variant afterwards.
+
+Variants used:
+    HDR -- TM block header, all packets
+    HK -- Essential HK, all packets
+    NE -- Non-Essential HK only (TM_Type_ID == 1)
+    WAC / WAC_IA / WAC_HK / WAC_DT / WAC_NK -- WAC responses by WAC_CID
+    HRC / HRC_HK / HRC_RB1 ... HRC_RES -- HRC responses by HRC_ACK
+    HS -- H+S packet, offset by the spacewire header if present
+
+:copyright: (c) 2020 by Barry J Whiteside. Mullard Space Science Laboratory - UCL
+
+:license: GPLv3, see LICENSE for more details.
+"""
+
+from collections import namedtuple
+from functools import lru_cache
+
+import pancam_fns
+
+Param = namedtuple('Param', ['name', 'icd', 'Len', 'OffBy', 'OffBi', 'variant'])
+
+# Fields that are reserved or markers and only checked against an expected
+# value. action is 'error' to log the message or 'raise' to abort the decode,
+# note is logged as a warning before the message if given.
+Reserved = namedtuple('Reserved', ['name', 'icd', 'Len', 'OffBy', 'OffBi',
+                                   'variant', 'expect', 'action', 'msg', 'note'])
+
+# Packet lengths in bytes for the Essential and Non-Essential HK
+HK_LEN = {'ES': 72, 'NE': 88}
+
+# Sub-variants of a camera response and the value that selects them
+WAC_CID_VARIANTS = {0: 'WAC_IA', 1: 'WAC_HK', 2: 'WAC_DT', 3: 'WAC_NK'}
+HRC_ACK_VARIANTS = {0x02: 'HRC_HK', 0x0C: 'HRC_RB1', 0x0D: 'HRC_RB2',
+                    0x10: 'HRC_RB3', 0x0E: 'HRC_RB4', 0xB5: 'HRC_MD'}
+
+# Parameters listed in the column order of RAW_HKTM
+HK_PARAMS = (
+    # Byte 0-10 TM Block Header
+    Param('Block_Type', None, 'u1', 0, 0, 'HDR'),
+    Param('TM_Criticality', None, 'u2', 0, 1, 'HDR'),
+    Param('MMS_Dest', None, 'u1', 0, 3, 'HDR'),
+    Param('Instr_ID', None, 'u4', 0, 4, 'HDR'),
+    Param('TM_Type_ID', None, 'u6', 0, 8, 'HDR'),
+    Param('Seq_Flag', None, 'u2', 0, 14, 'HDR'),
+    Param('Pkt_CUC', None, 'u48', 0, 16, 'HDR'),
+    Param('Data_Len', None, 'u24', 0, 64, 'HDR'),
+
+    # Byte 12-17 Voltages
+    Param('Volt_Ref', 'PAN_TM_PIU_HK_REFV', 'u16', 12, 0, 'HK'),
+    Param('Volt_6V0', 'PAN_TM_PIU_HK_6V0', 'u16', 14, 0, 'HK'),
+    Param('Volt_1V5', 'PAN_TM_PIU_HK_1V5', 'u16', 16, 0, 'HK'),
+
+    # Byte 18-31 Temperatures
+    Param('Temp_LFW', 'PAN_TM_PIU_HK_LFWT', 'u16', 18, 0, 'HK'),
+    Param('Temp_RFW', 'PAN_TM_PIU_HK_RFWT', 'u16', 20, 0, 'HK'),
+    Param('Temp_HRC', 'PAN_TM_PIU_HK_HRCT', 'u16', 22, 0, 'HK'),
+    Param('Temp_LWAC', 'PAN_TM_PIU_HK_LWACT', 'u16', 24, 0, 'HK'),
+    Param('Temp_RWAC', 'PAN_TM_PIU_HK_RWACT', 'u16', 26, 0, 'HK'),
+    Param('Temp_LDO', 'PAN_TM_PIU_HK_LDOT', 'u16', 28, 0, 'HK'),
+    Param('Temp_HRCA', 'PAN_TM_PIU_HK_HRCAT', 'u16', 30, 0, 'HK'),
+
+    # Byte 38-39 PIU Htr Status
+    Param('Stat_Temp_On', 'PAN_TM_PIU_HK_TCS_STAT', 'u1', 38, 0, 'HK'),
+    Param('Stat_Temp_Mo', 'PAN_TM_PIU_HK_TCS_MODE', 'u1', 38, 1, 'HK'),
+    Param('Stat_Temp_He', 'PAN_TM_PIU_HK_TCS_HEAT', 'u2', 38, 2, 'HK'),
+    Param('Stat_Temp_Se', 'PAN_TM_PIU_HK_TCS_SET', 'u12', 38, 4, 'HK'),
+
+    # Byte 32-37 Error Codes
+    Param('ERR_1_CMD', 'PAN_TM_PIU_HK_ERR1', 'u8', 32, 0, 'HK'),
+    Param('ERR_1_FW', 'PAN_TM_PIU_HK_ERR1', 'u8', 33, 0, 'HK'),
+    Param('ERR_2_LWAC', 'PAN_TM_PIU_HK_ERR2', 'u8', 34, 0, 'HK'),
+    Param('ERR_2_RWAC', 'PAN_TM_PIU_HK_ERR2', 'u8', 35, 0, 'HK'),
+    Param('ERR_3_HRC', 'PAN_TM_PIU_HK_ERR3', 'u8', 36, 0, 'HK'),
+
+    # Byte 40-41 PIU FW Status
+    Param('Stat_FWL_Op', 'PAN_TM_PIU_HK_FWS_LOP', 'u1', 40, 1, 'HK'),
+    Param('Stat_FWL_Ho', 'PAN_TM_PIU_HK_FWS_LHM', 'u1', 40, 2, 'HK'),
+    Param('Stat_FWL_Id', 'PAN_TM_PIU_HK_FWS_LIDX', 'u1', 40, 3, 'HK'),
+    Param('Stat_FWL_Po', 'PAN_TM_PIU_HK_FWS_LFN', 'u4', 40, 4, 'HK'),
+    Param('Stat_FWR_Op', 'PAN_TM_PIU_HK_FWS_ROP', 'u1', 41, 1, 'HK'),
+    Param('Stat_FWR_Ho', 'PAN_TM_PIU_HK_FWS_RHM', 'u1', 41, 2, 'HK'),
+    Param('Stat_FWR_Id', 'PAN_TM_PIU_HK_FWS_RIDX', 'u1', 41, 3, 'HK'),
+    Param('Stat_FWR_Po', 'PAN_TM_PIU_HK_FWS_RFN', 'u4', 41, 4, 'HK'),
+
+    # Byte 64-71 Filter Wheel
+    Param('FWL_ABS', 'PAN_TM_PIU_HK_LFWAS', 'u16', 64, 0, 'HK'),
+    Param('FWR_ABS', 'PAN_TM_PIU_HK_RFWAS', 'u16', 66, 0, 'HK'),
+    Param('FWL_REL', 'PAN_TM_PIU_HK_LFWRS', 'u16', 68, 0, 'HK'),
+    Param('FWR_REL', 'PAN_TM_PIU_HK_RFWRS', 'u16', 70, 0, 'HK'),
+
+    # Byte 42-43 PIU Cam Status
+    Param('Stat_PIU_En', 'PAN_TM_PIU_HK_PCS_CE', 'u8', 42, 0, 'HK'),
+    Param('Stat_PIU_Pw', 'PAN_TM_PIU_HK_PCS_PSS', 'u8', 43, 0, 'HK'),
+
+    # Byte 72-77 Image ID from PAN_TM_PIU_HKN_IID[1:3]
+    Param('IMG_SOL', 'PAN_TM_PIU_HKN_SIID_SOL', 'u12', 72, 0, 'NE'),
+    Param('IMG_Task_ID', 'PAN_TM_PIU_HKN_SIID_TID', 'u7', 73, 4, 'NE'),
+    Param('IMG_Task_RNO', 'PAN_TM_PIU_HKN_SIID_TRN', 'u7', 74, 3, 'NE'),
+    Param('IMG_Cam', 'PAN_TM_PIU_HKN_SIID_PC', 'u2', 75, 2, 'NE'),
+    Param('IMG_FW', 'PAN_TM_PIU_HKN_SIID_FW', 'u4', 75, 4, 'NE'),
+    Param('IMG_No', 'PAN_TM_PIU_HKN_SIID_IN', 'u8', 76, 0, 'NE'),
+
+    # Byte 78-79 PIU Version
+    Param('PIU_Ver', 'PAN_TM_PIU_HKN_VER', 'u16', 78, 0, 'NE'),
+
+    # Byte 80-87 FW Config from PAN_TM_PIU_HKN_FWMS and PAN_TM_PIU_HKN_SLF
+    Param('FWL_RTi', 'PAN_TM_PIU_HKN_FWMS', 'u8', 80, 0, 'NE'),
+    Param('FWL_Spe', 'PAN_TM_PIU_HKN_FWMS', 'u4', 81, 0, 'NE'),
+    Param('FWR_Spe', 'PAN_TM_PIU_HKN_FWMS', 'u4', 81, 4, 'NE'),
+    Param('FWL_Cur', 'PAN_TM_PIU_HKN_LFWCS', 'u16', 82, 0, 'NE'),
+    Param('FWR_Cur', 'PAN_TM_PIU_HKN_RFWCS', 'u16', 84, 0, 'NE'),
+    Param('FWR_RTi', 'PAN_TM_PIU_HKN_FWMS', 'u8', 86, 0, 'NE'),
+    Param('FWL_StL', 'PAN_TM_PIU_HKN_SLF', 'u4', 87, 0, 'NE'),
+    Param('FWR_StR', 'PAN_TM_PIU_HKN_SLF', 'u4', 87, 4, 'NE'),
+
+    # Byte 44-63 Camera Responses, common to all WAC responses
+    Param('WAC_CID', 'PAN_TM_WAC_XX_CID', 'u2', 44, 0, 'WAC'),
+    Param('WAC_WID', 'PAN_TM_WAC_XX_WID', 'u3', 44, 5, 'WAC'),
+    Param('WAC_WTS', 'PAN_TM_WAC_XX_WTS', 'u48', 51, 0, 'WAC'),
+    Param('WAC_SUM', 'PAN_TM_WAC_XX_SUM', 'u8', 59, 0, 'WAC'),
+
+    # WAC IA
+    Param('WAC_IAS', 'PAN_TM_WAC_IA_IAS', 'u2', 44, 3, 'WAC_IA'),
+
+    # WAC HK
+    Param('WAC_HK_MCK', 'PAN_TM_WAC_HK_MS', 'u2', 44, 3, 'WAC_HK'),
+    Param('WAC_HK_TAT', 'PAN_TM_WAC_HK_TAT', 'u48', 45, 0, 'WAC_HK'),
+    Param('WAC_HK_LTP', 'PAN_TM_WAC_HK_TP', 'u12', 57, 0, 'WAC_HK'),
+    Param('WAC_HK_INH', 'PAN_TM_WAC_HK_INH', 'u1', 58, 4, 'WAC_HK'),
+    Param('WAC_HK_IAO', 'PAN_TM_WAC_HK_IAO', 'u1', 58, 5, 'WAC_HK'),
+    Param('WAC_HK_TAO', 'PAN_TM_WAC_HK_TAO', 'u1', 58, 6, 'WAC_HK'),
+    Param('WAC_HK_MCO', 'PAN_TM_WAC_HK_MCO', 'u1', 58, 7, 'WAC_HK'),
+
+    # WAC DT
+    Param('WAC_DT_BIN', 'PAN_TM_WAC_DT_BIN', 'u2', 44, 3, 'WAC_DT'),
+    Param('WAC_DT_ITS', 'PAN_TM_WAC_DT_ITS', 'u48', 45, 0, 'WAC_DT'),
+    Param('WAC_DT_INT', 'PAN_TM_WAC_DT_IT', 'u20', 57, 0, 'WAC_DT'),
+    Param('WAC_DT_STP', 'PAN_TM_WAC_DT_STP', 'u12', 59, 4, 'WAC_DT'),
+    Param('WAC_DT_INH', 'PAN_TM_WAC_DT_INH', 'u1', 61, 0, 'WAC_DT'),
+    Param('WAC_DT_AE', 'PAN_TM_WAC_DT_AE', 'u1', 61, 1, 'WAC_DT'),
+    Param('WAC_DT_PAD', 'PAN_TM_WAC_DT_PAD', 'u1', 61, 2, 'WAC_DT'),
+    Param('WAC_DT_GAS', 'PAN_TM_WAC_DT_GAS', 'u2', 61, 3, 'WAC_DT'),
+    Param('WAC_DT_DD', 'PAN_TM_WAC_DT_DD', 'u1', 61, 5, 'WAC_DT'),
+    Param('WAC_DT_AES', 'PAN_TM_WAC_DT_AESF', 'u1', 61, 6, 'WAC_DT'),
+    Param('WAC_DT_CRC', 'PAN_TM_WAC_DT_CRC', 'u16', 62, 0, 'WAC_DT'),
+
+    # WAC NAK
+    Param('WAC_NK_ERR', 'PAN_TM_WAC_NK_ERR', 'u8', 45, 0, 'WAC_NK'),
+
+    # Common to all HRC responses
+    Param('HRC_ACK', 'PAN_TM_HRC_XX_CA', 'u8', 51, 0, 'HRC'),
+
+    # HRC HK
+    Param('HRC_CS', 'PAN_TM_HRC_HK_CS', 'u16', 44, 0, 'HRC_HK'),
+    Param('HRC_TP', 'PAN_TM_HRC_HK_TP', 'u10', 46, 0, 'HRC_HK'),
+    Param('HRC_ENC', 'PAN_TM_HRC_HK_ENC', 'u10', 47, 2, 'HRC_HK'),
+    Param('HRC_EPF', 'PAN_TM_HRC_HK_EP', 'u1', 48, 4, 'HRC_HK'),
+    Param('HRC_AIF', 'PAN_TM_HRC_HK_AI', 'u1', 48, 5, 'HRC_HK'),
+    Param('HRC_AFF', 'PAN_TM_HRC_HK_AF', 'u1', 48, 6, 'HRC_HK'),
+    Param('HRC_MMF', 'PAN_TM_HRC_HK_MM', 'u1', 48, 7, 'HRC_HK'),
+    Param('HRC_IFC', 'PAN_TM_HRC_HK_IFC', 'u8', 49, 0, 'HRC_HK'),
+    Param('HRC_GA', 'PAN_TM_HRC_HK_GA', 'u2', 50, 0, 'HRC_HK'),
+    Param('HRC_ESF', 'PAN_TM_HRC_HK_ES', 'u1', 50, 2, 'HRC_HK'),
+    Param('HRC_EIF', 'PAN_TM_HRC_HK_EI', 'u1', 50, 3, 'HRC_HK'),
+    Param('HRC_ERR_EN', 'PAN_TM_HRC_HK_ERENC', 'u1', 50, 5, 'HRC_HK'),
+    Param('HRC_ERR_AI', 'PAN_TM_HRC_HK_ERAI', 'u1', 50, 6, 'HRC_HK'),
+    Param('HRC_ERR_AF', 'PAN_TM_HRC_HK_ERAF', 'u1', 50, 7, 'HRC_HK'),
+
+    # HRC RB1
+    Param('HRC_R1_MS', 'PAN_TM_HRC_RB1_MS', 'u16', 44, 0, 'HRC_RB1'),
+    Param('HRC_R1_MAI', 'PAN_TM_HRC_RB1_MAI', 'u16', 46, 0, 'HRC_RB1'),
+    Param('HRC_R1_MII', 'PAN_TM_HRC_RB1_MII', 'u16', 48, 0, 'HRC_RB1'),
+    Param('HRC_R1_FDV', 'PAN_TM_HRC_RB1_FDV', 'u3', 50, 0, 'HRC_RB1'),
+    Param('HRC_R1_CMV', 'PAN_TM_HRC_RB1_CMV', 'u5', 50, 3, 'HRC_RB1'),
+
+    # HRC RB2
+    Param('HRC_R2_INT', 'PAN_TM_HRC_RB2_IT', 'u20', 44, 4, 'HRC_RB2'),
+    Param('HRC_R2_FXC', 'PAN_TM_HRC_RB2_FXC', 'u10', 47, 0, 'HRC_RB2'),
+    Param('HRC_R2_FYC', 'PAN_TM_HRC_RB2_FYC', 'u10', 48, 2, 'HRC_RB2'),
+    Param('HRC_R2_SFS', 'PAN_TM_HRC_RB2_SFS', 'u1', 49, 5, 'HRC_RB2'),
+    Param('HRC_R2_FWZ', 'PAN_TM_HRC_RB2_FWZ', 'u2', 49, 6, 'HRC_RB2'),
+
+    # HRC RB3
+    Param('HRC_R3_LRS', 'PAN_TM_HRC_RB3_LRS', 'u10', 44, 6, 'HRC_RB3'),
+    Param('HRC_R3_DPN', 'PAN_TM_HRC_RB3_DPN', 'u16', 46, 0, 'HRC_RB3'),
+    Param('HRC_R3_TOL', 'PAN_TM_HRC_RB3_TOL', 'u8', 48, 0, 'HRC_RB3'),
+    Param('HRC_R3_MSC', 'PAN_TM_HRC_RB3_MSC', 's16', 49, 0, 'HRC_RB3'),
+
+    # HRC RB4
+    Param('HRC_R4_CRC', 'PAN_TM_HRC_RB4_CRC', 'u16', 44, 0, 'HRC_RB4'),
+    Param('HRC_R4_SHR', 'PAN_TM_HRC_RB4_SHR', 'u16', 46, 0, 'HRC_RB4'),
+    Param('HRC_R4_AIT1', 'PAN_TM_HRC_RB4_AIT1', 'u10', 48, 0, 'HRC_RB4'),
+    Param('HRC_R4_AIT2', 'PAN_TM_HRC_RB4_AIT2', 'u10', 49, 2, 'HRC_RB4'),
+    Param('HRC_R4_AIT3', 'PAN_TM_HRC_RB4_AIT3', 'u1', 50, 4, 'HRC_RB4'),
+    Param('HRC_R4_AIT4', 'PAN_TM_HRC_RB4_AIT4', 'u1', 50, 5, 'HRC_RB4'),
+    Param('HRC_R4_AIT5', 'PAN_TM_HRC_RB4_AIT5', 'u1', 50, 6, 'HRC_RB4'),
+    Param('HRC_R4_AIT6', 'PAN_TM_HRC_RB4_AIT6', 'u1', 50, 7, 'HRC_RB4'),
+
+    # HRC MetaData in HK
+    Param('HRC_MD_STP', 'PAN_TM_HRC_HMD_STP', 'u10', 44, 0, 'HRC_MD'),
+    Param('HRC_MD_INT', 'PAN_TM_HRC_HMD_IT', 'u20', 45, 4, 'HRC_MD'),
+    Param('HRC_MD_FXC', 'PAN_TM_HRC_HMD_FXC', 'u10', 48, 0, 'HRC_MD'),
+    Param('HRC_MD_FYC', 'PAN_TM_HRC_HMD_FYC', 'u10', 49, 2, 'HRC_MD'),
+    Param('HRC_MD_SFS', 'PAN_TM_HRC_HMD_SFS', 'u1', 50, 5, 'HRC_MD'),
+    Param('HRC_MD_FWZ', 'PAN_TM_HRC_HMD_FWZ', 'u2', 50, 6, 'HRC_MD'),
+
+    # Command Response Packet, any HRC response not matched above
+    Param('HRC_Res_CA', 'PAN_TM_HRC_RES_CA1', 'u8', 44, 0, 'HRC_RES'),
+)
+
+HK_RESERVED = (
+    Reserved('HDR_RES', 'PAN_TM_PIU_HK_RES', 'u8', 11, 0, 'HDR', 0,
+             'error', "TM Byte 11 not 0", None),
+    Reserved('ERR_RES', 'PAN_TM_PIU_HK_ERR3', 'u8', 37, 0, 'HK', 0,
+             'error', "TM HK Byte 37 not 0", None),
+    # Reserved('FWS_LRES', 'PAN_TM_PIU_HK_FWS_LRES', 'u1', 40, 0, 'HK', 0,
+    #          'raise', "TM Byte 40 bit 0 not 0", None),
+    Reserved('FWS_RRES', 'PAN_TM_PIU_HK_FWS_RRES', 'u1', 41, 0, 'HK', 0,
+             'raise', "TM Byte 41 bit 0 not 0", None),
+    Reserved('SIID_RES', 'PAN_TM_PIU_HKN_SIID_RES', 'u1', 77, 0, 'NE', 0,
+             'raise', "TM Byte 77 not 0", None),
+
+    Reserved('WAC_MK', 'PAN_TM_WAC_XX_MK', 'u1', 44, 2, 'WAC', 1,
+             'raise', "TM Byte 44 bit 2 not 0 for WAC",
+             "Warning likely mixed WAC and HRC Cam responses."),
+    Reserved('WAC_IA_RES1', 'PAN_TM_WAC_IA_RES1', 'u48', 45, 0, 'WAC_IA', 0,
+             'raise', "TM Bytes 45-50 not 0 for WAC IA", None),
+    Reserved('WAC_IA_RES2', 'PAN_TM_WAC_IA_RES2', 'u16', 57, 0, 'WAC_IA', 0,
+             'raise', "TM Bytes 57-58 not 0 for WAC IA", None),
+    Reserved('WAC_IA_RES3', 'PAN_TM_WAC_IA_RES3', 'u32', 60, 0, 'WAC_IA', 0,
+             'raise', "TM Bytes 60-63 not 0 for WAC IA", None),
+    Reserved('WAC_HK_RES', 'PAN_TM_WAC_HK_RES', 'u32', 60, 0, 'WAC_HK', 0,
+             'raise', "TM Bytes 60-63 not 0 for WAC HK", None),
+    Reserved('WAC_DT_RES', 'PAN_TM_WAC_DT_RES', 'u1', 61, 7, 'WAC_DT', 0,
+             'raise', "TM Byte 71 bit 7 not 0 for WAC DT", None),
+    Reserved('WAC_NK_RES1', 'PAN_TM_WAC_NK_RES1', 'u2', 44, 3, 'WAC_NK', 0,
+             'raise', "TM Byte 44 bits 3-4 not 0 for WAC NAK", None),
+    Reserved('WAC_NK_RES2', 'PAN_TM_WAC_NK_RES2', 'u40', 46, 0, 'WAC_NK', 0,
+             'raise', "TM Bytes 46-50 not 0 for WAC NAK", None),
+    Reserved('WAC_NK_RES3', 'PAN_TM_WAC_NK_RES3', 'u16', 57, 0, 'WAC_NK', 0,
+             'raise', "TM Bytes 57-58 not 0 for WAC NAK", None),
+    Reserved('WAC_NK_RES4', 'PAN_TM_WAC_NK_RES4', 'u32', 60, 0, 'WAC_NK', 0,
+             'raise', "TM Bytes 60-63 not 0 for WAC NAK", None),
+
+    # Bytes 52-63 are reserved for every HRC response
+    Reserved('HRC_RES_52', 'PAN_TM_HRC_XX_RES', 'u32', 52, 0, 'HRC', 0,
+             'error', "TM Bytes 52-63 not 0 for HRC HK", None),
+    Reserved('HRC_RES_56', 'PAN_TM_HRC_XX_RES', 'u32', 56, 0, 'HRC', 0,
+             'error', "TM Bytes 52-63 not 0 for HRC HK", None),
+    Reserved('HRC_RES_60', 'PAN_TM_HRC_XX_RES', 'u32', 60, 0, 'HRC', 0,
+             'error', "TM Bytes 52-63 not 0 for HRC HK", None),
+    # Reserved('HRC_HK_RES2', 'PAN_TM_HRC_HK_RES2', 'u1', 50, 4, 'HRC_HK', 0,
+    #          'raise', "TM Byte 50 bit 4 not 0 for HRC HK", None),
+    Reserved('HRC_RB2_RES1', 'PAN_TM_HRC_RB2_RES1', 'u4', 44, 0, 'HRC_RB2', 0,
+             'raise', "TM Byte 44 bits 0-4 not 0 for HRC RB2", None),
+    Reserved('HRC_RB2_RES2', 'PAN_TM_HRC_RB2_RES2', 'u1', 49, 4, 'HRC_RB2', 0,
+             'raise', "TM Byte 49 bit 4 not 0 for HRC RB2", None),
+    Reserved('HRC_RB2_RES3', 'PAN_TM_HRC_RB2_RES3', 'u8', 50, 0, 'HRC_RB2', 0,
+             'raise', "TM Byte 50 not 0 for HRC RB2", None),
+    Reserved('HRC_RB3_RES1', 'PAN_TM_HRC_RB3_RES1', 'u6', 44, 0, 'HRC_RB3', 0,
+             'raise', "TM Byte 44 bits 0-5 not 0 for HRC RB3", None),
+    Reserved('HRC_MD_RES1', 'PAN_TM_HRC_HMD_RES1', 'u2', 45, 2, 'HRC_MD', 0,
+             'raise', "TM Byte 44 bits 2-3 not 0 for HRC MetaData", None),
+    Reserved('HRC_MD_RES2', 'PAN_TM_HRC_HMD_RES2', 'u1', 50, 4, 'HRC_MD', 0,
+             'raise', "TM Byte 50 bit 4 not 0 for HRC MetaData", None),
+    Reserved('HRC_RES_RES1', 'PAN_TM_HRC_RES_RES1', 'u48', 45, 0, 'HRC_RES', 0,
+             'raise', "TM Bytes 45-50 not 0 for HRC CMD Response",
+             "Likely mixed WAC and HRC Cam responses."),
+)
+
+HS_PARAMS = (
+    Param('HK_Addr', None, 'u32', 0, 0, 'HS'),
+    Param('HK_Len', None, 'u16', 4, 0, 'HS'),
+    Param('HK_Cnt', None, 'u16', 6, 0, 'HS'),
+    Param('Sci_Addr', None, 'u32', 8, 0, 'HS'),
+    Param('Sci_Len', None, 'u24', 12, 0, 'HS'),
+    Param('LDT', None, 'u8', 15, 0, 'HS'),
+    Param('Sci_Cnt', None, 'u16', 16, 0, 'HS'),
+)
+
+TABLES = {'HK': HK_PARAMS + HK_RESERVED, 'HS': HS_PARAMS}
+
+
+def fits(entry, packet_len, offset=0):
+    """Returns True if the parameter lies within a packet of packet_len bytes."""
+
+    end_bit = 8 * (entry.OffBy + offset) + entry.OffBi + int(entry.Len[1:])
+    return end_bit <= 8 * packet_len
+
+
+@lru_cache(maxsize=None)
+def decoder(table, packet_len, offset=0):
+    """Compiles and caches the decode plan of a table for a packet length.
+
+    Parameters beyond packet_len are left out, so a matrix holding only
+    Essential HK is decoded without the Non-Essential parameters.
+
+    Arguments:
+        table {str} -- 'HK' or 'HS', key of TABLES.
+        packet_len {int} -- width of the packed packet matrix in bytes.
+
+    Keyword Arguments:
+        offset {int} -- bytes added to every offset, e.g. the spacewire
+                        header. (default: {0})
+
+    Returns:
+        tuple -- plan for pancam_fns.decode_fields keyed by parameter name.
+    """
+
+    return pancam_fns.compile_fields(
+        [(entry.name, entry.Len, entry.OffBy + offset, entry.OffBi)
+         for entry in TABLES[table] if fits(entry, packet_len, offset)])
+
+
+def decode(table, bin, offset=0):
+    """Decodes every parameter of a table that fits the packed packets.
+
+    Arguments:
+        table {str} -- 'HK' or 'HS', key of TABLES.
+        bin {pancam_fns.BinMatrix} -- the packed packets.
+
+    Keyword Arguments:
+        offset {int} -- bytes added to every offset. (default: {0})
+
+    Returns:
+        dict -- int64 array of each parameter keyed by name.
+    """
+
+    plan = decoder(table, bin.data.shape[1], offset)
+    return pancam_fns.decode_fields(bin.data, plan)
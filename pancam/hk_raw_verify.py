@@ -33,11 +33,11 @@ def blanks(rtm, bin):
 
     Arguments:
         rtm {pd.DataFrame} -- raw unprocessed HK tm
-        bin {bytes} -- raw HK tm data
+        bin {pancam_fns.BinMatrix} -- raw HK tm data
 
     Returns:
         pd.DataFrame -- with removed blank entries
-        bytes -- with removed blank entries
+        pancam_fns.BinMatrix -- with removed blank entries
     """
 
     verify = pd.DataFrame()
@@ -46,7 +46,7 @@ def blanks(rtm, bin):
     logger.info("Verifying no blank HK lines")
 
     # Check for blank entries in bin
-    verify['Blank'] = bin.apply(len) == 0
+    verify['Blank'] = bin.len_series() == 0
     err_df = rtm[verify['Blank']]
     if not err_df.empty:
         logging.error("Blank HK Entry Detected")
@@ -59,7 +59,6 @@ def hkheader(tm, bin):
     """Ensures the HK TM header is the correct format. 
 
     Performs checks on the following:
-        - Byte 11 is empty
         - Block type is always 0 for TM
         - Instr. ID is always 5 for PanCam
         - TM Type is always 0 or 1
@@ -68,11 +67,11 @@ def hkheader(tm, bin):
 
     Arguments:
         tm {pd.DataFrame} -- decoded tm header.
-        bin {bytes} -- raw HK tm data
+        bin {pancam_fns.BinMatrix} -- raw HK tm data
 
     Returns:
         pd.DataFrame -- with removed entries that do not match expected
-        bytes -- with removed entries that do not match expected
+        pancam_fns.BinMatrix -- with removed entries that do not match expected
     """
 
     verify = pd.DataFrame()
@@ -80,10 +79,6 @@ def hkheader(tm, bin):
 
     logger.info("Verifying HK RAW TM Header")
 
-    # Byte 11 - PAN_TM_PIU_HKN_RES and PAN_TM_PIU_HK_RES
-    if True in (PandUPF(bin, 'u8', 11, 0) != 0).unique():
-        logger.error("TM Byte 11 not 0")
-
     # Check that the block type is always 0 for TM
     verify['Block_Type'] = tm['Block_Type'] != 0
     err_df = tm[verify['Block_Type']]
@@ -105,7 +100,7 @@ def hkheader(tm, bin):
         verify = verify.drop(err_df.index)
 
     # Check that the data length matches that in binary
-    verify['Data_Len'] = (bin.apply(len)-11) != tm['Data_Len']
+    verify['Data_Len'] = (bin.len_series()-11) != tm['Data_Len']
     err_df = tm[verify['Data_Len']]
     if not err_df.empty:
         logging.error(
@@ -165,11 +160,11 @@ def hkne(tm, bin):
 
     Arguments:
         tm {pd.DataFrame} -- decoded tm header.
-        bin {bytes} -- raw HK tm data
+        bin {pancam_fns.BinMatrix} -- raw HK tm data
 
     Returns:
         pd.DataFrame -- same as input with nothing removed (placeholder)
-        bytes -- same as input with nothing removed, (placeholder)
+        pancam_fns.BinMatrix -- same as input with nothing removed, (placeholder)
     """
 
     allowed_PIU_Ver = [288, np.nan]
@@ -203,7 +198,7 @@ def gen_wac_crc_tab():
     """Generates a CRC lookup table using the WAC algorithm.
 
     Returns:
-        bytes -- A lookup table with the 256 entries for the WAC algorithm.
+        np.ndarray -- uint8 lookup table with the 256 entries for the WAC algorithm.
     """
 
     poly = 0x4D
@@ -220,14 +215,14 @@ def gen_wac_crc_tab():
             crc &= 0xFF
 
         table.append(crc)
-    return table
+    return np.array(table, dtype=np.uint8)
 
 
 def calc_wac_crc(crc_tab, bin_data):
     """Calculates the CRC of the bin_data using the WAC algorithm
 
     Arguments:
-        crc_tab {bytes} -- Precomputed CRC lookup table for WAC algorithm
+        crc_tab {np.ndarray} -- Precomputed CRC lookup table for WAC algorithm
         bin_data {bytes} -- Data CRC is to be calculated
 
     Returns:
@@ -242,7 +237,37 @@ def calc_wac_crc(crc_tab, bin_data):
     for inbyte in bin_data:
         incr = crc_tab[incr ^ inbyte]
 
-    return incr
+    return int(incr)
+
+
+def calc_wac_crc_rows(crc_tab, bin_data, skip_dt=True):
+    """Calculates the CRC of every row of bin_data using the WAC algorithm
+
+    Each table lookup step is applied to a whole column of the matrix, so
+    the number of Python level steps is the row length not the row count.
+
+    Arguments:
+        crc_tab {np.ndarray} -- Precomputed CRC lookup table for WAC algorithm
+        bin_data {np.ndarray} -- (N, data_len) uint8 matrix, one row per CRC
+
+    Keyword Arguments:
+        skip_dt {bool} -- Set the CRC of WAC DT responses to 0x0, as for
+                          calc_wac_crc. False for other data such as image
+                          payloads. (default: {True})
+
+    Returns:
+        np.ndarray -- uint8 CRC of each row.
+    """
+
+    crc = np.full(bin_data.shape[0], 0xFF, dtype=np.uint8)
+
+    for col in range(bin_data.shape[1]):
+        crc = crc_tab[crc ^ bin_data[:, col]]
+
+    if skip_dt and bin_data.shape[1]:
+        crc[(bin_data[:, 0] & 0xC0) == 0x80] = 0x00
+
+    return crc
 
 
 def wac(tm, wacbin):
@@ -255,11 +280,11 @@ def wac(tm, wacbin):
 
     Arguments:
         tm {pd.DataFrame} -- decoded tm header.
-        wacbin {bytes} -- raw HK tm data containing just wac rows
+        wacbin {pancam_fns.BinMatrix} -- raw HK tm data containing just wac rows
 
     Returns:
         pd.DataFrame -- same as input with nothing removed (placeholder)
-        bytes -- same as input with nothing removed, (placeholder)
+        pancam_fns.BinMatrix -- same as input with nothing removed, (placeholder)
     """
 
     logger.info("Verifying WAC Contents")
@@ -276,7 +301,7 @@ def wac(tm, wacbin):
 
     # Memory check if HK request sent
     if 1 in tm['WAC_CID'].values:
-        mc = tm['WAC_HK_MCK']
+        mc = tm['WAC_HK_MCK'].dropna()
         if 1 in mc.values:
             logging.error("Memory check performed and successful")
         if 2 in mc.values:
@@ -286,7 +311,8 @@ def wac(tm, wacbin):
 
     # Response CRC
     crc_tab = gen_wac_crc_tab()
-    verify['CRC'] = wacbin.apply(lambda x: calc_wac_crc(crc_tab, x[44:60]))
+    verify['CRC'] = pd.Series(
+        calc_wac_crc_rows(crc_tab, wacbin.data[:, 44:60]), index=wacbin.index)
     err_df = wacbin[verify['CRC'] != 0]
     if not err_df.empty:
         logging.error("WAC response CRC mismatch!")
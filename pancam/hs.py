@@ -10,18 +10,18 @@ Created 14 Feb 2020
 """
 
 from pathlib import Path
-from bitstruct import unpack_from as upf
 import pandas as pd
 import logging
 
 import pancam_fns
-from pancam_fns import PandUPF
+import hk_params
+import session
 
 logger = logging.getLogger(__name__)
 status = logging.getLogger('status')
 
 
-def decode(proc_dir, spw_header=False):
+def decode(proc_dir, spw_header=False, sess=None):
     """Searches the proc_dir for hs_raw.pickle and decodes PanCam parameters generating a new pickle file
 
     Arguments:
@@ -29,6 +29,8 @@ def decode(proc_dir, spw_header=False):
 
     Keyword Arguments:
         spw_header {bool} -- Set to true if RAW data includes spacewire header. (default: {False})
+        sess {Session} -- session the decoded table is kept in, written
+                          immediately if None. (default: {None})
 
     Generates:
         hs.pickle -- H+S pandas dataframe with decoding parameters columns and raw.
@@ -38,9 +40,8 @@ def decode(proc_dir, spw_header=False):
     logger.info("Searching for hs_raw.pickle file")
     hs_file = pancam_fns.Find_Files(
         proc_dir, "hs_raw.pickle", SingleFile=True)[0]
-    hs = pd.read_pickle(hs_file)
-
-    raw = hs['RAW'].apply(lambda x: bytearray.fromhex(x))
+    # Packed once so each field is extracted across all rows at once
+    hs, raw = pancam_fns.read_unproc(hs_file)
 
     if spw_header:
         spw_offset = 12
@@ -50,22 +51,19 @@ def decode(proc_dir, spw_header=False):
         spw_offset = 0
 
     # HS Decode
-    hs['HK_Addr'] = PandUPF(raw, 'u32',  0+spw_offset, 0)
-    hs['HK_Len'] = PandUPF(raw, 'u16',  4+spw_offset, 0)
-    hs['HK_Cnt'] = PandUPF(raw, 'u16',  6+spw_offset, 0)
-    hs['Sci_Addr'] = PandUPF(raw, 'u32',  8+spw_offset, 0)
-    hs['Sci_Len'] = PandUPF(raw, 'u24', 12+spw_offset, 0)
-    hs['LDT'] = PandUPF(raw, 'u8', 15+spw_offset, 0)
-    hs['Sci_Cnt'] = PandUPF(raw, 'u16', 16+spw_offset, 0)
+    decoded = hk_params.decode('HS', raw, spw_offset)
+    for param in hk_params.HS_PARAMS:
+        hs[param.name] = pd.Series(
+            decoded[param.name], index=raw.index).astype('Int64')
 
     logger.info("Writing H+S decoded to pickle file")
-    hs.to_pickle(proc_dir / "hs.pickle")
+    session.Session.use(proc_dir, sess).put('hs', hs, proc_dir / "hs.pickle")
     logger.info("PanCam H+S decoded pickled.")
 
     logger.info("--Parsing HS decode completed.")
 
 
-def verify(proc_dir):
+def verify(proc_dir, sess=None):
     """Finds the decoded HS.pickle and runs the following checks on the data:
         - HK Address is constant
         - HK Length is a valid value
@@ -77,6 +75,9 @@ def verify(proc_dir):
 
     Arguments:
         proc_dir {Path} -- Folder path to the hs.pickle file
+
+    Keyword Arguments:
+        sess {Session} -- session holding the decoded hs. (default: {None})
     """
 
     # Constants
@@ -89,8 +90,10 @@ def verify(proc_dir):
     logger.info("Running H+S verify")
 
     logger.info("Searching for hs.pickle file")
-    hs_file = pancam_fns.Find_Files(proc_dir, "hs.pickle", SingleFile=True)[0]
-    hs = pd.read_pickle(hs_file)
+    hs = session.Session.use(proc_dir, sess).get('hs', filt="hs.pickle")
+    if hs is None:
+        logger.error("No hs.pickle found - ABORTING")
+        return
 
     verify = pd.DataFrame()
     err_df = pd.DataFrame()
@@ -160,20 +163,25 @@ def verify(proc_dir):
     logger.info("--HS Verify Completed.")
 
 
-def sci_cnt(proc_dir):
+def sci_cnt(proc_dir, sess=None):
     """Calculates the number of science images generated as reported in HS
 
     Arguments:
         proc_dir {Path} -- Folder path to the hs.pickle file
 
+    Keyword Arguments:
+        sess {Session} -- session holding the decoded hs. (default: {None})
+
     Returns:
         int -- The image count
     """
 
     logger.info("Generating expected number of science images from HS")
     logger.info("Searching for hs.pickle file")
-    hs_file = pancam_fns.Find_Files(proc_dir, "hs.pickle", SingleFile=True)[0]
-    hs = pd.read_pickle(hs_file)
+    hs = session.Session.use(proc_dir, sess).get('hs', filt="hs.pickle")
+    if hs is None:
+        logger.error("No hs.pickle found - ABORTING")
+        return 0
 
     # First find last count entry
     img_cnt = hs['Sci_Cnt'].iloc[-1]
@@ -186,12 +194,15 @@ def sci_cnt(proc_dir):
     return img_cnt
 
 
-def all_default_image_dim(proc_dir):
+def all_default_image_dim(proc_dir, sess=None):
     """Returns false if any entries in hs Sci_Len not 0 or default size.
 
     Arguments:
         proc_dir {Path} -- Folder path to the hs.pickle file
 
+    Keyword Arguments:
+        sess {Session} -- session holding the decoded hs. (default: {None})
+
     Returns:
         bool -- False if any enties are not 0 or 2,097,200 bytes.
     """
@@ -201,8 +212,10 @@ def all_default_image_dim(proc_dir):
 
     logger.info("Verifying all science images are default dimensions")
     logger.info("Searching for hs.pickle file")
-    hs_file = pancam_fns.Find_Files(proc_dir, "hs.pickle", SingleFile=True)[0]
-    hs = pd.read_pickle(hs_file)
+    hs = session.Session.use(proc_dir, sess).get('hs', filt="hs.pickle")
+    if hs is None:
+        logger.error("No hs.pickle found - ABORTING")
+        return True
 
     verify = pd.DataFrame()
     verify['Sci_Len'] = ~hs['Sci_Len'].isin(NORM_BYTE_LENS)
@@ -17,6 +17,8 @@ import colour
 import pandas as pd
 
 import pancam_fns
+import manifest
+import session
 from image_hdr_raw import decodeRAW_ImgHDR
 
 logger = logging.getLogger(__name__)
@@ -28,7 +30,7 @@ class ImgRawBrError(Exception):
     pass
 
 
-def Img_RAW_Browse(PROC_DIR, source, model=None, ptu_exists=False):
+def Img_RAW_Browse(PROC_DIR, source, model=None, ptu_exists=False, sess=None):
 
     # Constants
     BIN_RES = [1024, 512, 256, 128]
@@ -36,7 +38,7 @@ def Img_RAW_Browse(PROC_DIR, source, model=None, ptu_exists=False):
     logger.info("Generating Image Browse Products from RAW Images")
 
     # Search for pci_raw files in the process directory
-    RAW_FILES = pancam_fns.Find_Files(PROC_DIR, r"IMG_RAW\*.pci_raw")
+    RAW_FILES = pancam_fns.Find_Files(PROC_DIR, "IMG_RAW/*.pci_raw")
     if not RAW_FILES:
         logger.warning("No files found - ABORTING")
         return
@@ -44,19 +46,40 @@ def Img_RAW_Browse(PROC_DIR, source, model=None, ptu_exists=False):
     # Load ptu data
     if ptu_exists:
 
-        pan_pik_file = pancam_fns.Find_Files(proc_dir, "ptu_pan.pickle", SingleFile=True)
-        tilt_pik_file = pancam_fns.Find_Files(proc_dir, "ptu_tilt.pickle", SingleFile=True)
+        sess = session.Session.use(PROC_DIR, sess)
+        pan_pik_file = sess.find('ptu_pan', filt="ptu_pan.pickle")
+        tilt_pik_file = sess.find('ptu_tilt', filt="ptu_tilt.pickle")
 
         if (not pan_pik_file) | (not tilt_pik_file):
-            logger.warning("No PTU pickle files found but data was expected- ABORTING")
+            logger.warning("No PTU pickle files found but data was expected - continuing without PTU")
+            ptu_exists = False
 
-        pan_data = pd.read_pickle(pan_pik_file[0])
-        tilt_data = pd.read_pickle(tilt_pik_file[0])
+    if ptu_exists:
+        pan_data = sess.get('ptu_pan')
+        tilt_data = sess.get('ptu_tilt')
         pan = pan_data.set_index('DT')['REAL_PHYSICAL_VALUE'].rename('PAN')
         tilt = tilt_data.set_index('DT')['REAL_PHYSICAL_VALUE'].rename('TILT')
 
+    # Only regenerate the browse products of new or changed images
+    browse_manifest = manifest.Manifest(PROC_DIR, "image_browse")
+    for old_output in browse_manifest.forget(RAW_FILES):
+        pancam_fns.exist_unlink(old_output)
+
+    ptu_hash = None
+    if ptu_exists:
+        ptu_hash = [manifest.file_hash(pan_pik_file),
+                    manifest.file_hash(tilt_pik_file)]
+
     # Create for loop here
     for curFile in RAW_FILES:
+        RAWJsonFile = curFile.with_suffix(".JSON")
+        params = {'Source': source, 'Model': model, 'PTU': ptu_hash,
+                  'JSON': manifest.file_hash(RAWJsonFile) if RAWJsonFile.exists() else None}
+        if browse_manifest.is_current(curFile, params):
+            logger.info("Browse up to date for %s", curFile.name)
+            continue
+
+        outputs = []
         logger.info("Reading %s", curFile.name)
         with open(curFile, 'rb') as file:
             img_rawheader = decodeRAW_ImgHDR(file.read(48), source, model)
@@ -123,10 +146,10 @@ def Img_RAW_Browse(PROC_DIR, source, model=None, ptu_exists=False):
             pancam_fns.exist_unlink(write_file)
 
             imageio.imwrite(write_file, Br_img)
+            outputs.append(write_file)
             logger.info("Creating .png: %s", write_file.stem)
 
             # Read existing JSON file associated with RAW
-            RAWJsonFile = curFile.with_suffix(".JSON")
             if not RAWJsonFile.exists():
                 ImgRawBrError("Warning RAW JSON does not exist", RAWJsonFile)
             with open(RAWJsonFile, 'r') as read_file:
@@ -202,6 +225,7 @@ def Img_RAW_Browse(PROC_DIR, source, model=None, ptu_exists=False):
             pancam_fns.exist_unlink(write_file)
             with open(write_file, 'w') as f:
                 json.dump(RAWJson, f,  indent=4)
+            outputs.append(write_file)
 
             # Create directory for Image analysis format
             ANL_DIR = PROC_DIR / "IMG_Analysis"
@@ -214,12 +238,18 @@ def Img_RAW_Browse(PROC_DIR, source, model=None, ptu_exists=False):
             write_file = ANL_DIR / (write_filename + ".png")
             pancam_fns.exist_unlink(write_file)
             imageio.imwrite(write_file, img_anl)
+            outputs.append(write_file)
             logger.info("Creating .png: %s", write_file.stem)
 
             write_file = ANL_DIR / (write_filename + ".json")
             pancam_fns.exist_unlink(write_file)
             with open(write_file, 'w') as f:
                 json.dump(RAWJson, f,  indent=4)
+            outputs.append(write_file)
+
+        browse_manifest.record(curFile, outputs, params)
+
+    browse_manifest.save()
 
     logger.info("Generating Image Browse Products from RAW Images Completed")
 
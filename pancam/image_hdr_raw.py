@@ -5,7 +5,6 @@ Created on Thu Nov 14 17:03:24 2019
 @author: ucasbwh
 """
 from bitstruct import unpack_from as upf
-import pandas as pd
 
 import pancam_fns
 
@@ -64,9 +63,8 @@ def decodeRAW_ImgHDR(header_bytes, source, model=None):
         cuc = upf('u48', cuc_raw)[0]
         img_info['W_Start_Time'] = f"{cuc:#016_X}"                   # PAN_TM_WAC_DT_ITS
 
-        cuc_df = pd.DataFrame({'Pkt_CUC': [cuc]}).astype('Int64')
-        cuc_dt = pancam_fns.CUCtoUTC_DT(cuc_df, source, model)
-        img_info['Img_Start_Time'] = cuc_dt[0].strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+        cuc_dt = pancam_fns.CUCtoUTC_Scalar(cuc, source, model)
+        img_info['Img_Start_Time'] = cuc_dt.strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
 
         # Byte 31-36
         img_info['W_Time'] = f"{upf('u48', header_bytes[31:37])[0]:#016_X}"   # PAN_TM_WAC_DT_WTS
@@ -123,9 +121,8 @@ def decodeRAW_ImgHDR(header_bytes, source, model=None):
         # Estimate Image time from PIU_Time
         cuc_raw = header_bytes[18:24]
         cuc = upf('u48', cuc_raw)[0]
-        cuc_df = pd.DataFrame({'Pkt_CUC': [cuc]}).astype('Int64')
-        cuc_dt = pancam_fns.CUCtoUTC_DT(cuc_df, source, model)
-        img_info['Img_Start_Time'] = cuc_dt[0].strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+        cuc_dt = pancam_fns.CUCtoUTC_Scalar(cuc, source, model)
+        img_info['Img_Start_Time'] = cuc_dt.strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
         # Byte 37-39
         if upf('u4', header_bytes, offset=296)[0] != 0:
             raise decodeRAW_IMGHDR_Error("Header Byte 37 Bit 7-4 not 0")
@@ -81,7 +81,8 @@ def hk_extract(lv_dir, archive=False):
             curfile.rename(arc_dir / curfile.name)
 
     hk_df['Source'] = 'LabView'
-    hk_df.to_pickle(proc_dir / "Unproc_HKTM.pickle")
+    pancam_fns.write_unproc(hk_df.drop(columns='RAW'), hk_df['RAW'],
+                            proc_dir / "Unproc_HKTM.pickle")
     logger.info("PanCam Unproc HK pickled.")
     logger.info("--HK Extract Completed.")
 
@@ -14,16 +14,13 @@ import logging
 import shutil
 import json
 
-import plotter
-import hk_cal
-import hk_raw
-import image_browse
 import rover_ha
 import rover
 import swis
 import hs
 import labview
-import tc_cal
+import stages
+import session
 import pancam_fns
 
 logger, status = pancam_fns.setup_logging()
@@ -53,11 +50,16 @@ if __name__ == '__main__':
     logger.info('\n\n\n\n')
     logger.info("main.py")
 
+    # Decoded tables are shared between the processing steps and written
+    # to disk once they have all run
+    sess = session.Session(proc_dir)
+
     # Check for a config.json and determine type else create one
     config_file = top_dir / "config.json"
     source = None
     model = None
     ptu_exists = False
+    instances = []
     if config_file.exists():
         # Read source type
         with open(config_file, 'r') as f:
@@ -128,28 +130,18 @@ if __name__ == '__main__':
     if source == 'SWIS':
         if not instances:
             instances = swis.get_instances(top_dir)
-        for inst in instances:
-            proc_dir = inst / "PROC"
-            status.info("Analysing %s", inst.name)
-            swis.hk_extract(inst)
-            swis.hs_extract(inst)
-            hs.decode(proc_dir, True)
-            hs.verify(inst)
-            hk_raw.decode(proc_dir, source)
-            hk_cal.cal_HK(proc_dir)
-            tc_cal.decode_all(proc_dir)
-            plotter.all_plots(proc_dir)
-            swis.sci_extract(inst)
-            swis.sci_compare(inst)
-            image_browse.Img_RAW_Browse(proc_dir, 'SWIS')
+
+        # Instances are independent so processed across a process pool,
+        # size set by 'SWIS Workers' in config.json else the cpu count
+        swis.process_instances(instances, config.get('SWIS Workers'))
 
     elif source == 'LabView':
         # LabView Files
         labview.hs_extract(top_dir, archive=arch_logs)
-        hs.decode(proc_dir)
-        hs.verify(proc_dir)
+        hs.decode(proc_dir, sess=sess)
+        hs.verify(proc_dir, sess=sess)
         labview.tc_extract(top_dir)
-        if hs.all_default_image_dim(proc_dir):
+        if hs.all_default_image_dim(proc_dir, sess=sess):
             labview.sci_extract(top_dir, archive=arch_logs)
             labview.bin_move(top_dir, archive=arch_logs)
         else:
@@ -173,21 +165,21 @@ if __name__ == '__main__':
         swis.nsvf_lb_extract(top_dir)
         swis.nsvf_tc_extract(top_dir)
         swis.hk_extract(proc_dir)
-        hs.decode(proc_dir, spw_header=True)
-        hs.verify(proc_dir)
-        swis.sci_extract(proc_dir, True)
+        hs.decode(proc_dir, spw_header=True, sess=sess)
+        hs.verify(proc_dir, sess=sess)
+        swis.sci_extract(proc_dir, True, sess=sess)
         swis.sci_compare(proc_dir)
 
     elif source == "Undetermined":
         quit()
 
-    # Process secondary files
-    hk_raw.decode(proc_dir, source, model)
-    image_browse.Img_RAW_Browse(proc_dir, source, model, ptu_exists)
-    hk_cal.cal_HK(proc_dir)
-    tc_cal.decode_all(proc_dir)
+    # Process secondary files and produce plots, independent stages run
+    # concurrently and those already up to date are skipped. SWIS instances
+    # have already been processed.
+    if source != 'SWIS':
+        stages.run_stages(stages.secondary_stages(
+            proc_dir, source, model, ptu_exists), proc_dir, sess=sess)
 
-    # Produce Plots
-    plotter.all_plots(proc_dir)
+    sess.save()
 
 logger.info("main.py completed")
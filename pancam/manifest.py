@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""Records which inputs a processing stage has already handled.
+
+Each stage keeps its own json file in PROC/MANIFEST listing, for every
+input, its size, modification time and content hash along with the outputs
+generated from it. On a rerun the stage only works on inputs that are new or
+have changed, and outputs of inputs that have since been removed can be
+cleaned up. The content hash is only read again when the size matches but
+the modification time does not, so a touched but unchanged file is still
+treated as current.
+
+Deleting the PROC/MANIFEST directory forces every stage to reprocess.
+
+:copyright: (c) 2020 by Barry J Whiteside. Mullard Space Science Laboratory - UCL
+
+:license: GPLv3, see LICENSE for more details.
+"""
+
+import hashlib
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+status = logging.getLogger('status')
+
+MANIFEST_DIR = "MANIFEST"
+HASH_BLOCK = 1 << 20
+
+
+def _files(path):
+    """Files making up path, a directory product such as .cols is all its files."""
+    if path.is_dir():
+        return sorted(p for p in path.rglob('*') if p.is_file())
+    return [path]
+
+
+def file_hash(path):
+    """Returns the blake2b hex digest of a file or of all files within a directory.
+
+    Arguments:
+        path {Path} -- file or directory to hash.
+
+    Returns:
+        str -- hex digest.
+    """
+
+    digest = hashlib.blake2b(digest_size=20)
+    for cur_file in _files(path):
+        if path.is_dir():
+            digest.update(cur_file.relative_to(path).as_posix().encode())
+        with open(cur_file, 'rb') as f:
+            for block in iter(lambda: f.read(HASH_BLOCK), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def fingerprint(path, with_hash=True):
+    """Returns the size, modification time and optionally hash of path.
+
+    Arguments:
+        path {Path} -- file or directory.
+
+    Keyword Arguments:
+        with_hash {bool} -- include the content hash. (default: {True})
+
+    Returns:
+        dict -- 'size', 'mtime' in ns and 'hash' if requested.
+    """
+
+    stats = [f.stat() for f in _files(path)]
+    entry = {'size': sum(s.st_size for s in stats),
+             'mtime': max((s.st_mtime_ns for s in stats), default=0)}
+    if with_hash:
+        entry['hash'] = file_hash(path)
+    return entry
+
+
+class Manifest(object):
+    """The inputs recorded for one processing stage of a PROC directory.
+
+    Paths are stored relative to the directory above PROC so the manifest
+    survives the data set being moved.
+
+    Arguments:
+        proc_dir {Path} -- the PROC directory.
+        stage {str} -- name of the stage, used as the json filename.
+    """
+
+    def __init__(self, proc_dir, stage):
+        self.root = proc_dir.parent
+        self.file = proc_dir / MANIFEST_DIR / (stage + ".json")
+        self.entries = {}
+
+        if self.file.exists():
+            try:
+                with open(self.file, 'r') as rf:
+                    self.entries = json.load(rf)
+            except ValueError:
+                logger.warning("Unreadable manifest %s - reprocessing all inputs",
+                               self.file.name)
+
+    def key(self, path):
+        """Returns the manifest key of path."""
+        try:
+            return path.resolve().relative_to(self.root.resolve()).as_posix()
+        except ValueError:
+            return path.resolve().as_posix()
+
+    def path(self, key):
+        """Returns the path of a manifest key."""
+        return self.root / key
+
+    def is_current(self, path, params=None):
+        """Checks if path is unchanged since recorded and its outputs still exist.
+
+        Arguments:
+            path {Path} -- input file or directory.
+
+        Keyword Arguments:
+            params {dict} -- json-able settings the outputs also depend on,
+                             must equal those recorded. (default: {None})
+
+        Returns:
+            bool -- True if the recorded outputs can be reused.
+        """
+
+        entry = self.entries.get(self.key(path))
+        if (entry is None) or (not path.exists()):
+            return False
+
+        if entry.get('params') != json.loads(json.dumps(params)):
+            return False
+
+        if not all(self.path(out).exists() for out in entry['outputs']):
+            return False
+
+        cur = fingerprint(path, with_hash=False)
+        if cur['size'] != entry['size']:
+            return False
+
+        if cur['mtime'] != entry['mtime']:
+            # Touched, only changed if the contents differ
+            if file_hash(path) != entry['hash']:
+                return False
+            entry['mtime'] = cur['mtime']
+
+        return True
+
+    def changed(self, paths, params=None):
+        """Returns the paths that are new or changed, as is_current."""
+        return [path for path in paths if not self.is_current(path, params)]
+
+    def up_to_date(self, paths, params=None):
+        """True if paths are exactly the recorded inputs and all are current."""
+        keys = {self.key(path) for path in paths}
+        return (keys == set(self.entries)) and not self.changed(paths, params)
+
+    def record(self, path, outputs=(), params=None):
+        """Records path as processed, producing outputs.
+
+        Arguments:
+            path {Path} -- input file or directory.
+
+        Keyword Arguments:
+            outputs {list} -- paths generated from the input. (default: {()})
+            params {dict} -- json-able settings used. (default: {None})
+        """
+
+        entry = fingerprint(path)
+        entry['outputs'] = [self.key(out) for out in outputs]
+        entry['params'] = json.loads(json.dumps(params))
+        self.entries[self.key(path)] = entry
+
+    def outputs(self, path):
+        """Returns the outputs recorded for path."""
+        entry = self.entries.get(self.key(path), {'outputs': []})
+        return [self.path(out) for out in entry['outputs']]
+
+    def forget(self, keep):
+        """Removes the inputs that are no longer present.
+
+        Arguments:
+            keep {list} -- paths of the inputs still present.
+
+        Returns:
+            list -- outputs recorded for the removed inputs.
+        """
+
+        keep_keys = {self.key(path) for path in keep}
+        removed = []
+        for key in [k for k in self.entries if k not in keep_keys]:
+            logger.info("Input no longer present: %s", key)
+            removed += [self.path(out)
+                        for out in self.entries.pop(key)['outputs']]
+        return removed
+
+    def clear(self):
+        """Removes all recorded inputs."""
+        self.entries = {}
+
+    def save(self):
+        """Writes the manifest to PROC/MANIFEST."""
+        if not self.file.parent.is_dir():
+            self.file.parent.mkdir()
+        with open(self.file, 'w') as wf:
+            json.dump(self.entries, wf, indent=1, sort_keys=True)
@@ -5,27 +5,180 @@
 #
 # PanCam Data Processing Tools
 
-from pathlib import Path
+from pathlib import Path, PurePath
 from natsort import natsorted, ns
-from bitstruct import unpack_from as upf
+import numpy as np
 import pandas as pd
 import binascii
+import fnmatch
+import json
 import logging
+import os
+import time
 from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
 status = logging.getLogger('status')
 
 
+# A directory listed within this time of its last modification is listed
+# again on the next search, file systems with coarse time stamps could
+# otherwise hide a later change.
+INDEX_SETTLE_NS = 2 * 10**9
+
+# Indexes of the directories searched by Find_Files during this run
+_file_indexes = []
+
+
+class FileIndex(object):
+    """The files and directories below root, listed in a single walk.
+
+    Directories are held by the tuple of their path parts relative to root.
+    On refresh a directory is only listed again if its modification time has
+    changed, which happens whenever an entry is added to or removed from it.
+
+    Arguments:
+        root {Path} -- the top directory.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.top = str(root)
+        self.mtimes = {}
+        self.names = {}
+        self._walk(())
+
+    def _list(self, rel):
+        """Lists a single directory, returning its sub directories."""
+
+        path = os.path.join(self.top, *rel)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+            with os.scandir(path) as it:
+                found = [(entry.name, entry.is_dir() and not entry.is_symlink())
+                         for entry in it]
+        except OSError:
+            mtime = None
+            found = []
+
+        if (mtime is not None) and (time.time_ns() - mtime < INDEX_SETTLE_NS):
+            mtime = None
+        self.mtimes[rel] = mtime
+        self.names[rel] = [name for name, _ in found]
+        return [rel + (name,) for name, is_dir in found if is_dir]
+
+    def _walk(self, rel):
+        """Lists rel and every directory below it."""
+        to_list = [rel]
+        while to_list:
+            to_list += self._list(to_list.pop())
+
+    def _drop(self, rel):
+        """Removes rel and every directory below it."""
+        for cur_dir in [d for d in self.mtimes if d[:len(rel)] == rel]:
+            del self.mtimes[cur_dir]
+            del self.names[cur_dir]
+
+    def refresh(self):
+        """Lists again the directories modified since they were last listed."""
+
+        # Parents first so removed sub directories are dropped before checked
+        for rel in sorted(self.mtimes, key=len):
+            if rel not in self.mtimes:
+                continue
+            try:
+                mtime = os.stat(os.path.join(self.top, *rel)).st_mtime_ns
+            except OSError:
+                mtime = None
+            if (mtime is not None) and (mtime == self.mtimes[rel]):
+                continue
+
+            old_dirs = {d for d in self.mtimes
+                        if (len(d) == len(rel) + 1) and (d[:-1] == rel)}
+            new_dirs = set(self._list(rel))
+            for removed in old_dirs - new_dirs:
+                self._drop(removed)
+            for added in new_dirs - old_dirs:
+                self._walk(added)
+
+    def find(self, sub, FILT, Recursive=True):
+        """Returns the entries below sub matching the wildcard FILT.
+
+        As Path.rglob, or Path.glob if not Recursive, each part of FILT is
+        matched against the same part counting back from the entry name.
+
+        Arguments:
+            sub {tuple} -- parts of the directory to search relative to root.
+            FILT {str} -- wildcard, directories separated by '/'.
+
+        Keyword Arguments:
+            Recursive {bool} -- search all sub directories. (default: {True})
+
+        Returns:
+            list -- of PurePath entries relative to sub.
+        """
+
+        *dir_pats, name_pat = PurePath(FILT).parts
+        found = []
+        for rel, names in self.names.items():
+            if rel[:len(sub)] != sub:
+                continue
+            dir_parts = rel[len(sub):]
+            if len(dir_parts) < len(dir_pats):
+                continue
+            if (not Recursive) and (len(dir_parts) != len(dir_pats)):
+                continue
+            if dir_pats and not all(
+                    fnmatch.fnmatch(part, pat) for part, pat
+                    in zip(dir_parts[len(dir_parts) - len(dir_pats):], dir_pats)):
+                continue
+            found += [PurePath(*dir_parts, name)
+                      for name in fnmatch.filter(names, name_pat)]
+        return found
+
+
+def file_index(DIR):
+    """Returns the up to date index of the directory tree containing DIR.
+
+    The index of a directory already searched, or of one above it, is reused
+    once refreshed, otherwise DIR is walked and its index kept for later
+    searches.
+
+    Arguments:
+        DIR {Path} -- the directory to be searched.
+
+    Returns:
+        FileIndex -- index with DIR at or below its root.
+    """
+
+    target = Path(DIR).resolve()
+    for index in _file_indexes:
+        if (index.root == target) or (index.root in target.parents):
+            index.refresh()
+            return index
+
+    # Indexes below the new root are covered by it
+    _file_indexes[:] = [index for index in _file_indexes
+                        if target not in index.root.parents]
+    index = FileIndex(target)
+    _file_indexes.append(index)
+    return index
+
+
 def Find_Files(DIR, FILT, SingleFile=False, Recursive=True):
     """Finds all the files within DIR using the wildcard FILT.
-    If SingleFile is True expects to return only one file."""
+    If SingleFile is True expects to return only one file.
+
+    FILT may include directories separated by '/', e.g. 'IMG_RAW/*.pci_raw'.
+    The directory tree is indexed on the first search and the index reused
+    by later searches, only directories modified since are listed again.
+    """
 
     logger.info("Find_Files Called")
-    if Recursive:
-        FoundFiles = natsorted(DIR.rglob(FILT), alg=ns.PATH)
-    else:
-        FoundFiles = natsorted(DIR.glob(FILT), alg=ns.PATH)
+    index = file_index(DIR)
+    sub = Path(DIR).resolve().relative_to(index.root).parts
+    FoundFiles = natsorted((DIR / rel for rel in index.find(sub, FILT, Recursive)),
+                           alg=ns.PATH)
 
     logger.debug(filename for filename in FoundFiles)
 
@@ -86,14 +239,539 @@ def LID_Browse(RawHDR_Dict, Model):
     return LID_str
 
 
-def PandUPF(Column, Len, OffBy, OffBi):
-    """Extracts a single RAW value from a binary pandas data column"""
-    if int(Len[1:]) > 63:
+class BinMatrix(object):
+    """Binary packets packed into a contiguous (N, packet_len) uint8 matrix.
+
+    Packets shorter than the longest are zero padded, the original length of
+    each packet is kept in lengths. The pandas index of the source column is
+    retained so extracted fields line up with the rest of the TM.
+
+    Arguments:
+        data {np.ndarray} -- (N, packet_len) uint8 matrix of packets.
+        lengths {np.ndarray} -- length in bytes of each packet.
+        index {pd.Index} -- index of the source column.
+    """
+
+    def __init__(self, data, lengths, index):
+        self.data = data
+        self.lengths = lengths
+        self.index = index
+
+    def __len__(self):
+        return self.data.shape[0]
+
+    @property
+    def empty(self):
+        return self.data.shape[0] == 0
+
+    def __getitem__(self, key):
+        """A boolean series returns the subset, an index label the packet bytes."""
+        if isinstance(key, (pd.Series, np.ndarray)):
+            return self.subset(key)
+        row = self.index.get_loc(key)
+        return bytes(self.data[row, :self.lengths[row]])
+
+    def subset(self, mask):
+        """Returns a new BinMatrix of the rows where mask is True.
+
+        Arguments:
+            mask {pd.Series} -- boolean series, aligned on index before use.
+        """
+        if isinstance(mask, pd.Series):
+            mask = mask.reindex(self.index).fillna(False).values
+        rows = np.asarray(mask, dtype=bool)
+        return BinMatrix(self.data[rows], self.lengths[rows], self.index[rows])
+
+    def drop(self, labels):
+        """Returns a new BinMatrix without the rows in labels."""
+        return self.subset(~self.index.isin(labels))
+
+    def len_series(self):
+        """Returns the packet lengths as a series on the matrix index."""
+        return pd.Series(self.lengths, index=self.index)
+
+    def field(self, Len, OffBy, OffBi):
+        """Extracts a bit-field from every row, see unpack_bits.
+
+        Returns:
+            pd.Series -- Int64 series of the field with the matrix index.
+        """
+        return pd.Series(unpack_bits(self.data, Len, OffBy, OffBi),
+                         index=self.index, dtype='Int64')
+
+
+def pack_bin(Column):
+    """Packs a pandas column of bytes into a BinMatrix.
+
+    Arguments:
+        Column {pd.Series} -- binary packets as bytes or bytearray.
+
+    Returns:
+        BinMatrix -- the packed packets.
+    """
+
+    lengths = np.fromiter((len(x) for x in Column.values),
+                          dtype=np.int64, count=len(Column))
+    flat = np.frombuffer(b''.join(Column.values), dtype=np.uint8)
+
+    return pack_buffer(flat, lengths.cumsum() - lengths, lengths, Column.index)
+
+
+def hex_lengths(Column):
+    """Returns the length in bytes of each row of a column of hex strings.
+
+    Rows are converted with a single fromhex of the joined strings, where an
+    odd length row would shift every row after it, so raises ValueError if
+    any row has an odd number of hex digits.
+
+    Arguments:
+        Column {pd.Series} -- packets as hex strings without any 0x prefix.
+
+    Returns:
+        np.ndarray -- length of each packet.
+    """
+
+    digits = Column.str.len().to_numpy(dtype=np.int64)
+    odd = digits % 2 != 0
+    if odd.any():
+        raise ValueError(
+            f"{odd.sum()} rows of odd length hex, first at index {Column.index[odd][0]}")
+    return digits // 2
+
+
+def pack_hex(Column):
+    """Packs a pandas column of hex strings into a BinMatrix.
+
+    All rows are converted with a single fromhex of the joined strings, each
+    checked to be whole bytes by hex_lengths.
+
+    Arguments:
+        Column {pd.Series} -- packets as hex strings without any 0x prefix.
+
+    Returns:
+        BinMatrix -- the packed packets.
+    """
+
+    lengths = hex_lengths(Column)
+    flat = np.frombuffer(bytes.fromhex(''.join(Column.values)), dtype=np.uint8)
+
+    return pack_buffer(flat, lengths.cumsum() - lengths, lengths, Column.index)
+
+
+def pack_buffer(flat, offsets, lengths, index):
+    """Packs packets held back to back in a byte buffer into a BinMatrix.
+
+    Arguments:
+        flat {np.ndarray} -- uint8 buffer, may be a np.memmap.
+        offsets {np.ndarray} -- start of each packet within flat.
+        lengths {np.ndarray} -- length in bytes of each packet.
+        index {pd.Index} -- index given to the packets.
+
+    Returns:
+        BinMatrix -- the packed packets.
+    """
+
+    offsets = np.asarray(offsets, dtype=np.int64)
+    lengths = np.asarray(lengths, dtype=np.int64)
+    num = len(lengths)
+
+    if num == 0:
+        data = np.zeros((0, 0), dtype=np.uint8)
+    elif ((lengths == lengths[0]).all()
+          and (offsets == np.arange(num) * lengths[0]).all()):
+        # Common case of fixed length packets needs no padding or copy
+        data = flat[:num * lengths[0]].reshape(num, lengths[0])
+    else:
+        data = np.zeros((num, lengths.max()), dtype=np.uint8)
+        rows = np.repeat(np.arange(num), lengths)
+        cols = np.arange(lengths.sum()) - np.repeat(lengths.cumsum() - lengths, lengths)
+        data[rows, cols] = flat[np.repeat(offsets, lengths) + cols]
+
+    return BinMatrix(data, lengths, index)
+
+
+def write_unproc(tm, raw, write_file):
+    """Writes unprocessed packets in the binary Unproc format.
+
+    The packets are written back to back to a .bin file next to write_file,
+    the pickle holds the tm columns plus the Offset and Length of each packet
+    so they can be read without any per packet conversion.
+
+    Arguments:
+        tm {pd.DataFrame} -- time and source columns, one row per packet.
+        raw {pd.Series} -- packets as hex strings or bytes, same order as tm.
+        write_file {Path} -- the .pickle file to write.
+    """
+
+    if len(raw) and isinstance(raw.iloc[0], str):
+        # Converted as a single string, whitespace between bytes is ignored
+        raw = raw.str.replace(r'\s', '', regex=True)
+        lengths = hex_lengths(raw)
+        buffer = bytes.fromhex(''.join(raw.values))
+    else:
+        lengths = np.fromiter((len(x) for x in raw.values),
+                              dtype=np.int64, count=len(raw))
+        buffer = b''.join(raw.values)
+
+    bin_file = write_file.with_suffix('.bin')
+    exist_unlink(bin_file)
+    with open(bin_file, 'wb') as wf:
+        wf.write(buffer)
+
+    write_unproc_tm(tm, lengths, write_file)
+
+
+def write_unproc_tm(tm, lengths, write_file):
+    """Writes the pickle of the Unproc format for packets already in its .bin file.
+
+    Arguments:
+        tm {pd.DataFrame} -- time and source columns, one row per packet.
+        lengths {np.ndarray} -- length of each packet, in the order they
+                                are written back to back in the .bin file.
+        write_file {Path} -- the .pickle file to write.
+    """
+
+    lengths = np.asarray(lengths, dtype=np.int64)
+    tm = tm.copy()
+    tm['Offset'] = lengths.cumsum() - lengths
+    tm['Length'] = lengths
+
+    exist_unlink(write_file)
+    tm.to_pickle(write_file)
+
+
+def read_unproc(pik_file):
+    """Reads unprocessed packets written by write_unproc.
+
+    The .bin file is memory-mapped so fixed length packets are decoded
+    straight from the file. Older pickles with a 'RAW' column of hex strings
+    or bytes are also accepted.
+
+    Arguments:
+        pik_file {Path} -- the .pickle file.
+
+    Returns:
+        pd.DataFrame -- the time and source columns.
+        BinMatrix -- the packets, same index as the dataframe.
+    """
+
+    tm = pd.read_pickle(pik_file)
+
+    if 'RAW' in tm:
+        try:
+            raw = tm['RAW'].apply(lambda x: bytearray.fromhex(x))
+        except TypeError:
+            raw = tm['RAW']
+        return tm, pack_bin(raw)
+
+    bin_file = pik_file.with_suffix('.bin')
+    if bin_file.stat().st_size == 0:
+        flat = np.zeros(0, dtype=np.uint8)
+    else:
+        flat = np.memmap(bin_file, dtype=np.uint8, mode='r')
+
+    bin = pack_buffer(flat, tm.pop('Offset').values, tm.pop('Length').values, tm.index)
+    return tm, bin
+
+
+def write_columns(df, write_dir):
+    """Writes a dataframe as a directory of .npy files, one per column.
+
+    Nullable columns such as Int64 are stored as their numpy values plus a
+    boolean mask, other columns keep their numpy dtype. A meta.json lists the columns in
+    order so readers can load only those they need.
+
+    Arguments:
+        df {pd.DataFrame} -- the product to write.
+        write_dir {Path} -- directory to create, by convention ending '.cols'.
+    """
+
+    if write_dir.is_dir():
+        for old_file in write_dir.iterdir():
+            old_file.unlink()
+    else:
+        write_dir.mkdir(parents=True)
+
+    meta = {'columns': []}
+    np.save(write_dir / "index.npy", df.index.values, allow_pickle=True)
+
+    for num, name in enumerate(df.columns):
+        col = df[name]
+        entry = {'name': name, 'file': f"c{num:04d}.npy", 'kind': 'numpy'}
+
+        if hasattr(col.dtype, 'numpy_dtype'):
+            # Nullable extension dtype e.g. Int64, Float64 or boolean
+            entry['kind'] = 'masked'
+            entry['dtype'] = str(col.dtype)
+            entry['mask'] = f"c{num:04d}_mask.npy"
+            np.save(write_dir / entry['mask'], col.isna().values)
+            values = col.to_numpy(
+                dtype=col.dtype.numpy_dtype, na_value=col.dtype.type(0))
+        else:
+            values = col.values
+
+        np.save(write_dir / entry['file'], values, allow_pickle=True)
+        meta['columns'].append(entry)
+
+    with open(write_dir / "meta.json", 'w') as wf:
+        json.dump(meta, wf, indent=1)
+
+
+def read_columns(read_dir, columns=None):
+    """Reads a dataframe written by write_columns.
+
+    Columns are memory-mapped where their dtype allows, requested columns
+    that are not in the product are ignored.
+
+    Arguments:
+        read_dir {Path} -- the '.cols' directory.
+
+    Keyword Arguments:
+        columns {list} -- names of the columns to load, all if None. (default: {None})
+
+    Returns:
+        pd.DataFrame -- the requested columns in the order they were written.
+    """
+
+    with open(read_dir / "meta.json", 'r') as rf:
+        meta = json.load(rf)
+
+    def load(file_name):
+        try:
+            return np.load(read_dir / file_name, mmap_mode='r')
+        except ValueError:
+            # Object columns cannot be memory-mapped
+            return np.load(read_dir / file_name, allow_pickle=True)
+
+    data = {}
+    for entry in meta['columns']:
+        if (columns is not None) and (entry['name'] not in columns):
+            continue
+
+        values = load(entry['file'])
+        if entry['kind'] == 'masked':
+            mask = np.asarray(load(entry['mask']))
+            array_type = pd.api.types.pandas_dtype(
+                entry['dtype']).construct_array_type()
+            values = array_type(np.asarray(values), mask)
+        data[entry['name']] = values
+
+    index = pd.Index(load("index.npy"))
+    return pd.DataFrame(data, index=index)
+
+
+def find_product(DIR, name, SingleFile=True):
+    """Finds a PROC product written by write_columns, else its older pickle.
+
+    Arguments:
+        DIR {Path} -- directory searched recursively.
+        name {str} -- product name e.g. 'RAW_HKTM'.
+
+    Returns:
+        list -- of found paths, as Find_Files.
+    """
+
+    found = Find_Files(DIR, "*" + name + ".cols", SingleFile)
+    if not found:
+        found = Find_Files(DIR, "*" + name + ".pickle", SingleFile)
+    return found
+
+
+def read_product(path, columns=None):
+    """Reads a product found by find_product, only loading columns if given.
+
+    Arguments:
+        path {Path} -- a '.cols' directory or a '.pickle' file.
+
+    Keyword Arguments:
+        columns {list} -- names of the columns to load, all if None. (default: {None})
+
+    Returns:
+        pd.DataFrame -- the product.
+    """
+
+    if path.suffix == '.cols':
+        return read_columns(path, columns)
+
+    df = pd.read_pickle(path)
+    if columns is not None:
+        df = df[[name for name in df.columns if name in columns]]
+    return df
+
+
+def unpack_bits(data, Len, OffBy, OffBi):
+    """Extracts the same bit-field from every row of a packet matrix.
+
+    The bytes spanned by the field are combined with shifts and masks across
+    all rows at once, giving the same result as bitstruct.unpack_from for
+    each row.
+
+    Arguments:
+        data {np.ndarray} -- (N, packet_len) uint8 matrix of packets.
+        Len {str} -- bitstruct style type and width, e.g. 'u12' or 's16'.
+        OffBy {int} -- byte offset of the field.
+        OffBi {int} -- bit offset within the first byte, 0 is the MSB.
+
+    Returns:
+        np.ndarray -- int64 array of the field for each row.
+    """
+
+    width = int(Len[1:])
+    if Len[0] not in ('u', 's'):
+        raise ValueError("Only unsigned and signed fields are supported: " + Len)
+    if width > 63:
         raise ValueError(
             "PandUPF used for variable larger than 63 bits. Returned value is cast to an Int64")
-    Extract = Column.apply(lambda x: upf(
-        Len, x, offset=8*OffBy+OffBi)[0]).astype('Int64')
-    return Extract
+
+    OffBy += OffBi // 8
+    OffBi = OffBi % 8
+    num_bytes = (OffBi + width + 7) // 8
+    trailing = 8 * num_bytes - OffBi - width
+
+    if data.shape[0] == 0:
+        return np.zeros(0, dtype=np.int64)
+    if OffBy + num_bytes > data.shape[1]:
+        raise ValueError(
+            "Field {} at byte {} beyond packet length {}".format(Len, OffBy, data.shape[1]))
+
+    # Leading bits are masked off the first byte and trailing bits shifted off
+    # the last, so the accumulator never holds more than width bits.
+    window = data[:, OffBy:OffBy + num_bytes].astype(np.uint64)
+    value = window[:, 0] & np.uint64(0xFF >> OffBi)
+    if num_bytes == 1:
+        value >>= np.uint64(trailing)
+    for i in range(1, num_bytes):
+        if i == num_bytes - 1:
+            value = (value << np.uint64(8 - trailing)) | (window[:, i] >> np.uint64(trailing))
+        else:
+            value = (value << np.uint64(8)) | window[:, i]
+
+    if Len[0] == 's':
+        # Sign extend by moving the field to the top of the word
+        shift = 64 - width
+        return (value << np.uint64(shift)).view(np.int64) >> np.int64(shift)
+
+    return value.astype(np.int64)
+
+
+def compile_fields(fields):
+    """Compiles a list of bit-fields into a plan for decode_fields.
+
+    Fields are sorted by byte offset and grouped into windows of up to 8
+    bytes, so each window is assembled once and shared by every field it
+    contains.
+
+    Arguments:
+        fields {list} -- of (key, Len, OffBy, OffBi) tuples.
+
+    Returns:
+        tuple -- of (start byte, num bytes, ((key, shift, width, signed), ..))
+    """
+
+    norm = []
+    for key, Len, OffBy, OffBi in fields:
+        width = int(Len[1:])
+        if Len[0] not in ('u', 's') or width > 63:
+            raise ValueError("Unsupported field type: " + Len)
+        bit = 8 * OffBy + OffBi
+        norm.append((bit, width, key, Len[0] == 's'))
+    norm.sort(key=lambda x: x[0])
+
+    plan = []
+    for bit, width, key, signed in norm:
+        start, end = bit // 8, (bit + width + 7) // 8
+        if plan and (end - plan[-1][0] <= 8):
+            window = plan[-1]
+            window[1] = max(window[1], end - window[0])
+        else:
+            window = [start, end - start, []]
+            plan.append(window)
+        window[2].append((key, bit - 8 * window[0], width, signed))
+
+    # Shifts can only be set once the window length is final
+    return tuple(
+        (start, num_bytes, tuple(
+            (key, 8 * num_bytes - rel_bit - width, width, signed)
+            for key, rel_bit, width, signed in items))
+        for start, num_bytes, items in plan)
+
+
+def decode_fields(data, plan, lengths=None):
+    """Decodes every field of a compiled plan from a packet matrix.
+
+    Packets shorter than the matrix are zero padded, so without lengths a
+    field beyond the end of a packet decodes as 0. With lengths such a field
+    is NaN instead, its array then float64.
+
+    Arguments:
+        data {np.ndarray} -- (N, packet_len) uint8 matrix of packets.
+        plan {tuple} -- as returned by compile_fields.
+
+    Keyword Arguments:
+        lengths {np.ndarray} -- length in bytes of each packet. (default: {None})
+
+    Returns:
+        dict -- int64 arrays of each field keyed as in the plan, float64
+                with NaN for packets too short to hold it.
+    """
+
+    decoded = {}
+    for start, num_bytes, items in plan:
+        if (lengths is not None) and (start + num_bytes > data.shape[1]):
+            # Beyond every packet, so all NaN
+            for key, _, _, _ in items:
+                decoded[key] = np.full(data.shape[0], np.nan)
+            continue
+
+        if num_bytes > 8:
+            # Only a single wide unaligned field can overflow a 64 bit window
+            for key, shift, width, signed in items:
+                rel_bit = 8 * num_bytes - shift - width
+                decoded[key] = unpack_bits(
+                    data, ('s' if signed else 'u') + str(width), start, rel_bit)
+
+        else:
+            if data.shape[0] == 0:
+                window = np.zeros(0, dtype=np.uint64)
+            elif start + num_bytes > data.shape[1]:
+                raise ValueError(
+                    "Field at byte {} beyond packet length {}".format(start, data.shape[1]))
+            else:
+                window = data[:, start].astype(np.uint64)
+                for i in range(start + 1, start + num_bytes):
+                    window = (window << np.uint64(8)) | data[:, i]
+
+            for key, shift, width, signed in items:
+                value = (window >> np.uint64(shift)) & np.uint64((1 << width) - 1)
+                if signed:
+                    ext = 64 - width
+                    decoded[key] = (value << np.uint64(ext)).view(np.int64) >> np.int64(ext)
+                else:
+                    decoded[key] = value.astype(np.int64)
+
+        if lengths is None:
+            continue
+
+        # Rows ending before the last byte of a field
+        for key, shift, width, signed in items:
+            field_end = start + num_bytes - shift // 8
+            short = lengths < field_end
+            if short.any():
+                decoded[key] = decoded[key].astype(np.float64)
+                decoded[key][short] = np.nan
+
+    return decoded
+
+
+def PandUPF(Column, Len, OffBy, OffBi):
+    """Extracts a single RAW value from a binary pandas data column
+
+    Column may be a pandas series of bytes or an already packed BinMatrix,
+    packing once and reusing the BinMatrix avoids repacking for each field.
+    """
+    if not isinstance(Column, BinMatrix):
+        Column = pack_bin(Column)
+    return Column.field(Len, OffBy, OffBi)
 
 
 def ReturnCUC_RAW(TM, Bin):
@@ -187,27 +865,30 @@ def exist_unlink(purepath, loglevel=logging.INFO):
         logger.log(loglevel, "Deleting file: %s", purepath.name)
 
 
-def CUCtoUTC_DT(RAW, source, rov_type=None):
-    """Function that takes the 4,2 CUC and converts it to a datetime object"""
+def CUC_Epoch(source, rov_type=None, first_time=None):
+    """Returns the epoch the CUC time of a source counts from.
+
+    Arguments:
+        source {str} -- 'SWIS', 'LabView', 'Rover' or other.
 
-    # First calculate the fractional seconds
-    RAW['CUCfrac'] = RAW['Pkt_CUC'].apply(lambda x: (x & 0xFFFF)/0x10000)
+    Keyword Arguments:
+        rov_type {str} -- rover model, 'exm_pfm_ccs' or 'exm_gtm_ccs'. (default: {None})
+        first_time {datetime} -- LabView only, time of the first packet. (default: {None})
+
+    Returns:
+        datetime -- the epoch.
+    """
 
     if source == 'SWIS':
-        if 'Unix_Time' in RAW:
-            CalcTime = pd.to_datetime(RAW['Unix_Time'], unit='ms')
-            return CalcTime
-        else:
-            epoch = datetime(year=1970, month=1, day=1)
+        epoch = datetime(year=1970, month=1, day=1)
 
     elif source == 'LabView':
-        RAW['DT'] = pd.to_datetime(RAW['Time'], format='%Y-%m-%d\t%H:%M:%S.%f')
-        RAW['Year'] = RAW['DT'].dt.year
-        RAW['Month'] = RAW['DT'].dt.month
+        if first_time is None:
+            raise ValueError("LabView CUC epoch requires the packet time")
 
         # LabView provides the CUC time as the # seconds from the first day
         # of the month, minus an extra day.
-        epoch = datetime(RAW['Year'][0], RAW['Month'][0], day=1)
+        epoch = datetime(first_time.year, first_time.month, day=1)
         epoch_offset = timedelta(days=-1)
         epoch = epoch + epoch_offset
 
@@ -221,10 +902,71 @@ def CUCtoUTC_DT(RAW, source, rov_type=None):
     else:
         epoch = datetime(year=2000, month=1, day=1)
 
-    CalcTime = RAW.apply(lambda row:
-                         (epoch
-                          + timedelta(seconds=(row['Pkt_CUC'] >> 16))
-                          + timedelta(seconds=row['CUCfrac'])
-                          ), axis=1)
+    return epoch
+
+
+def CUC_Split(cuc):
+    """Splits the 4,2 CUC into whole seconds and microseconds.
+
+    The 16 bit fraction is rounded half to even to the microsecond, matching
+    the resolution of a datetime. Works on an int or an int64 array.
+    """
+
+    seconds = cuc >> 16
+    # 1e6 / 0x10000 is exactly 15625 / 1024
+    micro = np.rint((cuc & 0xFFFF) * 15625 / 1024).astype(np.int64)
+    return seconds, micro
+
+
+def CUCtoUTC_DT(RAW, source, rov_type=None):
+    """Function that takes the 4,2 CUC and converts it to a datetime object
+
+    Arguments:
+        RAW {pd.DataFrame} -- with a 'Pkt_CUC' column, plus 'Time' for LabView
+                              or optionally 'Unix_Time' for SWIS.
+        source {str} -- 'SWIS', 'LabView', 'Rover' or other.
+
+    Keyword Arguments:
+        rov_type {str} -- rover model. (default: {None})
+
+    Returns:
+        pd.Series -- datetime64[ns] time of each row.
+    """
+
+    if source == 'SWIS' and 'Unix_Time' in RAW:
+        CalcTime = pd.to_datetime(RAW['Unix_Time'], unit='ms')
+        return CalcTime
+
+    first_time = None
+    if source == 'LabView':
+        first_time = pd.to_datetime(
+            RAW['Time'].iloc[0], format='%Y-%m-%d\t%H:%M:%S.%f')
+
+    epoch = np.datetime64(CUC_Epoch(source, rov_type, first_time), 'ns')
+
+    seconds, micro = CUC_Split(RAW['Pkt_CUC'].to_numpy(dtype=np.int64))
+    CalcTime = (epoch
+                + seconds.astype('timedelta64[s]')
+                + micro.astype('timedelta64[us]'))
+
+    return pd.Series(CalcTime, index=RAW.index)
+
+
+def CUCtoUTC_Scalar(cuc, source, rov_type=None):
+    """Converts a single 4,2 CUC to a datetime, for image headers.
+
+    LabView is not supported as its epoch depends on the packet time.
+
+    Arguments:
+        cuc {int} -- the 48 bit CUC.
+        source {str} -- 'SWIS', 'Rover' or other.
+
+    Keyword Arguments:
+        rov_type {str} -- rover model. (default: {None})
+
+    Returns:
+        datetime -- the converted time.
+    """
 
-    return CalcTime
+    seconds, micro = CUC_Split(int(cuc))
+    return CUC_Epoch(source, rov_type) + timedelta(seconds=int(seconds), microseconds=int(micro))
@@ -15,8 +15,15 @@ from pandas.plotting import register_matplotlib_converters
 import numpy as np
 from pathlib import Path
 import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from fnmatch import fnmatch
+from natsort import natsorted, ns
 
 import pancam_fns
+import manifest
+import session
 
 logger = logging.getLogger(__name__)
 status = logging.getLogger('status')
@@ -41,7 +48,7 @@ class plotter_Error(Exception):
     pass
 
 
-def plot_cycles(proc_dir):
+def plot_cycles(proc_dir, sess=None):
     """Generates plot limits start and stop, if PanCam has been power cycled.
 
     Arguments:
@@ -59,23 +66,19 @@ def plot_cycles(proc_dir):
     limits = None
     output = False
 
-    rv_files = pancam_fns.Find_Files(
-        proc_dir, "*RoverStatus.pickle", SingleFile=True)
+    sess = session.Session.use(proc_dir, sess)
+    rv_status = sess.get('RoverStatus', filt="*RoverStatus.pickle")
 
-    psu_files = pancam_fns.Find_Files(
-        proc_dir, "*psu.pickle", SingleFile=True)
+    psu_status = sess.get('psu', filt="*psu.pickle")
 
-    if rv_files:
-        rv_status = pd.read_pickle(rv_files[0])
+    if rv_status is not None:
         on_dt = rv_status['DT'][rv_status.PWR_ST.diff() == 1].tolist()
         off_dt = rv_status['DT'][rv_status.PWR_ST.diff() == -1].tolist()
         output = True
 
         # TODO: Want to go through and ensure that on/off is greater than 5 min.
 
-    elif psu_files:
-        psu_status = pd.read_pickle(psu_files[0])
-
+    elif psu_status is not None:
         map_dict = {True: 1, False: 0}
         psu_status['Active'] = psu_status.Power > 1
         psu_status['Active'] = psu_status['Active'].map(map_dict)
@@ -99,12 +102,19 @@ def plot_cycles(proc_dir):
     return limits
 
 
-def all_plots(proc_dir):
+def all_plots(proc_dir, workers=None, sess=None):
     """Generates one of each defined plots.
 
     Arguments:
         proc_dir {Path} -- Dir containing generated .pickle files.
 
+    Keyword Arguments:
+        workers {int} -- Size of the process pool the plots are rendered on,
+                         rendered one at a time in this process if 1.
+                         (default: {cpu count})
+        sess {Session} -- session holding the products, shared by the plots
+                          when rendered in this process. (default: {None})
+
     Generates:
         HK Plots {Folder} -- Located in proc_dir containing the following if available:
             FW.png           -- Plot of Filter Wheel Status
@@ -113,25 +123,135 @@ def all_plots(proc_dir):
             INT_TEMP_RAW.png -- Plot of RAW temperatures and heater status
             VOLT_CAL.png     -- Plot of the calibrated voltages and limits
             VOLT_RAW.png     -- Plot of the raw voltages
+
+    A plot is only redrawn if the products it is drawn from have changed
+    since it was last generated. The HK products are memory-mapped column
+    files, so workers share one copy of them in the page cache and each only
+    reads the columns its plot needs.
     """
 
     # Determine if multiple power cycles
-    cyc_lims = plot_cycles(proc_dir)
+    sess = session.Session.use(proc_dir, sess)
+    cyc_lims = plot_cycles(proc_dir, sess=sess)
+
+    # Each plot with the products it is drawn from and the names of the
+    # figures it saves, those with cycle limits also depend on the products
+    # searched by plot_cycles
+    cycles = ['RoverStatus', 'psu']
+    plots = [(HK_Overview, ['RAW_HKTM', 'Unproc_TC'] + cycles, True, ['HK_OVR']),
+             (HK_Voltages, ['RAW_HKTM', 'Cal_HKTM'] + cycles, True,
+              ['VOLT_RAW', 'VOLT_CAL']),
+             (HK_Temperatures, ['RAW_HKTM', 'Cal_HKTM'] + cycles, True,
+              ['INT_TEMP_RAW', 'INT_TEMP_CAL']),
+             (HK_Deltas, ['RAW_HKTM', 'Unproc_TC'], False, ['HK_Delta']),
+             (FW, ['RAW_HKTM', 'Unproc_TC'] + cycles, True, ['FW']),
+             (Rover_Temperatures, ['RoverStatus', 'RoverTemps'], False,
+              ['ROV_TEMPS']),
+             (Rover_Power, ['RoverStatus'], False, ['ROV_PWR', 'ROV_PWR_EXT']),
+             (psu, ['psu'] + cycles, True, ['PSU_Cur', 'PSU_Pwr']),
+             (ptu, ['ptu_pan', 'ptu_tilt'] + cycles, True,
+              ['PTU_TimeSeries', 'PSU']),
+             (HRC_CS, ['RAW_HKTM', 'Cal_TC', 'Unproc_TC'] + cycles, True,
+              ['HRC_CS']),
+             (wac_res, ['RAW_HKTM', 'Cal_TC', 'Unproc_TC'] + cycles, True, ['WAC'])]
+
+    # Only replot if the products used have changed, the manifests and any
+    # pool workers read the products from disk
+    sess.save()
+    to_draw = []
+    for plot, products, uses_limits, names in plots:
+        inputs = plot_inputs(proc_dir, products)
+        plot_manifest = manifest.Manifest(proc_dir, "plot_" + plot.__name__)
+        if inputs and plot_manifest.up_to_date(inputs):
+            logger.info("%s plots up to date - skipping", plot.__name__)
+            continue
+        kwargs = {'limits': cyc_lims} if uses_limits else {}
+        to_draw.append((plot, kwargs, inputs, names, plot_manifest))
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    # Daemonic pool workers cannot start a pool of their own
+    if multiprocessing.current_process().daemon:
+        workers = 1
+    workers = max(1, min(workers, len(to_draw)))
+
+    errors = []
+    if workers == 1:
+        for plot, kwargs, inputs, names, plot_manifest in to_draw:
+            plot(proc_dir, sess=sess, **kwargs)
+            record_plot(proc_dir, inputs, names, plot_manifest)
+
+    else:
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=_init_plot_worker,
+                                 initargs=(proc_dir,)) as pool:
+            futures = [pool.submit(plot, proc_dir, **kwargs)
+                       for plot, kwargs, *_ in to_draw]
+
+        for future, (plot, _, inputs, names, plot_manifest) in zip(futures, to_draw):
+            if future.exception():
+                errors.append(future.exception())
+                continue
+            record_plot(proc_dir, inputs, names, plot_manifest)
+
+    if errors:
+        raise errors[0]
+
+
+def _init_plot_worker(proc_dir):
+    """Sets up a plot worker to render without a display and log as the parent."""
+
+    plt.switch_backend('Agg')
+    root = logging.getLogger()
+    if not root.handlers:
+        pancam_fns.setup_logging()
+    if not any(isinstance(h, logging.FileHandler) for h in root.handlers):
+        pancam_fns.setup_proc_logging(root, proc_dir)
 
-    HK_Overview(proc_dir, limits=cyc_lims)
-    HK_Voltages(proc_dir, limits=cyc_lims)
-    HK_Temperatures(proc_dir, limits=cyc_lims)
-    HK_Deltas(proc_dir)
-    FW(proc_dir, limits=cyc_lims)
 
-    Rover_Temperatures(proc_dir)
-    Rover_Power(proc_dir)
+def record_plot(proc_dir, inputs, names, plot_manifest):
+    """Records the products a plot was drawn from and the figures it saved.
 
-    psu(proc_dir)
-    ptu(proc_dir, limits=cyc_lims)
+    Arguments:
+        proc_dir {Path} -- Dir containing generated product files.
+        inputs {list} -- Paths of the products used.
+        names {list} -- Names of the figures the plot saves, including those
+                        saved per power cycle by plot_subsets.
+        plot_manifest {manifest.Manifest} -- The manifest of the plot.
+    """
+
+    hk_dir = proc_dir / HK_Plot_Location
+    outputs = []
+    if hk_dir.is_dir():
+        outputs = sorted(f for f in hk_dir.glob("*.png")
+                         for name in names
+                         if fnmatch(f.stem, name) or fnmatch(f.stem, "Cycle_*_" + name))
+
+    plot_manifest.clear()
+    for cur_input in inputs:
+        plot_manifest.record(cur_input, outputs)
+    plot_manifest.save()
+
+
+def plot_inputs(proc_dir, products):
+    """Returns the first file found for each product, as used by the plots.
+
+    Arguments:
+        proc_dir {Path} -- Dir containing generated product files.
+        products {list} -- Product names e.g. 'RAW_HKTM'.
+
+    Returns:
+        list -- Paths of the products found.
+    """
 
-    HRC_CS(proc_dir, limits=cyc_lims)
-    wac_res(proc_dir, limits=cyc_lims)
+    found = []
+    for name in products:
+        for filt in ["*" + name + ".cols", "*" + name + ".pickle"]:
+            files = natsorted(proc_dir.rglob(filt), alg=ns.PATH)
+            if files:
+                found.append(files[0])
+                break
+    return found
 
 
 def MakeHKPlotsDir(PROC_DIR):
@@ -141,7 +261,8 @@ def MakeHKPlotsDir(PROC_DIR):
         logger.info("'HK Plots' Directory already exists")
     else:
         logger.info("Generating 'HK Plots' directory")
-        HK_DIR.mkdir()
+        # Plots rendered in parallel may create it at the same time
+        HK_DIR.mkdir(exist_ok=True)
     return HK_DIR
 
 
@@ -202,7 +323,7 @@ def adjust_xscale(ax0):
     ax0.set_xlim(right=new_lim)
 
 
-def HK_Voltages(PROC_DIR, Interact=False, limits=None):
+def HK_Voltages(PROC_DIR, Interact=False, limits=None, sess=None):
     """"Produces a calibrated and uncalibrated voltage plots from pickle files"""
 
     logger.info("Producing Voltage Plots")
@@ -210,14 +331,13 @@ def HK_Voltages(PROC_DIR, Interact=False, limits=None):
     HK_DIR = MakeHKPlotsDir(PROC_DIR)
 
     # Search for PanCam RAW Processed Files
-    RawPikFile = pancam_fns.Find_Files(
-        PROC_DIR, "*RAW_HKTM.pickle", SingleFile=True)
-    if not RawPikFile:
+    sess = session.Session.use(PROC_DIR, sess)
+    RAW = sess.get('RAW_HKTM', [
+        'DT', 'Volt_Ref', 'Volt_6V0', 'Volt_1V5'])
+    if RAW is None:
         logger.warning("No file found - ABORTING")
         return
 
-    RAW = pd.read_pickle(RawPikFile[0])
-
     fig = plt.figure(figsize=(14.0, 9.0))
     gs = gridspec.GridSpec(3, 1, height_ratios=[1, 1, 1], figure=fig)
     ax0 = fig.add_subplot(gs[0])
@@ -246,14 +366,12 @@ def HK_Voltages(PROC_DIR, Interact=False, limits=None):
         plt.show(block=False)
 
     # Search for PanCam CAL Processed Files
-    CalPikFile = pancam_fns.Find_Files(
-        PROC_DIR, "*Cal_HKTM.pickle", SingleFile=True)
-    if not CalPikFile:
+    Cal = sess.get('Cal_HKTM', [
+        'DT', 'Volt_Ref', 'Volt_6V0', 'Volt_1V5'])
+    if Cal is None:
         logger.warning("No file found - ABORTING")
         return
 
-    Cal = pd.read_pickle(CalPikFile[0])
-
     fig2 = plt.figure(figsize=(14.0, 9.0))
     gs2 = gridspec.GridSpec(3, 1, height_ratios=[1, 1, 1], figure=fig2)
     ax3 = fig2.add_subplot(gs2[0])
@@ -300,7 +418,7 @@ def HK_Voltages(PROC_DIR, Interact=False, limits=None):
     logger.info("Producing Voltage Plots Completed")
 
 
-def HK_Temperatures(PROC_DIR, Interact=False, limits=None):
+def HK_Temperatures(PROC_DIR, Interact=False, limits=None, sess=None):
     """"Produces a calibrated and uncalibrated temperature plots from pickle files"""
 
     logger.info("Producing Temperature Plots")
@@ -308,14 +426,15 @@ def HK_Temperatures(PROC_DIR, Interact=False, limits=None):
     HK_DIR = MakeHKPlotsDir(PROC_DIR)
 
     # Search for PanCam RAW Processed Files
-    RawPikFile = pancam_fns.Find_Files(
-        PROC_DIR, "*RAW_HKTM.pickle", SingleFile=True)
-    if not RawPikFile:
+    sess = session.Session.use(PROC_DIR, sess)
+    RAW = sess.get('RAW_HKTM', [
+        'DT', 'Temp_LFW', 'Temp_RFW', 'Temp_HRC', 'Temp_LWAC', 'Temp_RWAC',
+        'Temp_HRCA', 'Temp_LDO', 'Stat_Temp_Se', 'Stat_Temp_He',
+        'Stat_Temp_On', 'Stat_Temp_Mo'])
+    if RAW is None:
         logger.warning("No file found - ABORTING")
         return
 
-    RAW = pd.read_pickle(RawPikFile[0])
-
     fig = plt.figure(figsize=(14.0, 9.0))
     gs = gridspec.GridSpec(4, 1, height_ratios=[2, 1, 0.5, 0.5], figure=fig)
     gs.update(hspace=0.0)
@@ -377,14 +496,13 @@ def HK_Temperatures(PROC_DIR, Interact=False, limits=None):
         plt.show(block=False)
 
     # Search for PanCam CAL Processed Files
-    CalPikFile = pancam_fns.Find_Files(
-        PROC_DIR, "*Cal_HKTM.pickle", SingleFile=True)
-    if not CalPikFile:
+    Cal = sess.get('Cal_HKTM', [
+        'DT', 'Temp_LFW', 'Temp_RFW', 'Temp_HRC', 'Temp_LWAC', 'Temp_RWAC',
+        'Temp_HRCA', 'Temp_LDO'])
+    if Cal is None:
         logger.warning("No file found - ABORTING")
         return
 
-    Cal = pd.read_pickle(CalPikFile[0])
-
     # Calibrated Temperatures
     fig2 = plt.figure(figsize=(14.0, 9.0))
     gs2 = gridspec.GridSpec(2, 1, height_ratios=[3, 1], figure=fig2)
@@ -424,7 +542,7 @@ def HK_Temperatures(PROC_DIR, Interact=False, limits=None):
     logger.info("Producing Temperature Plots Completed")
 
 
-def Rover_Temperatures(PROC_DIR, Interact=False):
+def Rover_Temperatures(PROC_DIR, Interact=False, sess=None):
     """"Produces a Rover temperature plot from pickle files"""
 
     logger.info("Producing Rover Temperature Plot")
@@ -432,23 +550,18 @@ def Rover_Temperatures(PROC_DIR, Interact=False):
     HK_DIR = MakeHKPlotsDir(PROC_DIR)
 
     # Search for PanCam Rover Status Processed Files
-    RawPikFile = pancam_fns.Find_Files(
-        PROC_DIR, "*RoverStatus.pickle", SingleFile=True)
-    if not RawPikFile:
+    sess = session.Session.use(PROC_DIR, sess)
+    ROV = sess.get('RoverStatus', filt="*RoverStatus.pickle")
+    if ROV is None:
         logger.warning("No file found - ABORTING")
         return
 
-    ROV = pd.read_pickle(RawPikFile[0])
-
     # Search for PanCam Rover Temperature Processed Files
-    RawPikFile = pancam_fns.Find_Files(
-        PROC_DIR, "*RoverTemps.pickle", SingleFile=True)
-    if not RawPikFile:
+    TMP = sess.get('RoverTemps', filt="*RoverTemps.pickle")
+    if TMP is None:
         logger.warning("No file found - ABORTING")
         return
 
-    TMP = pd.read_pickle(RawPikFile[0])
-
     # Rover Temperatures
     fig = plt.figure(figsize=(14.0, 9.0))
     gs = gridspec.GridSpec(2, 1, height_ratios=[3, 1], figure=fig)
@@ -485,7 +598,7 @@ def Rover_Temperatures(PROC_DIR, Interact=False):
     logger.info("Producing Rover Temperature Plot Completed")
 
 
-def Rover_Power(PROC_DIR, Interact=False):
+def Rover_Power(PROC_DIR, Interact=False, sess=None):
     """"Produces a Rover power consumption plot from pickle files"""
 
     logger.info("Producing Rover Power Plot")
@@ -493,14 +606,12 @@ def Rover_Power(PROC_DIR, Interact=False):
     HK_DIR = MakeHKPlotsDir(PROC_DIR)
 
     # Search for PanCam Rover Status Processed Files
-    RawPikFile = pancam_fns.Find_Files(
-        PROC_DIR, "*RoverStatus.pickle", SingleFile=True)
-    if not RawPikFile:
+    sess = session.Session.use(PROC_DIR, sess)
+    ROV = sess.get('RoverStatus', filt="*RoverStatus.pickle")
+    if ROV is None:
         logger.warning("No file found - ABORTING")
         return
 
-    ROV = pd.read_pickle(RawPikFile[0])
-
     # Rover Current and Status Plot
     fig = plt.figure(figsize=(14.0, 9.0))
     gs = gridspec.GridSpec(2, 1, height_ratios=[3, 1], figure=fig)
@@ -572,7 +683,7 @@ def Rover_Power(PROC_DIR, Interact=False):
     logger.info("Producing Rover Power Plot Completed")
 
 
-def HK_Overview(PROC_DIR, Interact=False, limits=None):
+def HK_Overview(PROC_DIR, Interact=False, limits=None, sess=None):
     """"Produces an overview of the TCs, Power Status and Errors"""
 
     logger.info("Producing Overview Plot")
@@ -580,28 +691,24 @@ def HK_Overview(PROC_DIR, Interact=False, limits=None):
     HK_DIR = MakeHKPlotsDir(PROC_DIR)
 
     # Search for PanCam RAW Processed Files
-    RawPikFile = pancam_fns.Find_Files(
-        PROC_DIR, "*RAW_HKTM.pickle", SingleFile=True)
-    if not RawPikFile:
+    sess = session.Session.use(PROC_DIR, sess)
+    RAW = sess.get('RAW_HKTM', [
+        'DT', 'Stat_PIU_En', 'Stat_PIU_Pw', 'ERR_1_CMD', 'ERR_1_FW',
+        'ERR_2_LWAC', 'ERR_2_RWAC', 'ERR_3_HRC', 'IMG_No', 'TM_Type_ID'])
+    if RAW is None:
         logger.info("No RAW_HKTM file found - ABORTING")
         return
 
-    RAW = pd.read_pickle(RawPikFile[0])
-
     # Search for PanCam Rover Telecommands
     # May need to switch to detect if Rover TC or LabView TC
-    TCPikFile = pancam_fns.Find_Files(
-        PROC_DIR, "*Unproc_TC.pickle", SingleFile=True)
-    if not TCPikFile:
+    TC = sess.get('Unproc_TC', filt="*Unproc_TC.pickle")
+    if TC is None:
         logger.info("No TC file found - Leaving Blank")
         TC = pd.DataFrame()
         TCPlot = False
     else:
         TCPlot = True
 
-    if TCPlot:
-        TC = pd.read_pickle(TCPikFile[0])
-
     # RAW Plot and Heater
     fig = plt.figure(figsize=(14.0, 9.0))
     gs = gridspec.GridSpec(6, 1, height_ratios=[
@@ -720,7 +827,7 @@ def plot_subsets(fig, stem_path, limits):
             fig.savefig(fig_name)
 
 
-def HK_Deltas(PROC_DIR, Interact=False, limits=None):
+def HK_Deltas(PROC_DIR, Interact=False, limits=None, sess=None):
     """Produces a plot of the time gaps between HK generation"""
 
     logger.info("Producing HK Time Delta Plot")
@@ -728,28 +835,24 @@ def HK_Deltas(PROC_DIR, Interact=False, limits=None):
     HK_DIR = MakeHKPlotsDir(PROC_DIR)
 
     # Search for PanCam RAW Processed Files
-    RawPikFile = pancam_fns.Find_Files(
-        PROC_DIR, "*RAW_HKTM.pickle", SingleFile=True)
-    if not RawPikFile:
+    sess = session.Session.use(PROC_DIR, sess)
+    RAW = sess.get('RAW_HKTM', [
+        'DT', 'TM_Type_ID', 'Pkt_CUC', 'ERR_1_CMD', 'ERR_1_FW', 'ERR_2_LWAC',
+        'ERR_2_RWAC', 'ERR_3_HRC', 'CamRes_Chg'])
+    if RAW is None:
         logger.info("No RAW_HKTM file found - ABORTING")
         return
 
-    RAW = pd.read_pickle(RawPikFile[0])
-
     # Search for PanCam Rover Telecommands
     # May need to switch to detect if Rover TC or LabView TC
-    TCPikFile = pancam_fns.Find_Files(
-        PROC_DIR, "*Unproc_TC.pickle", SingleFile=True)
-    if not TCPikFile:
+    TC = sess.get('Unproc_TC', filt="*Unproc_TC.pickle")
+    if TC is None:
         logger.info("No TC file found - Leaving Blank")
         TC = pd.DataFrame()
         TCPlot = False
     else:
         TCPlot = True
 
-    if TCPlot:
-        TC = pd.read_pickle(TCPikFile[0])
-
     # RAW Plot and Heater
     fig = plt.figure(figsize=(14.0, 9.0))
     gs = gridspec.GridSpec(5, 1, height_ratios=[
@@ -836,7 +939,7 @@ def HK_Deltas(PROC_DIR, Interact=False, limits=None):
     logger.info("Producing HK Delta Plot Completed")
 
 
-def HRC_CS(PROC_DIR, Interact=False, limits=None):
+def HRC_CS(PROC_DIR, Interact=False, limits=None, sess=None):
     """Produces a plot of the HRC Camera Status from pickle files"""
 
     logger.info("Producing HRC Status Plots")
@@ -844,14 +947,14 @@ def HRC_CS(PROC_DIR, Interact=False, limits=None):
     HK_DIR = MakeHKPlotsDir(PROC_DIR)
 
     # Search for PanCam RAW Processed Files
-    RawPikFile = pancam_fns.Find_Files(
-        PROC_DIR, "*RAW_HKTM.pickle", SingleFile=True)
-    if not RawPikFile:
+    sess = session.Session.use(PROC_DIR, sess)
+    RAW = sess.get('RAW_HKTM', [
+        'DT', 'HRC_ACK', 'HRC_ENC', 'HRC_EPF', 'HRC_MMF', 'HRC_AFF',
+        'HRC_AIF', 'HRC_CS', 'HRC_IFC', 'HRC_TP'])
+    if RAW is None:
         logger.warning("No file found - ABORTING")
         return
 
-    RAW = pd.read_pickle(RawPikFile[0])
-
     if 'HRC_ACK' not in RAW:
         logger.info("No HRC data available")
         return
@@ -861,11 +964,9 @@ def HRC_CS(PROC_DIR, Interact=False, limits=None):
         return
 
     # Search for PanCam Telecommands
-    cal_tc_file = pancam_fns.Find_Files(
-        PROC_DIR, "*Cal_TC.pickle", SingleFile=True)
+    TC = sess.get('Cal_TC', filt="*Cal_TC.pickle")
 
-    if cal_tc_file:
-        TC = pd.read_pickle(cal_tc_file[0])
+    if TC is not None:
         hrc_tc = TC[TC['ACTION'] == 'HRC '].reset_index()
         logger.info("HRC plot using calibrated TC")
         TCPlot = True
@@ -875,11 +976,9 @@ def HRC_CS(PROC_DIR, Interact=False, limits=None):
         logger.info("No CAL TC file found")
         TCPlot = False
 
-        action_tc_file = pancam_fns.Find_Files(
-            PROC_DIR, "*Unproc_TC.pickle", SingleFile=True)
+        TC = sess.get('Unproc_TC', filt="*Unproc_TC.pickle")
 
-        if action_tc_file:
-            TC = pd.read_pickle(action_tc_file[0])
+        if TC is not None:
             logger.info("HRC plot using uncalibrated TCs")
             actionPlot = True
 
@@ -1008,31 +1107,29 @@ def HRC_CS(PROC_DIR, Interact=False, limits=None):
     logger.info("Producing HRC CS Plot Completed")
 
 
-def wac_res(proc_dir, Interact=False, limits=None):
+def wac_res(proc_dir, Interact=False, limits=None, sess=None):
 
     logger.info("Producing WAC Plot")
 
     hk_dir = MakeHKPlotsDir(proc_dir)
 
     # Search for PanCam RAW processed files
-    rawpikfile = pancam_fns.Find_Files(
-        proc_dir, "*RAW_HKTM.pickle", SingleFile=True)
-    if not rawpikfile:
+    sess = session.Session.use(proc_dir, sess)
+    raw = sess.get('RAW_HKTM', [
+        'DT', 'WAC_CID', 'WAC_WID', 'Stat_FWL_Po', 'Stat_FWR_Po',
+        'WAC_HK_INH', 'WAC_HK_MCO', 'WAC_HK_IAO', 'WAC_HK_TAO', 'WAC_HK_LTP'])
+    if raw is None:
         logger.warning("No file found - ABORTING")
         return
 
-    raw = pd.read_pickle(rawpikfile[0])
-
     if not 'WAC_CID' in raw:
         logger.info("No WAC data available")
         return
 
     # Search for PanCam TCs
-    cal_tc_file = pancam_fns.Find_Files(
-        proc_dir, "*Cal_TC.pickle", SingleFile=True)
+    tc = sess.get('Cal_TC', filt="*Cal_TC.pickle")
 
-    if cal_tc_file:
-        tc = pd.read_pickle(cal_tc_file[0])
+    if tc is not None:
         wac_tc = tc[(tc['ACTION'] == 'WACL ') | (
             tc['ACTION'] == 'WACR ')].reset_index()
         logger.info("WAC Res plot using calibrated TC")
@@ -1043,11 +1140,9 @@ def wac_res(proc_dir, Interact=False, limits=None):
         logger.info("No CAL TC file found")
         TCPlot = False
 
-        action_tc_file = pancam_fns.Find_Files(
-            proc_dir, "*Unproc_TC.pickle", SingleFile=True)
+        tc = sess.get('Unproc_TC', filt="*Unproc_TC.pickle")
 
-        if action_tc_file:
-            tc = pd.read_pickle(action_tc_file[0])
+        if tc is not None:
             logger.info("WAC Res plot using uncalibrated TCs")
             actionPlot = True
 
@@ -1188,7 +1283,7 @@ def wac_res(proc_dir, Interact=False, limits=None):
     logger.info("Producing WAC Plot Completed")
 
 
-def FW(PROC_DIR, Interact=False, limits=None):
+def FW(PROC_DIR, Interact=False, limits=None, sess=None):
     """"Produces a plot of the FW Status from pickle files"""
 
     logger.info("Producing FW Status Plots")
@@ -1196,28 +1291,25 @@ def FW(PROC_DIR, Interact=False, limits=None):
     HK_DIR = MakeHKPlotsDir(PROC_DIR)
 
     # Search for PanCam RAW Processed Files
-    RawPikFile = pancam_fns.Find_Files(
-        PROC_DIR, "*RAW_HKTM.pickle", SingleFile=True)
-    if not RawPikFile:
+    sess = session.Session.use(PROC_DIR, sess)
+    RAW = sess.get('RAW_HKTM', [
+        'DT', 'Stat_FWL_Op', 'Stat_FWR_Op', 'Stat_FWL_Ho', 'Stat_FWR_Ho',
+        'Stat_FWL_Id', 'Stat_FWR_Id', 'Stat_FWL_Po', 'Stat_FWR_Po',
+        'FWL_ABS', 'FWR_ABS', 'FWL_REL', 'FWR_REL'])
+    if RAW is None:
         logger.warning("No file found - ABORTING")
         return
 
-    RAW = pd.read_pickle(RawPikFile[0])
-
     # Search for PanCam Rover Telecommands
     # May need to switch to detect if Rover TC or LabView TC
-    TCPikFile = pancam_fns.Find_Files(
-        PROC_DIR, "*Unproc_TC.pickle", SingleFile=True)
-    if not TCPikFile:
+    TC = sess.get('Unproc_TC', filt="*Unproc_TC.pickle")
+    if TC is None:
         logger.info("No TC file found - Leaving Blank")
         TC = pd.DataFrame()
         TCPlot = False
     else:
         TCPlot = True
 
-    if TCPlot:
-        TC = pd.read_pickle(TCPikFile[0])
-
     # Create plot structure
     fig = plt.figure(figsize=(14.0, 9))
     gs = gridspec.GridSpec(7, 1,
@@ -1312,20 +1404,18 @@ def FW(PROC_DIR, Interact=False, limits=None):
     logger.info("Producing FW Status Plot Completed")
 
 
-def psu(proc_dir, Interact=False, limits=None):
+def psu(proc_dir, Interact=False, limits=None, sess=None):
 
     logger.info("Producing PSU Plot")
 
     hk_dir = MakeHKPlotsDir(proc_dir)
 
-    psupikfile = pancam_fns.Find_Files(proc_dir, "psu.pickle", SingleFile=True)
-
-    if not psupikfile:
+    sess = session.Session.use(proc_dir, sess)
+    data = sess.get('psu', filt="psu.pickle")
+    if data is None:
         logger.warning("No file found - ABORTING")
         return
 
-    data = pd.read_pickle(psupikfile[0])
-
     fig = plt.figure(figsize=(14.0, 9.0))
     gs = gridspec.GridSpec(2, 1, height_ratios=[3, 1], figure=fig)
     ax0 = fig.add_subplot(gs[0])
@@ -1404,7 +1494,7 @@ def psu(proc_dir, Interact=False, limits=None):
         plt.show(block=True)
 
 
-def ptu(proc_dir, Interact=False, limits=None):
+def ptu(proc_dir, Interact=False, limits=None, sess=None):
     """Produce a plot of the PTU positions over time.
 
     Args:
@@ -1417,16 +1507,14 @@ def ptu(proc_dir, Interact=False, limits=None):
 
     hk_dir = MakeHKPlotsDir(proc_dir)
 
-    pan_pik_file = pancam_fns.Find_Files(proc_dir, "ptu_pan.pickle", SingleFile=True)
-    tilt_pik_file = pancam_fns.Find_Files(proc_dir, "ptu_tilt.pickle", SingleFile=True)
+    sess = session.Session.use(proc_dir, sess)
+    pan_data = sess.get('ptu_pan', filt="ptu_pan.pickle")
+    tilt_data = sess.get('ptu_tilt', filt="ptu_tilt.pickle")
 
-    if (not pan_pik_file) | (not tilt_pik_file):
+    if (pan_data is None) | (tilt_data is None):
         logger.warning("No PTU pickle files found - ABORTING")
         return
 
-    pan_data = pd.read_pickle(pan_pik_file[0])
-    tilt_data = pd.read_pickle(tilt_pik_file[0])
-
     fig = plt.figure(figsize=(14.0, 9.0))
     gs = gridspec.GridSpec(2, 1, height_ratios=[1, 1], figure=fig)
     ax0 = fig.add_subplot(gs[0])
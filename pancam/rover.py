@@ -6,14 +6,20 @@ Created on Thu Oct 31 17:18:02 2019
 Parses Rover .ha and .csv files by extracting PanCam data.
 """
 
+import csv
+import io
+import os
+import re
+import numpy as np
 import pandas as pd
 from pathlib import Path
-from bitstruct import unpack_from as upf
+from functools import lru_cache
 import logging
 import imageio
 from datetime import datetime, timedelta
 
 import pancam_fns
+import manifest
 
 logger = logging.getLogger(__name__)
 status = logging.getLogger('status')
@@ -28,15 +34,62 @@ name_rov_hs = "AB.TM.MRSP8002"
 NAME_PAN_TM = "AB.TM.TRPR0479"
 NAME_TILT_TM = "AB.TM.TRPL0480"
 
+# STDRawOcds columns used and rows read at a time, only rows of these packets are kept
+RAWOCDS_COLS = ['NAME', 'RAW_DATA', 'GROUND_REFERENCE_TIME']
+RAWOCDS_NAMES = [name_hk_es, name_hk_ne, name_rov_ls, name_rov_hs]
+RAWOCDS_CHUNK = 100000
+
+# Bytes read at a time when searching the lines of a large .csv
+LINE_BLOCK = 1 << 24
+
+# STDParamAnalysis rows kept, those naming a PTU parameter
+PTU_NAMES = [re.compile(re.escape(name.encode()))
+             for name in (NAME_PAN_TM, NAME_TILT_TM)]
+
+# STDChrono rows kept, possible PanCam commands and 'LG' TEMPLATE rows giving
+# the rover model, those wanted are then selected by column
+CHRONO_ROWS = [re.compile(b'Pan Cam'), re.compile(b'LG')]
+ROVER_MODELS = {1: 'exm_pfm_ccs', 2: 'exm_gtm_ccs'}
+
+# Parsed STDChrono files by path, with the size and mtime they were read at
+_chrono_files = {}
+
+# PanCam parameters within the Rover HK as (name, Len, OffBy, OffBi), offsets
+# are from the start of the packet bytes after the 0x of RAW_DATA
+ROV_STATUS_PARAMS = (
+    ('RAW_Inst_Curr', 'u12', 85, 4),
+    ('RAW_HTR_Curr', 'u12', 57, 4),
+    ('HTR_ST', 'u1', 51, 2),
+    ('PWR_ST', 'u1', 77, 1),
+)
+
+# Thermistors within the low speed Rover HK moved with rover software updates,
+# each entry is (used before, description, params)
+ROV_TEMPS_VARIANTS = (
+    (datetime(2020, 2, 1), "old thermistor calibration 511,3 and 559,3",
+     (('RAW_PIU_T', 'u13', 511, 3), ('RAW_DCDC_T', 'u13', 559, 3))),
+    (datetime(2021, 2, 1), "thermistor calibration 508,3 and 556,3",
+     (('RAW_PIU_T', 's13', 508, 3), ('RAW_DCDC_T', 's13', 556, 3))),
+    (None, "new thermistor calibration 510,3 and 558,3",
+     (('RAW_PIU_T', 's13', 510, 3), ('RAW_DCDC_T', 's13', 558, 3))),
+)
+
 
 def TM_extract(ROV_DIR):
-    """Searches for TM with Rover files and creates a binary array of each file found"""
+    """Searches for TM with Rover files and creates a binary array of each file found.
+
+    Each STDRawOcds file is parsed into a part kept in PROC/PARTS and recorded
+    in the manifest, so on a rerun only new or changed files are read and the
+    parts are merged into the output pickles.
+
+    The files are read in chunks keeping only the PanCam HK and Rover HK rows,
+    so memory stays flat however many files there are.
+    """
 
     logger.info("Processing Rover TM Files")
-    DF = pd.DataFrame()
-    DRS = pd.DataFrame()
-    DRT = pd.DataFrame()
-    DG = pd.DataFrame()
+    hk_parts = []
+    status_parts = []
+    temps_parts = []
 
     TMfiles = pancam_fns.Find_Files(ROV_DIR, "STDRawOcds*.csv")
     if not TMfiles:
@@ -46,91 +99,38 @@ def TM_extract(ROV_DIR):
     DF_es_entries = 0
     DF_ne_entries = 0
 
-    # Read CSV files and parse
+    proc_dir = ROV_DIR / "PROC"
+    part_dir = proc_dir / "PARTS"
+    if not part_dir.is_dir():
+        part_dir.mkdir(parents=True)
+
+    tm_manifest = manifest.Manifest(proc_dir, "rover_tm")
+    part_params = {'Columns': RAWOCDS_COLS}
+    for old_part in tm_manifest.forget(TMfiles):
+        pancam_fns.exist_unlink(old_part)
+
+    # Read CSV files and parse, or reuse the part if already parsed
     for file in TMfiles:
-        logger.info("Reading %s", file.name)
-        DT = pd.read_csv(file, sep=';', header=0, index_col=False)
-
-        # Search for PanCam housekeeping
-        DF_es_entries += DT[DT['NAME'] == name_hk_es].shape[0]
-        DF_ne_entries += DT[DT['NAME'] == name_hk_ne].shape[0]
-
-        DL = DT[(DT['NAME'] == name_hk_es) | (
-            DT['NAME'] == name_hk_ne)].copy()
-        if not DL.empty:
-            DL['RAW'] = DL.RAW_DATA.apply(lambda x: x[38: -4])
-            DL['DT'] = pd.to_datetime(
-                DL['GROUND_REFERENCE_TIME'], format='%d/%m/%Y %H:%M:%S.%f')
-            DF = DF.append(DL[['RAW', 'DT']], ignore_index=True)
-
-        # Rover HK both low and high speed
-        DP = DT[(DT['NAME'] == name_rov_ls) | (
-            DT['NAME'] == name_rov_hs)].copy()
-        if not DP.empty:
-            DG = DP.RAW_DATA.apply(lambda x: x[2:])
-            DG = DG.apply(lambda x: bytearray.fromhex(x))
-            # PanCam Current
-            OffBy, OffBi, Len = 85, 4, 'u12'
-            DP['RAW_Inst_Curr'] = DG.apply(
-                lambda x: upf(Len, x, offset=8*OffBy+OffBi)[0])
-            DP['Inst_Curr'] = DP['RAW_Inst_Curr'] * 1.1111/4095
-            # PanCam Heater
-            OffBy, OffBi, Len = 57, 4, 'u12'
-            DP['RAW_HTR_Curr'] = DG.apply(
-                lambda x: upf(Len, x, offset=8*OffBy+OffBi)[0])
-            DP['HTR_Curr'] = DP['RAW_HTR_Curr'] * 1.1111/4095
-            # PanCam Heater Status
-            OffBy, OffBi, Len = 51, 2, 'u1'
-            DP['HTR_ST'] = DG.apply(lambda x: upf(
-                Len, x, offset=8*OffBy+OffBi)[0])
-            # PanCam Power Status
-            OffBy, OffBi, Len = 77, 1, 'u1'
-            DP['PWR_ST'] = DG.apply(lambda x: upf(
-                Len, x, offset=8*OffBy+OffBi)[0])
-            DP['DT'] = pd.to_datetime(
-                DP['GROUND_REFERENCE_TIME'], format='%d/%m/%Y %H:%M:%S.%f')
-            DRS = DRS.append(DP, ignore_index=True)
-
-        # Rover HK Thermistors Only contained within low speed HK
-        DK = DT.loc[DT['NAME'] == name_rov_ls].copy()
-        if not DK.empty:
-            DW = DK.RAW_DATA.apply(lambda x: x[2:])
-            DW = DW.apply(lambda x: bytearray.fromhex(x))
-            DK['DT'] = pd.to_datetime(
-                DK['GROUND_REFERENCE_TIME'], format='%d/%m/%Y %H:%M:%S.%f')
-
-            # Get first entry and determine if to use old or new cal
-            dtime0 = DK['DT'].iloc[0]
-            # If after Feb 2020 use new Cal
-            if dtime0 < datetime(2020, 2, 1):
-                logger.info("Using old thermistor calibration 511,3 and 559,3")
-                piu_loc = (511, 3, 'u13')
-                dcdc_loc = (559, 3, 'u13')
-
-            elif dtime0 < datetime(2021, 2, 1):
-                logger.info("Using thermistor calibration 508,3 and 556,3")
-                piu_loc = (508, 3, 's13')
-                dcdc_loc = (556, 3, 's13')
+        part_file = part_dir / (file.name + ".part")
+        if tm_manifest.is_current(file, part_params):
+            logger.info("Reusing parsed %s", file.name)
+            part = pd.read_pickle(part_file)
+        else:
+            part = read_rawocds(file)
+            pd.to_pickle(part, part_file)
+            tm_manifest.record(file, [part_file], part_params)
 
-            else:
-                logger.info("Using new thermistor calibration 510,3 and 558,3")
-                piu_loc = (510, 3, 's13')
-                dcdc_loc = (558, 3, 's13')
-
-            # PIU Temp
-            (OffBy, OffBi, Len) = piu_loc
-            DK['RAW_PIU_T'] = DW.apply(
-                lambda x: upf(Len, x, offset=8*OffBy+OffBi)[0])
-            # Calculated from thermistor curve provided
-            DK['PIU_T'] = DK['RAW_PIU_T']*0.18640 - 259.84097
-            # DCDC Temp
-            OffBy, OffBi, Len = dcdc_loc
-            DK['RAW_DCDC_T'] = DW.apply(
-                lambda x: upf(Len, x, offset=8*OffBy+OffBi)[0])
-            # Calculated from thermistor curve provided
-            DK['DCDC_T'] = DK['RAW_DCDC_T']*0.18640 - 259.84097
-
-            DRT = DRT.append(DK, ignore_index=True)
+        DF_es_entries += part['ES_Entries']
+        DF_ne_entries += part['NE_Entries']
+        hk_parts.append(part['HK'])
+        status_parts.append(part['Status'])
+        temps_parts.append(part['Temps'])
+
+    tm_manifest.save()
+
+    DF = pd.concat(hk_parts, ignore_index=True)
+    DRS = pd.concat(status_parts, ignore_index=True)
+    DRT = pd.concat(temps_parts, ignore_index=True)
 
     if (DF_es_entries > 0):
         logger.info(f"Number of PanCam HK Ess found: {DF_es_entries}")
@@ -146,20 +146,27 @@ def TM_extract(ROV_DIR):
     logger.info("Number of Rover Status Entries found: %d", DRS.shape[0])
     logger.info("Number of Rover Temperature Entries found: %d", DRT.shape[0])
 
+    # Outputs are named by their first time, remove any previous ones
+    for old_file in [*proc_dir.glob("*csv_Unproc_HKTM.*"),
+                     *proc_dir.glob("*RoverStatus.pickle"),
+                     *proc_dir.glob("*RoverTemps.pickle")]:
+        old_file.unlink()
+
     if DF.shape[0] != 0:
         write_dts = DF['DT'].iloc[0].strftime('%y%m%d_%H%M%S_')
         DF['Source'] = "STDRawOcds.csv"
-        DF.to_pickle(ROV_DIR / "PROC" / (write_dts + "csv_Unproc_HKTM.pickle"))
+        pancam_fns.write_unproc(DF.drop(columns='RAW'), DF['RAW'],
+                                proc_dir / (write_dts + "csv_Unproc_HKTM.pickle"))
         logger.info("PanCam HKTM pickled.")
 
     if DRS.shape[0] != 0:
         write_dts = DRS['DT'].iloc[0].strftime('%y%m%d_%H%M%S_')
-        DRS.to_pickle(ROV_DIR / "PROC" / (write_dts + "RoverStatus.pickle"))
+        DRS.to_pickle(proc_dir / (write_dts + "RoverStatus.pickle"))
         logger.info("Rover Status TM pickled.")
 
     if DRT.shape[0] != 0:
         write_dts = DRT['DT'].iloc[0].strftime('%y%m%d_%H%M%S_')
-        DRT.to_pickle(ROV_DIR / "PROC" / (write_dts + "RoverTemps.pickle"))
+        DRT.to_pickle(proc_dir / (write_dts + "RoverTemps.pickle"))
         logger.info("Rover Temperatures TM pickled.")
 
     logger.info("Processing Rover TM Files Completed")
@@ -167,10 +174,137 @@ def TM_extract(ROV_DIR):
     return True
 
 
+def read_rawocds(file):
+    """Parses a single STDRawOcds file for PanCam and Rover HK.
+
+    Arguments:
+        file {Path} -- the STDRawOcds .csv file.
+
+    Returns:
+        dict -- 'HK' PanCam TM, 'Status' Rover HK status, 'Temps' Rover
+                thermistors and the 'ES_Entries' and 'NE_Entries' counts.
+    """
+
+    logger.info("Reading %s", file.name)
+
+    # Only the rows of the wanted packets are kept from each chunk read
+    chunks = []
+    with pd.read_csv(file, sep=';', header=0, index_col=False,
+                     usecols=RAWOCDS_COLS, chunksize=RAWOCDS_CHUNK) as reader:
+        for chunk in reader:
+            chunk = chunk[chunk['NAME'].isin(RAWOCDS_NAMES)]
+            if not chunk.empty:
+                chunks.append(chunk)
+    if chunks:
+        DT = pd.concat(chunks)
+    else:
+        DT = pd.DataFrame(columns=RAWOCDS_COLS)
+
+    part = {'HK': pd.DataFrame(), 'Status': pd.DataFrame(),
+            'Temps': pd.DataFrame()}
+
+    # Search for PanCam housekeeping
+    part['ES_Entries'] = DT[DT['NAME'] == name_hk_es].shape[0]
+    part['NE_Entries'] = DT[DT['NAME'] == name_hk_ne].shape[0]
+
+    DL = DT[(DT['NAME'] == name_hk_es) | (
+        DT['NAME'] == name_hk_ne)].copy()
+    if not DL.empty:
+        DL['RAW'] = DL.RAW_DATA.apply(lambda x: x[38: -4])
+        DL['DT'] = pd.to_datetime(
+            DL['GROUND_REFERENCE_TIME'], format='%d/%m/%Y %H:%M:%S.%f')
+        part['HK'] = DL[['RAW', 'DT']]
+
+    # Rover HK both low and high speed
+    DP = DT[(DT['NAME'] == name_rov_ls) | (
+        DT['NAME'] == name_rov_hs)].copy()
+    if not DP.empty:
+        DG = pancam_fns.pack_hex(DP.RAW_DATA.str[2:])
+        raw = pancam_fns.decode_fields(DG.data, rov_plan(ROV_STATUS_PARAMS),
+                                       DG.lengths)
+        # PanCam Current
+        DP['RAW_Inst_Curr'] = raw['RAW_Inst_Curr']
+        DP['Inst_Curr'] = DP['RAW_Inst_Curr'] * 1.1111/4095
+        # PanCam Heater
+        DP['RAW_HTR_Curr'] = raw['RAW_HTR_Curr']
+        DP['HTR_Curr'] = DP['RAW_HTR_Curr'] * 1.1111/4095
+        # PanCam Heater and Power Status
+        DP['HTR_ST'] = raw['HTR_ST']
+        DP['PWR_ST'] = raw['PWR_ST']
+        DP['DT'] = pd.to_datetime(
+            DP['GROUND_REFERENCE_TIME'], format='%d/%m/%Y %H:%M:%S.%f')
+        part['Status'] = DP
+
+    # Rover HK Thermistors Only contained within low speed HK
+    DK = DT.loc[DT['NAME'] == name_rov_ls].copy()
+    if not DK.empty:
+        DW = pancam_fns.pack_hex(DK.RAW_DATA.str[2:])
+        DK['DT'] = pd.to_datetime(
+            DK['GROUND_REFERENCE_TIME'], format='%d/%m/%Y %H:%M:%S.%f')
+
+        # Location of the thermistors depends on the time of each entry
+        raw = decode_rov_variants(DW, DK['DT'], ROV_TEMPS_VARIANTS)
+
+        # PIU Temp, calculated from thermistor curve provided
+        DK['RAW_PIU_T'] = raw['RAW_PIU_T']
+        DK['PIU_T'] = DK['RAW_PIU_T']*0.18640 - 259.84097
+        # DCDC Temp, calculated from thermistor curve provided
+        DK['RAW_DCDC_T'] = raw['RAW_DCDC_T']
+        DK['DCDC_T'] = DK['RAW_DCDC_T']*0.18640 - 259.84097
+        part['Temps'] = DK
+
+    return part
+
+
+@lru_cache(maxsize=None)
+def rov_plan(params):
+    """Compiles and caches the pancam_fns.decode_fields plan of rover parameters."""
+    return pancam_fns.compile_fields(params)
+
+
+def decode_rov_variants(bin, times, variants):
+    """Decodes rover parameters whose location depends on the entry time.
+
+    Arguments:
+        bin {pancam_fns.BinMatrix} -- the packed packets.
+        times {pd.Series} -- time of each packet.
+        variants {tuple} -- of (before, description, params) in time order,
+                            each applying to entries before its datetime not
+                            covered by an earlier one, None for no limit.
+
+    Returns:
+        dict -- int64 array of each parameter keyed by name, float64 with
+                NaN for packets too short to hold it.
+    """
+
+    times = times.to_numpy()
+    remaining = np.ones(len(times), dtype=bool)
+    raw = {}
+
+    for before, description, params in variants:
+        rows = remaining.copy()
+        if before is not None:
+            rows &= times < np.datetime64(before)
+        remaining &= ~rows
+        if not rows.any():
+            continue
+
+        logger.info("Using %s for %d entries", description, rows.sum())
+        decoded = pancam_fns.decode_fields(bin.data[rows], rov_plan(params),
+                                           bin.lengths[rows])
+        for name, values in decoded.items():
+            column = raw.setdefault(name, np.zeros(len(times), dtype=np.int64))
+            if values.dtype != column.dtype:
+                column = raw[name] = column.astype(np.float64)
+            column[rows] = values
+
+    return raw
+
+
 def TC_extract(ROV_DIR):
+    """Searches for Rover STDChrono files and pickles the PanCam TCs of all of them."""
 
     logger.info("Processing Rover TC Files")
-    TC = pd.DataFrame()
 
     # Find all Rover TC files within folder and subfolders
     TCfiles = pancam_fns.Find_Files(ROV_DIR, "STDChrono*.csv")
@@ -178,40 +312,19 @@ def TC_extract(ROV_DIR):
         logger.error("No files found - ABORTING")
         return
 
-    # Read CSV file and parse
+    # Read CSV files and parse
+    tc_parts = []
     for file in TCfiles:
-        logger.info("Reading %s", file.name)
-        dt = pd.read_csv(file, sep=';', encoding="ISO-8859-1",
-                         header=0, dtype=object, index_col=False)
-
-        dp_rov_cmd = dt[dt['DESCRIPTION'].str.contains(
-            "Pan Cam", na=False) & dt['NAME'].str.contains("CRM", na=False)].copy()
-
-        dp_action_start = dt[dt['DESCRIPTION'].str.contains(
-            "Pan Cam", na=False) & dt['NAME'].str.contains("RMI000331", na=False)].copy()
-
-        if not dp_rov_cmd.empty:
-            TC_rov = dp_rov_cmd[['NAME', 'DESCRIPTION', 'GROUND_REFERENCE_TIME']].copy()
-            TC_rov['ACTION'] = dp_rov_cmd['DESCRIPTION'].map(lambda x: x.lstrip('Pan Cam'))
-        else:
-            TC_rov = pd.DataFrame()
-
-        # TC_action = pd.DataFrame()
-        if not dp_action_start.empty:
-            dm_action_start = dp_action_start['VARIABLE_PART'].str.split(',', -1, expand=True).copy()
-            dm_action_start['ACTION_CODE'] = dm_action_start[17]
-            dm_action_start['ACTION'] = dm_action_start['ACTION_CODE'].map(lambda x: x[x.find('=')+1: x.find('|')])
-            TC_action = pd.concat(
-                [dp_action_start[['NAME', 'DESCRIPTION', 'GROUND_REFERENCE_TIME']], dm_action_start['ACTION']], axis=1)
-        else:
-            TC_action = pd.DataFrame()
-
-        TC = pd.concat([TC_rov, TC_action])
+        chrono = read_chrono(file)
+        TC = pd.concat([chrono['Commands'], chrono['Actions']])
 
         if not TC.empty:
             TC['DT'] = pd.to_datetime(
                 TC['GROUND_REFERENCE_TIME'], format='%d/%m/%Y %H:%M:%S.%f')  # + pd.DateOffset(hours=2)
             TC['LEVEL'] = 1
+            tc_parts.append(TC)
+
+    TC = pd.concat(tc_parts) if tc_parts else pd.DataFrame()
 
     logger.info("Number of PanCam TCs found: %d", TC.shape[0])
 
@@ -223,6 +336,63 @@ def TC_extract(ROV_DIR):
     logger.info("Processing Rover TC Files Completed")
 
 
+def read_chrono(file):
+    """Reads the PanCam TCs and the rover model from a STDChrono file.
+
+    The PanCam and 'LG' TEMPLATE rows are copied out in a single pass with
+    match_lines and only those are parsed. The result is kept so TC_extract
+    and type share the one read while the file is unchanged.
+
+    Arguments:
+        file {Path} -- the STDChrono .csv file.
+
+    Returns:
+        dict -- 'Commands' the PanCam CRM commands and 'Actions' the RMI000331
+                action starts, both with an ACTION column, and 'Model' the
+                rover model given by the first 'LG' row or None.
+    """
+
+    stat = os.stat(file)
+    cached = _chrono_files.get(file)
+    if cached and cached[0] == (stat.st_size, stat.st_mtime_ns):
+        return cached[1]
+
+    logger.info("Reading %s", file.name)
+    header, lines, line_nos = match_lines(file, CHRONO_ROWS)
+    dt = pd.read_csv(io.BytesIO(header + b''.join(lines)), sep=';',
+                     encoding="ISO-8859-1", header=0, dtype=object,
+                     index_col=False)
+    dt.index = line_nos
+    chrono = {'Commands': pd.DataFrame(), 'Actions': pd.DataFrame(),
+              'Model': None}
+    tc_cols = ['NAME', 'DESCRIPTION', 'GROUND_REFERENCE_TIME']
+
+    pancam = dt['DESCRIPTION'].str.contains("Pan Cam", na=False, regex=False)
+    names = dt['NAME'].fillna('')
+
+    dp_rov_cmd = dt[pancam & names.str.contains("CRM", regex=False)]
+    if not dp_rov_cmd.empty:
+        TC_rov = dp_rov_cmd[tc_cols].copy()
+        TC_rov['ACTION'] = dp_rov_cmd['DESCRIPTION'].map(lambda x: x.lstrip('Pan Cam'))
+        chrono['Commands'] = TC_rov
+
+    dp_action_start = dt[pancam & names.str.contains("RMI000331", regex=False)]
+    if not dp_action_start.empty:
+        action_code = dp_action_start['VARIABLE_PART'].str.split(',', expand=True)[17]
+        chrono['Actions'] = pd.concat(
+            [dp_action_start[tc_cols],
+             action_code.map(lambda x: x[x.find('=')+1: x.find('|')]).rename('ACTION')],
+            axis=1)
+
+    if 'TEMPLATE' in dt:
+        dp_model = dt.loc[dt['TEMPLATE'] == 'LG', 'VARIABLE_PART'].dropna()
+        if not dp_model.empty:
+            chrono['Model'] = dp_model.iloc[0].split(',')[-3]
+
+    _chrono_files[file] = ((stat.st_size, stat.st_mtime_ns), chrono)
+    return chrono
+
+
 def NavCamBrowse(ROV_DIR):
     """Searches for PGM files and creates an 8-bit .png to browse"""
 
@@ -242,43 +412,32 @@ def NavCamBrowse(ROV_DIR):
 def type(ROV_DIR):
     """Returns the Rover model"""
 
-    # Constants
-    sources = {1: 'exm_pfm_ccs', 2: 'exm_gtm_ccs'}
-
     logger.info("Searching for Rover model")
 
     # Find all Rover TC files within folder and subfolders
     TCfiles = pancam_fns.Find_Files(ROV_DIR, 'STDChrono*.csv')
-
-    if TCfiles:
-        # Read CSV file and parse to find model
-        file = TCfiles[0]
-        logger.info("Reading %s", file.name)
-        dt = pd.read_csv(file, sep=';', encoding="ISO-8859-1",
-                         header=0, dtype=object, index_col=False)
-    else:
+    if not TCfiles:
         logger.error("Unable to find details of Rover type")
 
-    try:
-        # Try to search logs for known entry
-        dp = dt[dt['TEMPLATE'] == 'LG'].iloc[0]
-        dm = dp['VARIABLE_PART']
-        model = dm.split(',')[-3]
-        if model not in sources.values():
-            raise ValueError("Unrecognised Rover model")
+    # Search logs for known entry, the first file containing one
+    model = None
+    for file in TCfiles:
+        model = read_chrono(file)['Model']
+        if model is not None:
+            break
 
-    except:
+    if model not in ROVER_MODELS.values():
         # If not found then ask user
         usr_ch = input(
             'Unable to determine Rover model, select as appropriate:\n'
-            f'\t{sources[1]}: [1 = Default]\n'
-            f'\t{sources[2]}: [2]\n\n'
+            f'\t{ROVER_MODELS[1]}: [1 = Default]\n'
+            f'\t{ROVER_MODELS[2]}: [2]\n\n'
             'Selection:  ')
 
         try:
-            model = sources[int(usr_ch)]
+            model = ROVER_MODELS[int(usr_ch)]
         except:
-            model = sources[1]
+            model = ROVER_MODELS[1]
 
     return model
 
@@ -298,6 +457,82 @@ def sw_ver(ROV_DIR):
     return rmsw_ver
 
 
+def match_lines(file, patterns):
+    """Copies out the lines of a text file matching any of several patterns.
+
+    The file is read in blocks and only the lines containing a match are
+    kept, so a large file is searched without parsing every row. Each pattern
+    is searched for separately, as a single literal is found much faster than
+    an alternation of them.
+
+    Arguments:
+        file {Path} -- the file, its first line is the header.
+        patterns {list} -- compiled bytes patterns searched for.
+
+    Returns:
+        bytes -- the header line.
+        list -- the matching lines as bytes.
+        list -- the row number of each matching line, 0 the line after the header.
+    """
+
+    lines = []
+    line_nos = []
+    line_no = 0
+    with open(file, 'rb') as f:
+        header = f.readline()
+        tail = b''
+        while True:
+            block = f.read(LINE_BLOCK)
+            if not block:
+                # Last line may not end with a new line
+                block, tail = tail + b'\n', b''
+                if block == b'\n':
+                    break
+            else:
+                block, tail = tail + block, b''
+                last = block.rfind(b'\n') + 1
+                block, tail = block[:last], block[last:]
+
+            found = sorted(match.span() for pattern in patterns
+                           for match in pattern.finditer(block))
+            line_end = 0
+            for start, end in found:
+                if start < line_end:
+                    continue
+                line_start = block.rfind(b'\n', 0, start) + 1
+                line_no += block.count(b'\n', line_end, line_start)
+                line_end = block.find(b'\n', end) + 1
+                lines.append(block[line_start:line_end])
+                line_nos.append(line_no)
+                line_no += 1
+            line_no += block.count(b'\n', line_end)
+
+    return header, lines, line_nos
+
+
+def read_paramanalysis(file):
+    """Reads the PTU rows of a STDParamAnalysis file.
+
+    A mix of ';' and ',' are used as separators. Rather than parse the whole
+    file with a regex separator the lines naming a PTU parameter are copied
+    out and only those have ',' replaced by ';' and are parsed.
+
+    Arguments:
+        file {Path} -- the STDParamAnalysis .csv file.
+
+    Returns:
+        pd.DataFrame -- rows of the file that may be PTU parameters, with the
+                        index of each within the file.
+    """
+
+    header, lines, line_nos = match_lines(file, PTU_NAMES)
+    text = (header + b''.join(lines)).replace(b',', b';')
+    ptu = pd.read_csv(io.BytesIO(text), sep=';', header=0, index_col=False,
+                      quoting=csv.QUOTE_NONE)
+    ptu.index = line_nos
+    return ptu
+
+
 def ptu_extract(ROV_DIR):
     """Searches for a STDParamAnalysis.csv and if found extracts all PTU TMs into a pickle file
 
@@ -318,26 +553,25 @@ def ptu_extract(ROV_DIR):
         logger.warning("No STDParamAnalysis*.csv files found - Skipping PTU parsing")
         return False
 
-    raw_pan = pd.DataFrame()
-    raw_tilt = pd.DataFrame()
-
-    # Read top of first file to get column names
-    # Necessary as a mix of ';' and ',' are used as seperators
+    pan_parts = []
+    tilt_parts = []
 
     for file in std_files:
         logger.info("Reading %s", file.name)
+        raw_ptufile = read_paramanalysis(file)
 
-        # Import from CSV, drop duplicates (as coming from multiple packets)
-        raw_ptufile = pd.read_csv(file, sep=';|,', header=0, index_col=False, engine='python')
+        # Drop duplicates (as coming from multiple packets)
         raw_ptufile.drop_duplicates(subset=["NAME", "ON_BOARD_TIME", "RAW_DATA"], inplace=True)
-        #raw_ptufile[~raw_ptufile.duplicated(subset=["NAME", "ON_BOARD_TIME", "RAW_DATA"])]
         raw_ptufile['DT'] = pd.to_datetime(raw_ptufile['ON_BOARD_TIME'], format='%d/%m/%Y %H:%M:%S.%f')
 
         # Remove RAW zero values
         raw_ptufile = raw_ptufile[raw_ptufile.RAW_DATA > 0]
 
-        raw_pan = raw_pan.append(raw_ptufile[raw_ptufile.NAME == NAME_PAN_TM])
-        raw_tilt = raw_tilt.append(raw_ptufile[raw_ptufile.NAME == NAME_TILT_TM])
+        pan_parts.append(raw_ptufile[raw_ptufile.NAME == NAME_PAN_TM])
+        tilt_parts.append(raw_ptufile[raw_ptufile.NAME == NAME_TILT_TM])
+
+    raw_pan = pd.concat(pan_parts)
+    raw_tilt = pd.concat(tilt_parts)
 
     pan_entries = raw_pan.shape[0]
     tilt_entries = raw_tilt.shape[0]
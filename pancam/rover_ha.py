@@ -12,15 +12,22 @@ from re import split
 import numpy as np
 import pandas as pd
 import json
-from collections import namedtuple
-import binascii  # Used if wanting to output ascii to terminal
-import math
+from collections import namedtuple, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import binascii
 import bitstruct
+import mmap
+import multiprocessing
+import os
+import re
+import tempfile
+import zipfile
 from datetime import datetime
 from pathlib import Path
 import logging
 
 import pancam_fns
+import manifest
 from image_hdr_raw import decodeRAW_ImgHDR
 
 logger = logging.getLogger(__name__)
@@ -31,16 +38,95 @@ ProcInfo = {'HaImageProcVer': 0.8}
 Found_IDS = {}
 Buffer = {}
 EndBuffer = {}
+Ldt_Count = 0
+Ha_File = None
+Ha_Written = {}
 LDT_IDs = ["AB.TM.MRSS0697",
            "AB.TM.MRSS0698",
            "AB.TM.MRSS0699"]
 RMSW_VER = 2.0
 
+# Each packet within a .ha data block starts with four header lines, the last
+# being its <LENGTH> in bytes, followed by its hex with 32 bytes per line
+HA_PKT_HEADER = re.compile(rb'([^\n]*)\n([^\n]*)\n([^\n]*)\n([^\n]*)\n')
+HA_LINE_BYTES = 32
+
+# Sidecar index of the packets within a .ha file, written to HA_INDEX_DIR of
+# PROC as <name>.ha.idx, in the subfolder of the .ha file within the rover
+# directory, and reused while the .ha file size and mtime are unchanged
+HA_INDEX_DIR = "HA_INDEX"
+HA_INDEX_VER = 1
+HA_INDEX_DTYPE = np.dtype([('offset', '<i8'), ('pkt_id', 'S32'),
+                           ('length', '<i4'), ('start', '<i8'), ('end', '<i8'),
+                           ('cuc', '<i8'), ('unit_id', '<i4'), ('seq_no', '<i4')])
+
+# Record of an LDT packet decoded by ha_ldt_parts, part is its index in LDT_IDs
+LDT_PART_DTYPE = np.dtype([('part', 'u1'), ('unit_id', '<i4'), ('seq_no', '<i4'),
+                           ('offset', '<i8'), ('length', '<i8')])
+
+# Most LDT files open at once while parts are appended
+WRITER_POOL_SIZE = 16
+
+# PanCam LDT files up to LDT_MEMORY_MAX bytes are assembled in memory, others
+# are appended to their file as received. Those assembled that receive no part
+# in LDT_QUIET_PARTS LDT packets, checked every LDT_QUIET_CHECK, are written
+# out and continued on disk.
+LDT_MEMORY_MAX = 1 << 27
+LDT_QUIET_PARTS = 10000
+LDT_QUIET_CHECK = 1000
+
+# Value of each hex character, 0xFF if not one
+HA_HEX_VALUES = np.full(256, 0xFF, dtype=np.uint8)
+for _value, _char in enumerate(b'0123456789abcdef'):
+    HA_HEX_VALUES[_char] = HA_HEX_VALUES[bytes([_char]).upper()[0]] = _value
+
+# Packet length of the HK raw files written by ha_scan, by their suffix
+HK_RAW_LINE_LEN = {'.HKES_raw': 72, '.HKNE_raw': 88}
+
 
 class HaReadError(Exception):
     """error for unexpected things"""
 
 
+class WriterPool(object):
+    """Files LDT parts are appended to, kept open between parts.
+
+    Once size files are open the least recently written is closed, it is
+    opened again if more parts arrive.
+
+    Keyword Arguments:
+        size {int} -- most files open at once. (default: {WRITER_POOL_SIZE})
+    """
+
+    def __init__(self, size=WRITER_POOL_SIZE):
+        self.size = size
+        self.files = OrderedDict()
+
+    def write(self, path, data):
+        """Appends data to the file at path."""
+        wf = self.files.pop(path, None)
+        if wf is None:
+            if len(self.files) >= self.size:
+                self.files.popitem(last=False)[1].close()
+            wf = open(path, 'ab')
+        self.files[path] = wf
+        wf.write(data)
+
+    def close(self, path):
+        """Flushes and closes the file at path if open."""
+        wf = self.files.pop(path, None)
+        if wf is not None:
+            wf.close()
+
+    def close_all(self):
+        """Flushes and closes all open files."""
+        while self.files:
+            self.files.popitem()[1].close()
+
+
+Writers = WriterPool()
+
+
 class LdtProperties(object):
     """Creates a LDT class for tracking those found"""
 
@@ -80,6 +166,15 @@ class LdtProperties(object):
         self.write_completed = False
         self.write_occurrence = 0
 
+        # Files written are recorded against the .ha file of the first part
+        self.ha_file = Ha_File
+
+        # File assembled in memory and written once complete, else the file
+        # on disk the parts are appended to
+        self.data = None
+        self.disk_file = None
+        self.last_part = Ldt_Count
+
     def set_write_file(self, dir):
         """Generates a path for the file found either ldt_raw or nav_raw"""
         if self.pancam:
@@ -99,12 +194,82 @@ class LdtProperties(object):
                 + '.nav_raw.partial'
             self.write_file = dir / 'LDT_RAW' / write_filename
 
+        Writers.close(self.write_file)
         pancam_fns.exist_unlink(self.write_file)
         logger.info("Creating file: %s", self.write_file.name)
 
-    def update_write(self, Data):
-        """The running tally of the number of bytes written to the file"""
+        if self.pancam and (self.file_size <= LDT_MEMORY_MAX):
+            self.data = bytearray(self.file_size)
+        else:
+            if self.pancam:
+                logger.warning("FILE_SIZE %d of unitID %d too large to assemble - writing parts as received",
+                               self.file_size, self.unit_id)
+            self.disk_file = self.write_file
+            self.wrote(self.write_file)
+
+    def wrote(self, path):
+        """Records path as written by the .ha file scan"""
+        Ha_Written[path] = self.ha_file
+
+    def add_part(self, Data):
+        """Places the next part of the file after those already received"""
+        if self.data is None:
+            Writers.write(self.disk_file, Data)
+        else:
+            self.data[self.written_len:self.written_len + len(Data)] = Data
         self.written_len += len(Data)
+        self.last_part = Ldt_Count
+
+    def read_data(self, start, end):
+        """Returns bytes start to end of the file received so far"""
+        end = min(end, self.written_len)
+        if self.data is not None:
+            return bytes(self.data[start:end])
+        Writers.close(self.disk_file)
+        with open(self.disk_file, 'rb') as f:
+            f.seek(start)
+            return f.read(max(0, end - start))
+
+    def write_data(self, path, length=None):
+        """Writes the file received so far, or its first length bytes, to path"""
+        if length is None:
+            length = self.written_len
+        length = min(length, self.written_len)
+        self.wrote(path)
+
+        if self.data is not None:
+            with open(path, 'wb') as wf:
+                wf.write(memoryview(self.data)[:length])
+            return
+
+        # Parts on disk are moved, or copied if only the first bytes are kept
+        Writers.close(self.disk_file)
+        if path == self.disk_file:
+            return
+        if length < self.written_len:
+            with open(self.disk_file, 'rb') as rf, open(path, 'wb') as wf:
+                wf.write(rf.read(length))
+            self.disk_file.unlink()
+        else:
+            os.replace(self.disk_file, path)
+        self.disk_file = path
+
+    def release(self):
+        """Frees the file assembled in memory, later parts are appended to the file written"""
+        if self.data is not None:
+            self.data = None
+            self.disk_file = self.write_file
+
+    def spill(self):
+        """Writes a file assembled in memory as received so far and continues it on disk"""
+        if self.data is not None:
+            self.write_partial()
+            self.release()
+
+    def write_partial(self):
+        """Writes an incomplete file under its .partial name"""
+        logger.info("Writing incomplete file: %s", self.write_file.name)
+        self.write_data(self.write_file)
 
     def move_hk(self):
         """Moves PanCam HK to PROC directory and renames as appropriate for HKNE or HKES"""
@@ -123,8 +288,8 @@ class LdtProperties(object):
         new_hk_dir = self.write_file.parents[1]
         pancam_fns.exist_unlink(new_hk_dir / new_hk_filename, logging.WARNING)
 
-        logger.info("Moving file: %s up a dir", new_hk_filename)
-        self.write_file.rename(new_hk_dir / new_hk_filename)
+        logger.info("Writing file: %s up a dir", new_hk_filename)
+        self.write_data(new_hk_dir / new_hk_filename)
         self.write_file = new_hk_dir / new_hk_filename
 
     def verify_img(self):
@@ -137,10 +302,7 @@ class LdtProperties(object):
         else:
             raw_img_sze = 2097200
 
-        with open(self.write_file, 'rb') as tm_pkt:
-            tm_hdr_bytes = tm_pkt.read(11)
-
-        tm_pkt_hdr = pkt_identify(tm_hdr_bytes)
+        tm_pkt_hdr = pkt_identify(self.read_data(0, 11))
 
         # Check for uncompressed files first
         # 1024 x 1024 pixels
@@ -150,11 +312,7 @@ class LdtProperties(object):
             logger.info("Restructuring to .pci_raw format")
             new_file = self.write_file.with_suffix(".pci_raw")
             pancam_fns.exist_unlink(new_file)
-            with open(self.write_file, 'rb') as in_file:
-                with open(new_file, 'wb') as out_file:
-                    out_file.write(
-                        in_file.read()[:2097200])
-            self.write_file.unlink()
+            self.write_data(new_file, 2097200)
             self.write_file = new_file
 
         # Check if multiple files in the same packet
@@ -164,10 +322,7 @@ class LdtProperties(object):
 
             new_file = self.write_file.with_suffix(".pci_multiple")
             pancam_fns.exist_unlink(new_file)
-            with open(self.write_file, 'rb') as in_file:
-                with open(new_file, 'wb') as out_file:
-                    out_file.write(in_file.read())
-            self.write_file.unlink()
+            self.write_data(new_file)
             self.write_file = new_file
 
         else:
@@ -180,7 +335,7 @@ class LdtProperties(object):
 
             pancam_fns.exist_unlink(new_dir / new_file, logging.WARNING)
 
-            self.write_file.rename(new_dir / new_file)
+            self.write_data(new_dir / new_file)
             self.write_file = new_dir / new_file
 
     def create_json(self):
@@ -205,6 +360,7 @@ class LdtProperties(object):
 
         # Write LDT properties to a json file
         json_file = self.write_file.with_suffix(".json")
+        self.wrote(json_file)
         top_lvl_dict = {"Processing Info": ProcInfo,
                         "LDT Information": LDTSource}
         pancam_fns.exist_unlink(json_file)
@@ -212,7 +368,11 @@ class LdtProperties(object):
             json.dump(top_lvl_dict, f,  indent=4)
 
     def complete_file(self):
-        """Adds final part to LDT file and checks file length matches that in LDT header."""
+        """Adds final part to LDT file and checks file length matches that in LDT header.
+
+        The file is written once to its final name, or to its .partial name
+        if the length is not as expected.
+        """
         if self.write_completed:
             logger.error("%s unitID completed but attempt to complete again!", self.unit_id)
         else:
@@ -222,12 +382,10 @@ class LdtProperties(object):
 
             if (self.pancam):
                 if self.written_len == self.file_size:
-                    logger.info("Packet Length as expected - renaming")
+                    logger.info("Packet Length as expected - writing")
                     # Remove .partial from file name
-                    newFile = self.write_file.with_suffix("")
-                    pancam_fns.exist_unlink(newFile)
-                    self.write_file.rename(newFile)
-                    self.write_file = newFile
+                    self.write_file = self.write_file.with_suffix("")
+                    pancam_fns.exist_unlink(self.write_file)
 
                     if self.hk:
                         self.move_hk()
@@ -237,10 +395,17 @@ class LdtProperties(object):
                 else:
                     logger.error("Warning written length: %d not equal to FILE_SIZE %d ",
                                  self.written_len, self.file_size)
+                    self.write_partial()
+
+            else:
+                self.write_partial()
 
         self.navcam()
         self.create_json()
 
+        # Written so memory can be released
+        self.release()
+
     def navcam(self):
         """Specific handler for NavCam images that are checked for size and made into a pgm file."""
         if self.pancam:
@@ -253,19 +418,16 @@ class LdtProperties(object):
             name_new = self.write_file.with_suffix('.pgm').name
             dir_nav = self.write_file.parents[1] / 'NAVCAM'
             file_targ = dir_nav / name_new
+            self.wrote(file_targ)
             pancam_fns.exist_unlink(file_targ)
 
             logger.info('Creating pgm file: %s', name_new)
             pgm_hdr = bytes('P5\n1024 1024 255\n', 'utf8')
-            src = open(self.write_file, 'rb')
-            src.read(68)
 
             # Write file to NavCam
             with open(file_targ, 'wb') as f:
                 f.write(pgm_hdr)
-                f.write(src.read())
-
-            src.close()
+                f.write(self.read_data(68, self.written_len))
 
     def setOccurrence(self, occurrence):
         self.write_occurrence = occurrence
@@ -289,13 +451,26 @@ class LdtEnd:
         self.seq_no = unpacked[1]
 
 
-def ha_scan(ROV_DIR):
+def ha_scan(ROV_DIR, workers=None):
     """Searches for .ha Rover files and creates raw binary files
-    for each image found"""
+    for each image found
+
+    With more than one worker the .ha files are scanned in two phases, see
+    ha_scan_parallel.
+
+    Arguments:
+        ROV_DIR {Path} -- directory searched for .ha files.
+
+    Keyword Arguments:
+        workers {int} -- size of the process pool the files are scanned on,
+                         read one at a time in this process if 1.
+                         (default: {cpu count})
+    """
     logger.info("Processing Rover .ha Files")
 
     global Found_IDS
     global RMSW_VER
+    global Ha_File
 
     # Find Files
     ROVER_HA = pancam_fns.Find_Files(ROV_DIR, "*.ha")
@@ -321,53 +496,55 @@ def ha_scan(ROV_DIR):
     # Create directories
     proc_dir = ROV_DIR / "PROC"
 
-    created_directories = create_directories(ROV_DIR)
-
-    # Search through .ha files
-    PKT_HD = [None] * 4
+    # LDT files can span several .ha files so any change requires a full rescan
+    ha_manifest = manifest.Manifest(proc_dir, "rover_ha")
+    scan_params = {'RMSW Ver': RMSW_VER, 'Proc Ver': ProcInfo['HaImageProcVer']}
+    if ha_manifest.up_to_date(ROVER_HA, scan_params):
+        logger.info("No new or changed .ha files and outputs present - keeping previous scan")
+        return
 
-    for file in ROVER_HA:
-        with open(file, 'r') as curFile:
-            logger.info("Reading %s", file.name)
-            # Read ha header and perform basic check
-            HA_HEADER = [next(curFile) for x in range(5)]
-            if HA_HEADER[4] != "<BEGIN_DATA_BLOCK>\n":
-                raise HaReadError("<BEGIN_DATA_BLOCK>: Line not found")
-
-            # Read first packet header and determine packet type
-            PKT_HD[0] = next(curFile)
-            while PKT_HD[0] != "<END_DATA_BLOCK>\n":
-                PKT_HD[1:3] = [next(curFile) for x in range(3)]
-
-                if PKT_HD[3][0:8] != "<LENGTH>":
-                    raise HaReadError("<LENGTH>: Line not found")
-
-                # Look for LDT Packets
-                PKT_ID = PKT_HD[2][12:-1]
-                # Determine number of lines in data entry
-                PKT_LINES = math.ceil(pkt_Len(PKT_HD)/32)
-                if PKT_ID in LDT_IDs:
-                    # Read ha file using repeating pattern a packet head is 4 lines
-                    ha_pkt_decode(PKT_ID, PKT_LINES, curFile, proc_dir)
+    created_directories = create_directories(ROV_DIR)
+    Ha_Written.clear()
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    # Daemonic pool workers cannot start a pool of their own
+    if multiprocessing.current_process().daemon:
+        workers = 1
+    workers = max(1, min(workers, len(ROVER_HA)))
+
+    try:
+        # Search through .ha files, only LDT packets are decoded
+        if workers == 1:
+            for file in ROVER_HA:
+                logger.info("Reading %s", file.name)
+                Ha_File = file
+                for PKT_ID, _, _, PKT_Bin in ha_packets(file, proc_dir):
+                    if PKT_Bin is not None:
+                        ha_pkt_decode(PKT_ID, PKT_Bin, proc_dir)
+        else:
+            ha_scan_parallel(ROVER_HA, proc_dir, workers)
+
+        # Final buffer check
+        # Merge buffers
+        FinalBuf = {**Buffer, **EndBuffer}
+        if len(FinalBuf) > 0:
+            logger.error("Items remaining in buffers")
+            for item in FinalBuf:
+                logger.info(item)
+                if item[0] in Found_IDS:
+                    Cur_LDT = Found_IDS.get(item[0])
+                    check_buffers(Cur_LDT)
                 else:
-                    for _ in range(PKT_LINES):
-                        next(curFile)
-
-                PKT_HD[0] = next(curFile)
-
-    # Final buffer check
-    # Merge buffers
-    FinalBuf = {**Buffer, **EndBuffer}
-    if len(FinalBuf) > 0:
-        logger.error("Items remaining in buffers")
-        for item in FinalBuf:
-            logger.info(item)
-            if item[0] in Found_IDS:
-                Cur_LDT = Found_IDS.get(item[0])
-                check_buffers(Cur_LDT)
-            else:
-                logger.error(
-                    "Initial LDT part not found for UnitID: %d", item[0])
+                    logger.error(
+                        "Initial LDT part not found for UnitID: %d", item[0])
+
+    finally:
+        # Incomplete LDT files are written as received so far
+        for Cur_LDT in Found_IDS.values():
+            if not Cur_LDT.write_completed:
+                Cur_LDT.write_partial()
+        Writers.close_all()
 
     if len(Buffer) + len(EndBuffer) > 0:
         logger.info("Still %d items in buffer", len(Buffer)+len(EndBuffer))
@@ -385,18 +562,431 @@ def ha_scan(ROV_DIR):
     clean_directories(created_directories)
 
     # Split any compressed images files if they contain multiple images
-    split_comp_files(proc_dir)
+    split_parts = split_comp_files(proc_dir)
+
+    # Each .ha file is recorded with the files written from the LDTs starting
+    # in it, so a rescan is made if any are removed
+    sources = {path.name: ha_file for path, ha_file in Ha_Written.items()}
+    for comp_file, parts in split_parts.items():
+        for part in parts:
+            Ha_Written[part] = sources.get(comp_file.name)
+
+    # HK raw files are recorded where hkraw2unproc_pickle will leave them
+    outputs = {}
+    for path, ha_file in Ha_Written.items():
+        if path.exists():
+            if path.suffix in HK_RAW_LINE_LEN:
+                path = hk_raw_target(path)
+            outputs.setdefault(ha_file, []).append(path)
+
+    ha_manifest.clear()
+    for file in ROVER_HA:
+        ha_manifest.record(file, outputs.get(file, []), params=scan_params)
+    ha_manifest.save()
 
     logger.info("Processing Rover .ha Files - Completed")
 
 
-def ha_pkt_decode(PKT_ID, PKT_LINES, curFile, dir_proc):
-    """Decodes the first packet"""
+def _ha_blocks(mm):
+    """Generates the position of each packet within a memory-mapped .ha file.
+
+    The header lines of each packet are matched in one go. The <LENGTH> of a
+    packet gives the size of its hex body, so the body is skipped without
+    reading it line by line.
+
+    Arguments:
+        mm {mmap} -- the mapped .ha file.
+
+    Generates:
+        int -- byte offset of the packet header.
+        bytes -- the packet ID.
+        int -- the packet length in bytes.
+        int -- byte offset of the start of the hex body.
+        int -- byte offset of the end of the hex body.
+    """
+
+    # ha header is five lines, the last starting the data block
+    pos = 0
+    for _ in range(4):
+        pos = mm.find(b'\n', pos) + 1
+    end = mm.find(b'\n', pos)
+    if (pos == 0) or (mm[pos:end].rstrip(b'\r') != b'<BEGIN_DATA_BLOCK>'):
+        raise HaReadError("<BEGIN_DATA_BLOCK>: Line not found")
+    pos = end + 1
+
+    while mm[pos:pos + 16] != b'<END_DATA_BLOCK>':
+        header = HA_PKT_HEADER.match(mm, pos)
+        if not header:
+            raise HaReadError("<END_DATA_BLOCK>: Line not found")
+
+        if header.group(4)[:8] != b'<LENGTH>':
+            raise HaReadError("<LENGTH>: Line not found")
+        length = int(header.group(4)[8:])
+        pkt_id = header.group(3).rstrip(b'\r')[12:]
+
+        # Skip to the end of the hex lines if they are all full length
+        start = header.end()
+        lines = -(-length // HA_LINE_BYTES)
+        eol = 2 if header.group(4).endswith(b'\r') else 1
+        end = start + 2*length + lines*eol
+        first_eol = start + min(2*length, 2*HA_LINE_BYTES) + eol - 1
+        if lines and ((mm.find(b'\n', start) != first_eol)
+                      or (mm[end - 1:end] != b'\n')):
+            end = start
+            for _ in range(lines):
+                end = mm.find(b'\n', end) + 1
+                if end == 0:
+                    raise HaReadError("Packet data incomplete")
+
+        yield pos, pkt_id, length, start, end
+        pos = end
+
+
+def _ha_index_array(blocks, heads):
+    """Returns the packet index of a .ha file as an array of HA_INDEX_DTYPE.
+
+    The CUC and LDT unit and sequence of all packets are decoded together from
+    the hex of their first 20 bytes, -1 where a packet is too short or its
+    first line does not hold them.
+
+    Arguments:
+        blocks {list} -- of the tuples generated by _ha_blocks.
+        heads {list} -- the first 40 hex characters of each packet.
+    """
+
+    packets = np.zeros(len(blocks), dtype=HA_INDEX_DTYPE)
+    if not blocks:
+        return packets
+    for name, column in zip(('offset', 'pkt_id', 'length', 'start', 'end'),
+                            zip(*blocks)):
+        packets[name] = column
+
+    nibbles = HA_HEX_VALUES[np.array(heads, dtype='S40').view(np.uint8)]
+    nibbles = nibbles.reshape(-1, 40)
+    valid = nibbles != 0xFF
+    head = (nibbles[:, 0::2].astype(np.int64) << 4) | nibbles[:, 1::2]
+
+    cuc = np.zeros(len(head), dtype=np.int64)
+    for byte in range(10, 16):
+        cuc = (cuc << 8) | head[:, byte]
+    packets['cuc'] = np.where(valid[:, :32].all(axis=1), cuc, -1)
+
+    is_ldt = valid.all(axis=1) & np.isin(
+        packets['pkt_id'], [pkt_id.encode() for pkt_id in LDT_IDs])
+    packets['unit_id'] = np.where(is_ldt, (head[:, 16] << 8) | head[:, 17], -1)
+    packets['seq_no'] = np.where(is_ldt, (head[:, 18] << 8) | head[:, 19], -1)
+
+    return packets
+
+
+def ha_index_path(ha_file, proc_dir):
+    """Returns the path of the sidecar packet index of a .ha file.
+
+    Arguments:
+        ha_file {Path} -- the .ha file.
+        proc_dir {Path} -- the PROC directory of the rover directory.
+    """
+
+    try:
+        rel_file = ha_file.relative_to(proc_dir.parent)
+    except ValueError:
+        rel_file = Path(ha_file.name)
+    return proc_dir / HA_INDEX_DIR / rel_file.with_name(ha_file.name + '.idx')
+
+
+def load_ha_index(ha_file, proc_dir):
+    """Reads the sidecar packet index of a .ha file.
+
+    Arguments:
+        ha_file {Path} -- the .ha file.
+        proc_dir {Path} -- the PROC directory holding the index.
+
+    Returns:
+        np.ndarray -- of HA_INDEX_DTYPE, or None if there is no index or the
+                      .ha file has changed size or mtime since it was made.
+    """
+
+    try:
+        with np.load(ha_index_path(ha_file, proc_dir)) as stored:
+            source = stored['source'].tolist()
+            packets = stored['packets']
+        stat = os.stat(ha_file)
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+        return None
+
+    if source != [HA_INDEX_VER, stat.st_size, stat.st_mtime_ns]:
+        return None
+    if packets.dtype != HA_INDEX_DTYPE:
+        return None
+    return packets
+
+
+def save_ha_index(ha_file, proc_dir, packets, stat):
+    """Writes the sidecar packet index of a .ha file.
+
+    Arguments:
+        ha_file {Path} -- the .ha file.
+        proc_dir {Path} -- the PROC directory holding the index.
+        packets {np.ndarray} -- of HA_INDEX_DTYPE.
+        stat {os.stat_result} -- of the .ha file when it was indexed.
+    """
+
+    idx_file = ha_index_path(ha_file, proc_dir)
+    tmp_file = idx_file.with_name(idx_file.name + '.tmp')
+    try:
+        idx_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp_file, 'wb') as f:
+            np.savez(f, packets=packets, source=np.array(
+                [HA_INDEX_VER, stat.st_size, stat.st_mtime_ns], dtype=np.int64))
+        os.replace(tmp_file, idx_file)
+    except OSError as err:
+        logger.warning("Unable to write packet index %s: %s", idx_file, err)
+        pancam_fns.exist_unlink(tmp_file)
+
+
+def _init_scan_worker():
+    """Ensures a pool worker has the console loggers."""
+    if not logging.getLogger().handlers:
+        pancam_fns.setup_logging()
+
+
+def ha_ldt_parts(ha_file, parts_file, proc_dir):
+    """Decodes the LDT packets of a .ha file into a parts file.
+
+    First phase of ha_scan_parallel, run on a pool worker. The packets are
+    written one after another to parts_file so only their records are
+    returned to the reassembly.
+
+    Arguments:
+        ha_file {Path} -- the .ha file.
+        parts_file {Path} -- file the decoded packets are written to.
+        proc_dir {Path} -- the PROC directory holding the packet index.
+
+    Returns:
+        np.ndarray -- of LDT_PART_DTYPE, a record per packet in file order.
+        HaReadError -- raised reading the file after the parts returned, or None.
+    """
+
+    parts = []
+    error = None
+    with open(parts_file, 'wb') as f:
+        try:
+            for PKT_ID, _, _, PKT_Bin in ha_packets(ha_file, proc_dir):
+                if PKT_Bin is None:
+                    continue
+                unit_id = seq_no = -1
+                if len(PKT_Bin) >= 20:
+                    unit_id, seq_no = bitstruct.unpack('u16u16', PKT_Bin[16:20])
+                parts.append((LDT_IDs.index(PKT_ID), unit_id, seq_no,
+                              f.tell(), len(PKT_Bin)))
+                f.write(PKT_Bin)
+        except HaReadError as err:
+            error = err
+
+    return np.array(parts, dtype=LDT_PART_DTYPE), error
+
+
+def ha_scan_parallel(ROVER_HA, proc_dir, workers):
+    """Scans .ha files in two phases, decoding on a process pool.
+
+    First the LDT packets of every file are indexed and decoded concurrently
+    by ha_ldt_parts. Then as the results of each file arrive, in file order,
+    its parts are passed to ha_pkt_decode, so LDT files spanning several .ha
+    files are stitched together exactly as when read one at a time.
+
+    Arguments:
+        ROVER_HA {list} -- the .ha files in the order they are to be read.
+        proc_dir {Path} -- the PROC directory.
+        workers {int} -- size of the process pool.
+    """
+
+    global Ha_File
+
+    status.info("Scanning %d .ha files with %d workers", len(ROVER_HA), workers)
+
+    with tempfile.TemporaryDirectory(prefix="ha_parts_", dir=proc_dir) as tmp_dir, \
+            ProcessPoolExecutor(max_workers=workers,
+                                initializer=_init_scan_worker) as pool:
+        parts_files = [Path(tmp_dir) / f"{num:06d}.ldt"
+                       for num in range(len(ROVER_HA))]
+        futures = [pool.submit(ha_ldt_parts, file, parts_file, proc_dir)
+                   for file, parts_file in zip(ROVER_HA, parts_files)]
+
+        for file, parts_file, future in zip(ROVER_HA, parts_files, futures):
+            logger.info("Reading %s", file.name)
+            Ha_File = file
+            parts, error = future.result()
+
+            if len(parts) > 0:
+                with open(parts_file, 'rb') as f, \
+                        mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    for part, _, _, offset, length in parts.tolist():
+                        ha_pkt_decode(LDT_IDs[part],
+                                      mm[offset:offset + length], proc_dir)
+            parts_file.unlink()
+
+            if error is not None:
+                for remaining in futures:
+                    remaining.cancel()
+                raise error
+
+
+def ha_packets(ha_file, proc_dir, decode_ids=LDT_IDs):
+    """Generates the packets within a .ha file.
+
+    The file is memory-mapped. If its sidecar packet index is current the
+    packets to decode are read directly from their recorded offsets, else the
+    file is scanned and the index written once the whole file has been read.
+
+    Arguments:
+        ha_file {Path} -- the .ha file.
+        proc_dir {Path} -- the PROC directory holding the packet index.
+
+    Keyword Arguments:
+        decode_ids {list} -- IDs of the packets to decode. (default: {LDT_IDs})
+
+    Generates:
+        str -- the packet ID.
+        int -- byte offset of the packet header within the file.
+        int -- the packet length in bytes.
+        bytes -- the packet if its ID is in decode_ids, else None.
+    """
+
+    decode_ids = {pkt_id.encode() for pkt_id in decode_ids}
+    packets = load_ha_index(ha_file, proc_dir)
+
+    with open(ha_file, 'rb') as f:
+        stat = os.fstat(f.fileno())
+        if stat.st_size == 0:
+            raise HaReadError("<BEGIN_DATA_BLOCK>: Line not found")
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if packets is not None:
+                wanted = np.isin(packets['pkt_id'], list(decode_ids))
+                for entry, decode in zip(packets.tolist(), wanted.tolist()):
+                    pos, pkt_id, length, start, end = entry[:5]
+                    PKT_Bin = None
+                    if decode:
+                        PKT_Bin = binascii.unhexlify(
+                            mm[start:end].translate(None, b'\r\n'))
+                    yield pkt_id.decode('ascii', 'replace'), pos, length, PKT_Bin
+                return
+
+            blocks = []
+            heads = []
+            for block in _ha_blocks(mm):
+                pos, pkt_id, length, start, end = block
+                blocks.append(block)
+                heads.append(mm[start:start + 40])
+
+                PKT_Bin = None
+                if pkt_id in decode_ids:
+                    PKT_Bin = binascii.unhexlify(
+                        mm[start:end].translate(None, b'\r\n'))
+
+                yield pkt_id.decode('ascii', 'replace'), pos, length, PKT_Bin
+
+    save_ha_index(ha_file, proc_dir, _ha_index_array(blocks, heads), stat)
+
+
+def ha_index(ha_file, proc_dir):
+    """Returns the sidecar packet index of a .ha file, creating it if not current.
+
+    Arguments:
+        ha_file {Path} -- the .ha file.
+        proc_dir {Path} -- the PROC directory holding the index.
+
+    Returns:
+        np.ndarray -- of HA_INDEX_DTYPE, one entry per packet in file order.
+    """
+
+    packets = load_ha_index(ha_file, proc_dir)
+    if packets is None:
+        for _ in ha_packets(ha_file, proc_dir, decode_ids=[]):
+            pass
+        packets = load_ha_index(ha_file, proc_dir)
+    return packets
+
+
+def ha_extract(ROV_DIR, start=None, end=None, pkt_ids=None, rov_type=None):
+    """Extracts the packets of the .ha files within a time range.
+
+    Only the packets selected from the sidecar index of each file are decoded.
+
+    Arguments:
+        ROV_DIR {Path} -- directory searched for .ha files.
+
+    Keyword Arguments:
+        start {datetime} -- earliest packet time, unbounded if None. (default: {None})
+        end {datetime} -- latest packet time, unbounded if None. (default: {None})
+        pkt_ids {list} -- packet IDs to extract, all if None. (default: {None})
+        rov_type {str} -- rover model setting the CUC epoch. (default: {None})
+
+    Returns:
+        pd.DataFrame -- a row per packet with its file, offset, ID, length,
+                        CUC, time, LDT unit and sequence and the packet bytes.
+    """
+
+    columns = ['File', 'Offset', 'PKT_ID', 'Length', 'Pkt_CUC', 'DT',
+               'Unit_ID', 'Seq_No', 'Bin']
+    found = []
+
+    proc_dir = ROV_DIR / "PROC"
+    for file in pancam_fns.Find_Files(ROV_DIR, "*.ha"):
+        try:
+            packets = ha_index(file, proc_dir)
+        except HaReadError as err:
+            logger.error("Unable to index %s: %s", file.name, err)
+            continue
+        if packets is None or len(packets) == 0:
+            continue
+
+        times = pd.DataFrame({'Pkt_CUC': packets['cuc']})
+        times['DT'] = pancam_fns.CUCtoUTC_DT(times, 'Rover', rov_type)
+        times.loc[times['Pkt_CUC'] < 0, 'DT'] = pd.NaT
+
+        keep = np.ones(len(packets), dtype=bool)
+        if start is not None:
+            keep &= (times['DT'] >= pd.Timestamp(start)).to_numpy()
+        if end is not None:
+            keep &= (times['DT'] <= pd.Timestamp(end)).to_numpy()
+        if pkt_ids is not None:
+            keep &= np.isin(packets['pkt_id'], [p.encode() for p in pkt_ids])
+        if not keep.any():
+            continue
+
+        selected = packets[keep]
+        with open(file, 'rb') as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            bins = [binascii.unhexlify(mm[s:e].translate(None, b'\r\n'))
+                    for s, e in zip(selected['start'].tolist(),
+                                    selected['end'].tolist())]
+
+        found.append(pd.DataFrame({
+            'File': file,
+            'Offset': selected['offset'],
+            'PKT_ID': np.char.decode(selected['pkt_id'], 'ascii'),
+            'Length': selected['length'],
+            'Pkt_CUC': selected['cuc'],
+            'DT': times['DT'].to_numpy()[keep],
+            'Unit_ID': selected['unit_id'],
+            'Seq_No': selected['seq_no'],
+            'Bin': bins}))
+
+    if not found:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(found, ignore_index=True)
+
+
+def ha_pkt_decode(PKT_ID, PKT_Bin, dir_proc):
+    """Decodes an LDT packet, writing its part to the file of its unitID"""
 
     global Found_IDS
+    global Ldt_Count
 
-    TXT_Data = [next(curFile)[:-1] for x in range(PKT_LINES)]
-    PKT_Bin = bytes.fromhex(''.join(TXT_Data))
+    Ldt_Count += 1
+    if Ldt_Count % LDT_QUIET_CHECK == 0:
+        spill_quiet()
 
     # First LDT Part
     if PKT_ID == LDT_IDs[0]:
@@ -422,6 +1012,8 @@ def ha_pkt_decode(PKT_ID, PKT_LINES, curFile, dir_proc):
             if not Found_IDS.get(LDT_Cur_Pkt.unit_id).write_completed:
                 logger.error(
                     "Previous FileID not completed, now adding to second FileID")
+                Found_IDS.get(LDT_Cur_Pkt.unit_id).write_partial()
+                Found_IDS.get(LDT_Cur_Pkt.unit_id).release()
 
         # Write packet contents to file
         if LDT_Cur_Pkt.write:
@@ -495,6 +1087,16 @@ def ha_pkt_decode(PKT_ID, PKT_LINES, curFile, dir_proc):
                     check_buffers(Cur_LDT)
 
 
+def spill_quiet():
+    """Writes out LDT files assembled in memory that have received no recent part"""
+    for cur_ldt in Found_IDS.values():
+        if (cur_ldt.data is not None) and (not cur_ldt.write_completed) \
+                and (Ldt_Count - cur_ldt.last_part > LDT_QUIET_PARTS):
+            logger.warning("No part of unitID %d in %d LDT packets - continuing on disk",
+                           cur_ldt.unit_id, Ldt_Count - cur_ldt.last_part)
+            cur_ldt.spill()
+
+
 def check_buffers(cur_ldt):
     """Function checks the LDT part buffer and end buffer to add parts already found out of sequence"""
 
@@ -524,16 +1126,12 @@ def check_buffers(cur_ldt):
         EndBuffer.pop(Expected_SEQ)
 
 
-def pkt_Len(PKT_HD):
-    return int(PKT_HD[3][8:])
-
-
 def write_bytes2file(CurLDT, Bytes):
-    """Function for writing to data file"""
-    with open(CurLDT.write_file, 'ab') as wf:
-        wf.write(Bytes)
-        CurLDT.written_len += len(Bytes)
-    return
+    """Function for adding the next part to the file assembled in memory"""
+    if CurLDT.write_completed:
+        # Already completed and written so appended to the file written
+        logger.warning("Part received for completed unitID %d", CurLDT.unit_id)
+    CurLDT.add_part(Bytes)
 
 
 def hkraw2unproc_pickle(proc_dir):
@@ -559,26 +1157,16 @@ def hkraw2unproc_pickle(proc_dir):
     NE = pd.DataFrame()
     raw_data = []
 
-    es_line_len = 72
-    ne_line_len = 88
+    es_line_len = HK_RAW_LINE_LEN['.HKES_raw']
+    ne_line_len = HK_RAW_LINE_LEN['.HKNE_raw']
 
     # Read files
     for curfile in RAW_ES:
         # Ignore if not all packets are complete
-        if curfile.stat().st_size % es_line_len != 0:
-
-            if hk_is_compressed(curfile):
-                # A compressed file so rename and move to folder
-                new_name = curfile.with_suffix('.HKES.tm_pkt_ccsds121').name
-                new_dir = curfile.parents[0] / "COMPRESSED_HK"
-                target = new_dir / new_name
-                pancam_fns.exist_unlink(target)
-                curfile.rename(target)
-            else:
-                # Else rename to incomplete file
-                target = curfile.with_suffix('.HKES_raw.incomplete')
-                pancam_fns.exist_unlink(target)
-                curfile.rename(target)
+        target = hk_raw_target(curfile)
+        if target != curfile:
+            pancam_fns.exist_unlink(target)
+            curfile.rename(target)
             continue
 
         with open(curfile, 'rb') as f:
@@ -593,19 +1181,10 @@ def hkraw2unproc_pickle(proc_dir):
 
     for curfile in RAW_NE:
         # Ignore if not all packets are complete
-        if curfile.stat().st_size % ne_line_len != 0:
-
-            if hk_is_compressed(curfile):
-                # A compressed file so rename and move to folder
-                new_name = curfile.with_suffix('.HKNE.tm_pkt_ccsds121').name
-                new_dir = curfile.parents[0] / "COMPRESSED_HK"
-                target = new_dir / new_name
-                pancam_fns.exist_unlink(target)
-                curfile.rename(target)
-            else:
-                target = curfile.with_suffix('.HKNE_raw.incomplete')
-                pancam_fns.exist_unlink(target)
-                curfile.rename(target)
+        target = hk_raw_target(curfile)
+        if target != curfile:
+            pancam_fns.exist_unlink(target)
+            curfile.rename(target)
             continue
 
         with open(curfile, 'rb') as f:
@@ -625,13 +1204,39 @@ def hkraw2unproc_pickle(proc_dir):
 
     # Then save file
     curName = (RAW_ES + RAW_NE)[0].stem
-    RTM.to_pickle(proc_dir / (curName + "_ha_Unproc_HKTM.pickle"))
+    pancam_fns.write_unproc(RTM.drop(columns='RAW'), RTM['RAW'],
+                            proc_dir / (curName + "_ha_Unproc_HKTM.pickle"))
 
     if not (any(dir_comp_hk.iterdir())):
         dir_comp_hk.rmdir()
         logger.info("No files found in COMPRESSED_HK dir. Removing")
 
 
+def hk_raw_target(curfile):
+    """Returns the path hkraw2unproc_pickle leaves a .HKES_raw or .HKNE_raw file at.
+
+    Files of only whole packets are read in place. Others are moved to the
+    COMPRESSED_HK folder if compressed, else renamed as incomplete.
+
+    Arguments:
+        curfile {Path} -- the HK raw file written by ha_scan.
+
+    Returns:
+        Path -- curfile if complete, else its new path.
+    """
+
+    if curfile.stat().st_size % HK_RAW_LINE_LEN[curfile.suffix] == 0:
+        return curfile
+
+    hk_type = curfile.suffix[:-len('_raw')]
+    if hk_is_compressed(curfile):
+        # A compressed file so rename and move to folder
+        new_name = curfile.with_suffix(hk_type + '.tm_pkt_ccsds121').name
+        return curfile.parents[0] / "COMPRESSED_HK" / new_name
+
+    return curfile.with_suffix(curfile.suffix + '.incomplete')
+
+
 def compare_ha2csv(ProcDir):
     """Looks for HK generated by .csv and .ha and compares the two.
     The majority of the time the .ha files contain more data."""
@@ -650,17 +1255,28 @@ def compare_ha2csv(ProcDir):
         logger.info("No .csv generated HK files found")
         return
 
-    ha_bin = pd.read_pickle(RAW_ha[0])
-    csv = pd.read_pickle(RAW_csv[0])
-    csv_bin = pd.DataFrame()
-    csv_bin['RAW'] = csv['RAW'].apply(lambda x: bytes.fromhex(x))
-    csv_bin = pancam_fns.ReturnCUC_RAW(csv_bin, csv_bin['RAW'])
-
-    result = pd.merge(ha_bin, csv_bin, on=['Pkt_CUC'], how='inner')
-    comp = result['RAW_x'] != result['RAW_y']
+    ha_tm, ha_bin = pancam_fns.read_unproc(RAW_ha[0])
+    csv_tm, csv_bin = pancam_fns.read_unproc(RAW_csv[0])
+
+    # Match on CUC by row position, then compare the packed packets
+    ha_cuc = pd.DataFrame({'Pkt_CUC': ha_bin.field('u48', 0, 16).values,
+                           'Row': np.arange(len(ha_bin))})
+    csv_cuc = pd.DataFrame({'Pkt_CUC': csv_bin.field('u48', 0, 16).values,
+                            'Row': np.arange(len(csv_bin))})
+    result = pd.merge(ha_cuc, csv_cuc, on=['Pkt_CUC'], how='inner')
+
+    ha_rows = ha_bin.data[result['Row_x'].values]
+    csv_rows = csv_bin.data[result['Row_y'].values]
+    width = min(ha_rows.shape[1], csv_rows.shape[1])
+    # Bytes beyond a packet's length are zero padding in both
+    comp = ((ha_bin.lengths[result['Row_x'].values] != csv_bin.lengths[result['Row_y'].values])
+            | (ha_rows[:, :width] != csv_rows[:, :width]).any(axis=1)
+            | (ha_rows[:, width:] != 0).any(axis=1)
+            | (csv_rows[:, width:] != 0).any(axis=1))
     mismatch = result[comp]
+    del ha_bin, csv_bin, ha_rows, csv_rows
 
-    if (len(result)-len(csv_bin)) < 0:
+    if (len(result)-len(csv_cuc)) < 0:
         # First check that all the CUC entries within csv_bin are in ha_bin
         logger.error(
             "HK Data contained entries within .csv HK not present in .ha HK")
@@ -674,6 +1290,7 @@ def compare_ha2csv(ProcDir):
         logger.info("HK Data matches")
         logger.info("Removing .csv HK file: %s", RAW_csv[0].name)
         Path.unlink(RAW_csv[0])
+        pancam_fns.exist_unlink(RAW_csv[0].with_suffix('.bin'))
 
 
 def pkt_identify(tm_header_bytes):
@@ -710,18 +1327,24 @@ def pkt_comp_hdr_decode(pkt):
 
 
 def split_comp_files(proc_dir):
-    """Searches through the compressed images folder, and splits files depending on header contents."""
+    """Searches through the compressed images folder, and splits files depending on header contents.
+
+    Returns:
+        dict -- each file split to the list of files written from it.
+    """
 
     CompDir = proc_dir / "Compressed_IMG"
 
     comp_files = pancam_fns.Find_Files(CompDir, "*.ldt_file")
 
+    written = {}
     if not comp_files:
         logger.info("No Compressed Images found")
-        return
+        return written
 
     for file in comp_files:
         pkt = 00
+        written[file] = []
         with open(file, "rb") as tm_pkt:
             tm_hdr_bytes = tm_pkt.read(11)
 
@@ -768,11 +1391,14 @@ def split_comp_files(proc_dir):
                 pancam_fns.exist_unlink(new_json_file)
                 with open(new_json_file, 'w') as f:
                     json.dump(pkt_json, f, indent=4)
+                written[file] += [file_part, new_json_file]
 
                 # Continue Loop
                 pkt += 1
                 tm_hdr_bytes = tm_pkt.read(11)
 
+    return written
+
 
 def hk_is_compressed(tm_file: Path):
     """Checks header of tm_file to see if compressed as ccsds121 with expected header
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""Holds the decoded tables of a PROC directory in memory.
+
+A session is created once by main.py and handed to each function, so a table
+such as hs or RAW_HKTM is read from disk once and then shared instead of
+every function searching for and reading it again. Tables put into the
+session are written to disk when the session is saved.
+
+Functions called without a session, such as from a module's own entry point
+or a stage run on a process pool, get a session that loads from disk and
+writes each table as soon as it is put, so they behave as before. Tables are
+only shared within a process, a session is saved before other processes read
+its products and cleared after they have written theirs.
+
+Tables returned by get share their data with the session, columns may be
+added to them but values are not to be changed in place.
+
+:copyright: (c) 2020 by Barry J Whiteside. Mullard Space Science Laboratory - UCL
+
+:license: GPLv3, see LICENSE for more details.
+"""
+
+import logging
+
+import pancam_fns
+
+logger = logging.getLogger(__name__)
+status = logging.getLogger('status')
+
+
+class Session(object):
+    """Decoded tables of a PROC directory, loaded on first use.
+
+    Arguments:
+        proc_dir {Path} -- the PROC directory tables are found in.
+
+    Keyword Arguments:
+        autosave {bool} -- write tables to disk as soon as they are put.
+                           (default: {False})
+    """
+
+    def __init__(self, proc_dir, autosave=False):
+        self.proc_dir = proc_dir
+        self.autosave = autosave
+        self.tables = {}
+        self.paths = {}
+        self.read_columns = {}
+        self.complete = set()
+        self.unsaved = set()
+
+    @classmethod
+    def use(cls, proc_dir, session=None):
+        """Returns session if given, else a new autosaving session for proc_dir."""
+        if session is None:
+            return cls(proc_dir, autosave=True)
+        return session
+
+    def find(self, name, filt=None):
+        """Returns the path of a table on disk or None if not found.
+
+        Arguments:
+            name {str} -- table name e.g. 'RAW_HKTM'.
+
+        Keyword Arguments:
+            filt {str} -- Find_Files wildcard to use instead of
+                          find_product for the name. (default: {None})
+        """
+
+        if name not in self.paths:
+            if filt:
+                found = pancam_fns.Find_Files(
+                    self.proc_dir, filt, SingleFile=True)
+            else:
+                found = pancam_fns.find_product(self.proc_dir, name)
+            if not found:
+                return None
+            self.paths[name] = found[0]
+        return self.paths[name]
+
+    def get(self, name, columns=None, filt=None):
+        """Returns a table, loading it from disk if not yet in memory.
+
+        Column products only have the requested columns read, the rest are
+        read if later requested. The table returned is a shallow copy so
+        columns added to it are not added to the session, its values are
+        those held by the session and are not to be changed in place.
+
+        Arguments:
+            name {str} -- table name e.g. 'RAW_HKTM'.
+
+        Keyword Arguments:
+            columns {list} -- columns wanted, all if None. Those not in the
+                              table are ignored. (default: {None})
+            filt {str} -- Find_Files wildcard, as find. (default: {None})
+
+        Returns:
+            pd.DataFrame -- the table, or None if not found.
+        """
+
+        table = self.tables.get(name)
+
+        if name not in self.complete:
+            path = self.find(name, filt)
+            if path is None:
+                if table is None:
+                    return None
+
+            elif (columns is None) or (path.suffix != '.cols'):
+                table = pancam_fns.read_product(path)
+                self.complete.add(name)
+
+            else:
+                tried = self.read_columns.setdefault(name, set())
+                missing = [col for col in columns if col not in tried]
+                if missing:
+                    loaded = pancam_fns.read_product(path, missing)
+                    table = loaded if table is None else table.join(loaded)
+                    tried.update(missing)
+
+            self.tables[name] = table
+
+        if columns is None:
+            return table.copy(deep=False)
+        return table[[col for col in columns if col in table.columns]].copy(deep=False)
+
+    def put(self, name, table, path):
+        """Adds a table to the session to be written to path when saved.
+
+        Arguments:
+            name {str} -- table name e.g. 'RAW_HKTM'.
+            table {pd.DataFrame} -- the table.
+            path {Path} -- file to write, as write_columns if a '.cols'
+                           directory else a pickle.
+        """
+
+        self.tables[name] = table
+        self.paths[name] = path
+        self.complete.add(name)
+        self.unsaved.add(name)
+
+        if self.autosave:
+            self.save([name])
+
+    def save(self, names=None):
+        """Writes tables put into the session that have not yet been written.
+
+        Keyword Arguments:
+            names {list} -- tables to write, all if None. (default: {None})
+        """
+
+        for name in sorted(self.unsaved):
+            if (names is not None) and (name not in names):
+                continue
+
+            path = self.paths[name]
+            if path.suffix == '.cols':
+                # Replaces the older pickle of the same product
+                pancam_fns.exist_unlink(path.with_suffix('.pickle'))
+                pancam_fns.write_columns(self.tables[name], path)
+            else:
+                self.tables[name].to_pickle(path)
+            logger.info("Session table %s written to %s", name, path.name)
+            self.unsaved.discard(name)
+
+    def clear(self):
+        """Drops the tables held so they are read from disk again when next used.
+
+        Tables not yet saved are written first.
+        """
+
+        self.save()
+        self.tables = {}
+        self.paths = {}
+        self.read_columns = {}
+        self.complete = set()
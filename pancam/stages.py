@@ -0,0 +1,324 @@
+# -*- coding: utf-8 -*-
+"""Runs the processing stages of a PROC directory as a dependency graph.
+
+Each stage declares the products it reads and writes as glob patterns within
+the PROC directory, a stage depends on every stage that writes one of its
+inputs. Stages whose dependencies have completed are run concurrently on a
+process pool. A stage is skipped if its outputs exist and its inputs are
+unchanged since it last ran, as recorded in PROC/MANIFEST. Once all stages
+have finished the critical path, the chain of dependent stages that set the
+total run time, is reported.
+
+:copyright: (c) 2020 by Barry J Whiteside. Mullard Space Science Laboratory - UCL
+
+:license: GPLv3, see LICENSE for more details.
+"""
+
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from fnmatch import fnmatch
+import logging
+import os
+import time
+
+import hk_cal
+import hk_raw
+import image_browse
+import manifest
+import pancam_fns
+import plotter
+import tc_cal
+
+logger = logging.getLogger(__name__)
+status = logging.getLogger('status')
+
+# inputs and outputs are glob patterns relative to the PROC directory
+Stage = namedtuple('Stage', ['name', 'func', 'args', 'inputs', 'outputs'])
+
+
+class StageError(Exception):
+    """error for unexpected things"""
+    pass
+
+
+def secondary_stages(proc_dir, source, model=None, ptu_exists=False, plot_workers=None):
+    """Returns the stages run on a PROC directory once the source has been extracted.
+
+    Arguments:
+        proc_dir {Path} -- the PROC directory.
+        source {str} -- the source type e.g. 'Rover'.
+
+    Keyword Arguments:
+        model {str} -- the rover model if known. (default: {None})
+        ptu_exists {bool} -- if ptu pickles were generated. (default: {False})
+        plot_workers {int} -- process pool size plots are rendered on.
+                              (default: {cpu count})
+
+    Returns:
+        list -- of Stage.
+    """
+
+    return [
+        Stage('hk_raw', hk_raw.decode, (proc_dir, source, model),
+              ['*Unproc_HKTM.*'], ['RAW_HKTM.cols']),
+        Stage('image_browse', image_browse.Img_RAW_Browse,
+              (proc_dir, source, model, ptu_exists),
+              ['IMG_RAW/*.pci_raw', 'IMG_RAW/*.JSON', 'ptu_*.pickle'],
+              ['IMG_Browse', 'IMG_Analysis']),
+        Stage('hk_cal', hk_cal.cal_HK, (proc_dir,),
+              ['RAW_HKTM.cols'], ['Cal_HKTM.cols']),
+        Stage('tc_cal', tc_cal.decode_all, (proc_dir,),
+              ['Unproc_TC.pickle'], ['Cal_TC.pickle']),
+        Stage('plots', plotter.all_plots, (proc_dir, plot_workers),
+              ['RAW_HKTM.cols', 'Cal_HKTM.cols', '*Unproc_TC.pickle',
+               '*Cal_TC.pickle', '*RoverStatus.pickle', '*RoverTemps.pickle',
+               '*psu.pickle', 'ptu_*.pickle'],
+              [plotter.HK_Plot_Location]),
+    ]
+
+
+def dependencies(stages):
+    """Returns the names of the stages each stage depends on.
+
+    Arguments:
+        stages {list} -- of Stage.
+
+    Returns:
+        dict -- stage name to set of stage names writing one of its inputs.
+    """
+
+    deps = {}
+    for stage in stages:
+        deps[stage.name] = {other.name for other in stages
+                            if (other is not stage) and any(
+                                fnmatch(out, inp)
+                                for out in other.outputs for inp in stage.inputs)}
+    return deps
+
+
+def critical_path(stages, deps, durations):
+    """Returns the chain of dependent stages with the longest total duration.
+
+    Arguments:
+        stages {list} -- of Stage in a valid run order.
+        deps {dict} -- as returned by dependencies.
+        durations {dict} -- stage name to run time in seconds.
+
+    Returns:
+        list -- stage names along the critical path.
+        float -- total duration of the path in seconds.
+    """
+
+    finish = {}
+    previous = {}
+    for stage in stages:
+        before = max(deps[stage.name], key=lambda name: finish[name],
+                     default=None)
+        previous[stage.name] = before
+        finish[stage.name] = durations.get(stage.name, 0) \
+            + (finish[before] if before else 0)
+
+    name = max(finish, key=finish.get)
+    total = finish[name]
+    path = []
+    while name:
+        path.insert(0, name)
+        name = previous[name]
+    return path, total
+
+
+def order(stages, deps):
+    """Returns the stages sorted so every stage follows its dependencies."""
+
+    ordered = []
+    remaining = list(stages)
+    while remaining:
+        ready = [s for s in remaining
+                 if deps[s.name] <= {done.name for done in ordered}]
+        if not ready:
+            raise StageError("Stage dependencies form a cycle: "
+                             + ", ".join(s.name for s in remaining))
+        ordered += ready
+        remaining = [s for s in remaining if s not in ready]
+    return ordered
+
+
+def stage_inputs(stage, proc_dir):
+    """Returns the files currently matching the input patterns of stage."""
+
+    found = set()
+    for pattern in stage.inputs:
+        found.update(proc_dir.glob(pattern))
+    return sorted(found)
+
+
+def stage_manifest(stage, proc_dir):
+    """Returns the manifest of a stage and the params recorded with it."""
+    return (manifest.Manifest(proc_dir, "stage_" + stage.name),
+            [str(arg) for arg in stage.args])
+
+
+def is_up_to_date(stage, proc_dir):
+    """True if the outputs of stage exist and its inputs are unchanged."""
+
+    if not all(any(proc_dir.glob(out)) for out in stage.outputs):
+        return False
+    stage_man, params = stage_manifest(stage, proc_dir)
+    return stage_man.up_to_date(stage_inputs(stage, proc_dir), params)
+
+
+def record_stage(stage, proc_dir):
+    """Records the current inputs and outputs of a completed stage."""
+
+    stage_man, params = stage_manifest(stage, proc_dir)
+    outputs = [f for out in stage.outputs for f in proc_dir.glob(out)]
+    stage_man.clear()
+    for cur_input in stage_inputs(stage, proc_dir):
+        stage_man.record(cur_input, outputs, params)
+    stage_man.save()
+
+
+def _init_worker(proc_dir):
+    """Ensures a pool worker logs to the console and the processing.log."""
+
+    root = logging.getLogger()
+    if not root.handlers:
+        pancam_fns.setup_logging()
+    if not any(isinstance(h, logging.FileHandler) for h in root.handlers):
+        pancam_fns.setup_proc_logging(root, proc_dir)
+
+
+def _run_stage(stage, sess=None):
+    """Runs a single stage returning its duration in seconds.
+
+    With a session the stage shares its tables, the tables it puts are
+    written once it returns as the manifests and any stages run in other
+    processes read them from disk. Without one, as on the pool, the stage
+    writes each table as it is put.
+    """
+
+    start = time.perf_counter()
+    if sess is None:
+        stage.func(*stage.args)
+    else:
+        stage.func(*stage.args, sess=sess)
+        sess.save()
+    return time.perf_counter() - start
+
+
+def run_stages(stages, proc_dir, workers=None, sess=None):
+    """Runs stages in dependency order, independent stages concurrently.
+
+    A stage that raises is logged and the stages depending on it are not
+    run, the remaining stages still are.
+
+    Arguments:
+        stages {list} -- of Stage.
+        proc_dir {Path} -- the PROC directory the stages work in.
+
+    Keyword Arguments:
+        workers {int} -- size of the process pool, stages are run in this
+                         process one at a time if 1. (default: {cpu count})
+        sess {Session} -- session shared by stages run in this process. With
+                          a pool it is saved before the stages start, they
+                          read and write the products on disk, and cleared
+                          once they finish. (default: {None})
+
+    Returns:
+        dict -- stage name to 'completed', 'skipped', 'failed' or 'blocked'.
+    """
+
+    deps = dependencies(stages)
+    stages = order(stages, deps)
+    if workers is None:
+        workers = min(len(stages), os.cpu_count() or 1)
+
+    result = {}
+    durations = {}
+    start = time.perf_counter()
+
+    def ready():
+        """Stages not yet started whose dependencies have all finished."""
+        return [s for s in stages if (s.name not in result)
+                and all(result.get(d) in ('completed', 'skipped')
+                        for d in deps[s.name])]
+
+    def block_failed():
+        """Marks stages depending on a failed stage as not runnable."""
+        for s in stages:
+            if (s.name not in result) and any(result.get(d) in ('failed', 'blocked')
+                                              for d in deps[s.name]):
+                logger.error("Stage %s not run as a dependency failed", s.name)
+                result[s.name] = 'blocked'
+
+    def skip(stage):
+        """Marks stage skipped if it has no inputs or is up to date."""
+        if not stage_inputs(stage, proc_dir):
+            logger.info("Stage %s has no inputs - skipping", stage.name)
+            result[stage.name] = 'skipped'
+            durations[stage.name] = 0.0
+            return True
+        if is_up_to_date(stage, proc_dir):
+            logger.info("Stage %s up to date - skipping", stage.name)
+            result[stage.name] = 'skipped'
+            durations[stage.name] = 0.0
+            return True
+        status.info("Running stage %s", stage.name)
+        return False
+
+    def finish(stage, run):
+        """Calls run for the stage duration and records the outcome."""
+        try:
+            durations[stage.name] = run()
+        except Exception:
+            logger.exception("Stage %s failed", stage.name)
+            result[stage.name] = 'failed'
+            block_failed()
+            return
+        record_stage(stage, proc_dir)
+        result[stage.name] = 'completed'
+        logger.info("Stage %s completed in %.1f s",
+                    stage.name, durations[stage.name])
+
+    if workers == 1:
+        for stage in stages:
+            if (stage.name not in result) and not skip(stage):
+                finish(stage, lambda: _run_stage(stage, sess))
+
+    else:
+        # Stages on the pool are not given the session, they read its
+        # tables from disk and write theirs as they are put
+        if sess is not None:
+            sess.save()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(proc_dir,)) as pool:
+            running = {}
+            while True:
+                # Skipping a stage can make others ready so check again
+                to_start = [s for s in ready() if s not in running.values()]
+                while to_start:
+                    stage = to_start.pop(0)
+                    if skip(stage):
+                        to_start = [s for s in ready()
+                                    if s not in running.values()]
+                    else:
+                        running[pool.submit(_run_stage, stage)] = stage
+                        to_start = [s for s in to_start
+                                    if s not in running.values()]
+
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    finish(running.pop(future), future.result)
+
+        # Stages in the pool may have replaced products held in the session
+        if sess is not None:
+            sess.clear()
+
+    path, path_time = critical_path(stages, deps, durations)
+    status.info("Stages completed in %.1f s, critical path %.1f s: %s",
+                time.perf_counter() - start, path_time,
+                " -> ".join(f"{name} ({durations.get(name, 0):.1f} s)"
+                            for name in path))
+    return result
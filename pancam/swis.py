@@ -9,6 +9,8 @@ PanCam Data Processing Tools
 Created 12 Dec 2019.
 """
 
+import multiprocessing
+import numpy as np
 import pandas as pd
 from pathlib import Path
 import logging
@@ -16,11 +18,18 @@ import csv
 import re
 import json
 import filecmp
+import os
+import tempfile
+import time
 from bitstruct import unpack_from as upf
-from shutil import copyfile
+from shutil import copyfile, copyfileobj
+from contextlib import ExitStack
+from concurrent.futures import ProcessPoolExecutor
 
 import pancam_fns
 import hs
+import stages
+import session
 
 logger = logging.getLogger(__name__)
 status = logging.getLogger('status')
@@ -28,6 +37,56 @@ status = logging.getLogger('status')
 # Global parameters
 swisProcVer = {'swisProcVer': 1.0}
 
+# H&S lines of the SWIS log, read HS_BLOCK bytes at a time, are those with
+# HS_LINE and HS_BYTES. Each is converted by HS_REPLACE in order, then tokens
+# between spaces shorter than 2 characters are zero filled, as by str.zfill,
+# and the spaces removed giving a 'time;hex' entry of HS_ENTRY_LEN.
+HS_BLOCK = 1 << 24
+HS_LINE = b'HS response'
+HS_BYTES = b'message with 45 bytes'
+HS_REPLACE = ((b"Timestamp: ", b""),
+              (b" - [Informative]HS response message with 45 bytes and content ", b"; "),
+              (b"-0x", b" "),
+              (b"0x", b""))
+HS_SIGNS = np.frombuffer(b'+-', np.uint8)
+HS_ENTRY_LEN = 128
+HS_SKIPPED_MAX = 15
+
+# Value of each hex character, 0xFF if not one
+HS_HEX_VALUES = np.full(256, 0xFF, dtype=np.uint8)
+for _value, _char in enumerate(b'0123456789abcdef'):
+    HS_HEX_VALUES[_char] = HS_HEX_VALUES[bytes([_char]).upper()[0]] = _value
+
+# Rows of the NSVF Router_A_packet.log, read NSVF_BLOCK bytes at a time and
+# split across a pool in chunks of NSVF_CHUNK bytes. Rows to the PanCam
+# logical address are assigned to a stream by size, its text file and packet
+# store given by NSVF_STREAMS. Only H+S has a store, read by the hs module.
+NSVF_BLOCK = 1 << 24
+NSVF_CHUNK = 1 << 26
+NSVF_EOL = re.compile(rb'[\r\n]')
+NSVF_EOP = b' [EOP]'
+NSVF_HEAD = re.compile(rb'([^ ]*) ([^ ]*) ([^ ]*) [^ ]* ')
+NSVF_IN = re.compile(rb'\[IN=[0-9]+\]')
+NSVF_SZ = re.compile(rb'\[SZ=([0-9]+)\]')
+NSVF_ADDR = re.compile(rb'(?:[^ ]* ){4}([0-9A-Fa-f]+) ')
+NSVF_PC_ADDR = 0x41
+NSVF_SIZES = {45: 'hs', 8: 'tc', 85: 'hk', 101: 'hk'}
+NSVF_STREAMS = {'hs': ('H+S.txt', 'hs_raw.pickle'),
+                'hk': ('nsvfHK.txt', None),
+                'tc': ('TC_Responses.txt', None),
+                'sc': ('Sci.txt', None)}
+
+# Potential TCs of the packet log are rows in from port 8 of at least
+# NSVF_TC_MIN tokens, the spacewire header and 5 bytes. The data of an RMAP
+# command follows its header, the first TC_DATA_COLS bytes are decoded and
+# BID gives the ACTION, the trailing space as in the other TC sources.
+NSVF_TC_HEAD = re.compile(rb'([^ ]*) \[IN=08\] (?:[^ ]* ){8}([^ ]*) ')
+NSVF_TC_MIN = 32
+RMAP_HEADER_LEN = 16
+TC_DATA_COLS = 11
+TC_ACTIONS = {0: 'STIME ', 1: 'CE ', 2: 'PE ', 6: 'FWL ', 11: 'ICON ',
+              64: 'WACL ', 128: 'WACR ', 192: 'HRC '}
+
 
 def hk_extract(swis_dir):
     """Generates a Unproc_HKTM.pickle from the given SWIS source
@@ -97,7 +156,8 @@ def hk_extract(swis_dir):
             dl['Unix_Time'] = dtab[0].apply(lambda x: x[11:-12])
             cur_dir = swis_dir / "PROC"
 
-        dl.to_pickle(cur_dir / "Unproc_HKTM.pickle")
+        pancam_fns.write_unproc(dl.drop(columns=['SPW_RAW', 'RAW']), dl['RAW'],
+                                cur_dir / "Unproc_HKTM.pickle")
 
 
 def hs_extract(swis_dir):
@@ -107,12 +167,9 @@ def hs_extract(swis_dir):
         swis_dir {Path} -- Dir containing .txt files with simulation data
 
     Generates:
-        _HS.txt -- Simply contains the extracted relevant H&S lines from the log.
-        hs_raw.pickle -- Pickle file in ['Time', 'RAW'] format for hs module.
+        hs_raw.pickle -- Unproc pickle and .bin in ['Time', RAW] format for hs module.
     """
 
-    # Searches through the typescript output .txt file and recreates a simple H&S.txt file
-
     logger.info("Processing SWIS H&S")
 
     files_txt = pancam_fns.Find_Files(swis_dir, "*.txt")
@@ -126,55 +183,197 @@ def hs_extract(swis_dir):
 
     # Read text file for H&S
     for curfile in files_hs:
+        logger.info("Reading %s", curfile.name)
+        times = []
+        lengths = []
+        packets = []
 
-        # New file within new folder
-        write_file = (proc_dir / "HS.log")
-        pancam_fns.exist_unlink(write_file)
-        logger.info("Creating HS.log file")
-        wf = open(write_file, 'w')
-
-        # Scan through text log and save H&S lines
+        # Scan through text log and keep H&S lines
         consec_skipped = 0  # Counter for number of consecutive lines skipped.
-        with open(curfile, 'r') as f:
-            logger.info("Reading %s", curfile.name)
-            line = f.readline()
-            while line != "":
-                if "HS response" in line:
-                    if "message with 45 bytes" in line:
-                        line_red = line.replace("Timestamp: ", "")
-                        line_red = line_red.replace(
-                            " - [Informative]HS response message with 45 bytes and content ", "; ")
-                        line_red = line_red.replace("-0x", " ")
-                        line_red = line_red.replace("0x", "")
-                        line_red = line_red.replace("\n", "").replace("\r", "")
-                        split_line = line_red.split(" ")
-                        new_line = "".join([entry.zfill(2)
-                                            for entry in split_line]) + "\n"
-
-                        if len(new_line) == 129:
-                            wf.write(new_line)
-                            consec_skipped = 0
-                        else:
-                            consec_skipped += 1
-                            if consec_skipped > 15:
-                                logger.error(
-                                    'Skipping lots of HS entries, count: %s', consec_skipped)
-                line = f.readline()
-            wf.close()
-
-        # Convert hs.log to pickle file
-        hs_head = ['Time', 'RAW']
-        hs = pd.read_csv(write_file, sep=';', header=None, names=hs_head)
-        hs.to_pickle(proc_dir / "hs_raw.pickle")
+        for entries in hs_blocks(curfile):
+            valid, block_times, block_lengths, block_packets = hs_decode(entries)
+            consec_skipped = hs_skipped(valid, consec_skipped)
+            times.append(block_times)
+            lengths.append(block_lengths)
+            packets.append(block_packets)
+
+        write_file = proc_dir / "hs_raw.pickle"
+        bin_file = write_file.with_suffix('.bin')
+        pancam_fns.exist_unlink(bin_file)
+        with open(bin_file, 'wb') as wf:
+            for block_packets in packets:
+                wf.write(block_packets.tobytes())
+
+        times = np.concatenate(times) if times else np.zeros(0, dtype=object)
+        hs = pd.DataFrame({'Time': pd.to_numeric(pd.Series(times, dtype=object),
+                                                 errors='ignore')})
+        lengths = np.concatenate(lengths) if lengths else np.zeros(0, dtype=np.int64)
+        pancam_fns.write_unproc_tm(hs, lengths, write_file)
         logger.info("PanCam H+S pickled.")
 
 
-def nsvf_parse(swis_dir):
+def hs_blocks(log_file):
+    """Generates the H&S entries of a SWIS log, a block at a time.
+
+    The log is read in blocks and the 45 byte 'HS response' lines converted
+    together, the time and hex bytes of each joined as 'time;hex'. Each byte
+    given with fewer than 2 hex digits is zero padded and the separators
+    removed, as the entries were formatted when written line by line to
+    HS.log.
+
+    Arguments:
+        log_file {Path} -- the SWIS .txt log.
+
+    Generates:
+        bytes -- new line separated entries of a block, starting and ending
+                 with a new line, HS_ENTRY_LEN characters if complete.
+    """
+
+    with open(log_file, 'rb') as f:
+        tail = b''
+        while True:
+            block = f.read(HS_BLOCK)
+            if block:
+                block, tail = tail + block, b''
+                last = max(block.rfind(b'\n'), block.rfind(b'\r')) + 1
+                block, tail = block[:last], block[last:]
+            elif tail:
+                block, tail = tail, b''
+            else:
+                break
+
+            # Lines may end with \r\n, \r or \n as in a text mode read
+            lines = [line for line in block.splitlines()
+                     if HS_LINE in line and HS_BYTES in line]
+            if not lines:
+                continue
+
+            # Entries are wrapped in new lines so every token is between two
+            # separators
+            entries = b'\n' + b'\n'.join(lines) + b'\n'
+            for old, new in HS_REPLACE:
+                entries = entries.replace(old, new)
+            yield hs_zero_fill(entries)
+
+
+def hs_decode(entries):
+    """Decodes the complete 'time;hex' entries of a block from hs_blocks.
+
+    An entry is complete if it has HS_ENTRY_LEN characters, a single ';' and
+    an even number of hex digits after it. All are checked at once as rows
+    of a matrix and the hex of those with the same time length converted
+    together.
+
+    Arguments:
+        entries {bytes} -- new line separated entries, starting and ending
+                           with a new line.
+
+    Returns:
+        np.ndarray -- boolean of each entry, True if complete.
+        np.ndarray -- str time of each complete entry.
+        np.ndarray -- length in bytes of each complete entry.
+        np.ndarray -- uint8 bytes of the complete entries back to back.
+    """
+
+    data = np.frombuffer(entries, np.uint8)
+    seps = np.flatnonzero(data == ord('\n'))
+    starts = seps[:-1] + 1
+    full = np.flatnonzero(np.diff(seps) - 1 == HS_ENTRY_LEN)
+
+    rows = data[starts[full, None] + np.arange(HS_ENTRY_LEN)]
+    is_semi = rows == ord(';')
+    semi = is_semi.argmax(axis=1)
+    hex_len = HS_ENTRY_LEN - 1 - semi
+    is_hex = HS_HEX_VALUES[rows] != 0xFF
+    after_semi = np.arange(HS_ENTRY_LEN) > semi[:, None]
+    ok = ((is_semi.sum(axis=1) == 1) & (hex_len > 0) & (hex_len % 2 == 0)
+          & (is_hex | ~after_semi).all(axis=1))
+
+    valid = np.zeros(len(starts), dtype=bool)
+    valid[full[ok]] = True
+    rows, semi = rows[ok], semi[ok]
+
+    lengths = (HS_ENTRY_LEN - 1 - semi) // 2
+    offsets = lengths.cumsum() - lengths
+    times = np.empty(len(rows), dtype=object)
+    packets = np.empty(lengths.sum(), dtype=np.uint8)
+    for pos in np.unique(semi):
+        group = np.flatnonzero(semi == pos)
+        times[group] = np.ascontiguousarray(rows[group, :pos]).view(
+            f'S{pos}').ravel().astype(str) if pos else ''
+        values = HS_HEX_VALUES[rows[group, pos + 1:]]
+        length = (HS_ENTRY_LEN - 1 - pos) // 2
+        packets[offsets[group, None] + np.arange(length)] = \
+            (values[:, ::2] << 4) | values[:, 1::2]
+
+    return valid, times, lengths.astype(np.int64), packets
+
+
+def hs_skipped(valid, consec_skipped):
+    """Logs runs of more than HS_SKIPPED_MAX incomplete H&S entries.
+
+    Arguments:
+        valid {np.ndarray} -- boolean of each entry, True if complete.
+        consec_skipped {int} -- incomplete entries ending the previous block.
+
+    Returns:
+        int -- incomplete entries ending this block.
+    """
+
+    # Count of each entry since the last complete one
+    num = np.arange(len(valid))
+    last_valid = np.maximum.accumulate(np.where(valid, num, -1))
+    count = num - last_valid + np.where(last_valid < 0, consec_skipped, 0)
+    count[valid] = 0
+
+    for skipped in count[count > HS_SKIPPED_MAX]:
+        logger.error('Skipping lots of HS entries, count: %s', skipped)
+
+    return int(count[-1]) if len(count) else consec_skipped
+
+
+def hs_zero_fill(entries):
+    """Returns entries with each token zero filled to 2 characters and the spaces removed.
+
+    Tokens are separated by spaces and new lines, a single '+' or '-' is
+    filled after the sign as by str.zfill.
+
+    Arguments:
+        entries {bytes} -- new line separated entries, starting and ending
+                           with a new line.
+
+    Returns:
+        bytes -- the filled entries.
+    """
+
+    data = np.frombuffer(entries, np.uint8)
+    seps = np.flatnonzero((data == ord(' ')) | (data == ord('\n')))
+    starts = seps[:-1] + 1
+    token_len = np.diff(seps) - 1
+
+    single = token_len == 1
+    sign = single & np.isin(data[starts], HS_SIGNS)
+    fill = np.concatenate([np.repeat(starts[token_len == 0], 2),
+                           starts[single & ~sign],
+                           starts[sign] + 1])
+    data = np.insert(data, np.sort(fill), ord('0'))
+    return data[data != ord(' ')].tobytes()
+
+
+def nsvf_parse(swis_dir, workers=None):
     """Searches through the NSVF generated packet_log and generates new files from any found PanCam telemetry.
 
+    Rows sent to the PanCam logical address are split into streams by their
+    size, see nsvf_split. A log larger than NSVF_CHUNK is split in line
+    aligned chunks across a process pool and the parts joined in order.
+
     Arguments:
         swis_dir {Path} -- Path of directory to file to search for Router_A_packet.log.
 
+    Keyword Arguments:
+        workers {int} -- size of the process pool, the log is read in this
+                         process if 1. (default: {cpu count})
+
     Returns:
         Boolean -- True if process runs else False
 
@@ -184,18 +383,9 @@ def nsvf_parse(swis_dir):
         Sci.txt -- ASCII file of the PanCam Sci telemetry.
         TC_Responses.txt  -- ASCII file of the PanCam TC responses.
 
-        hs.pickle -- Pandas pickle file of H+S in the standard format for this tool.
+        hs_raw.pickle -- H+S packets in the Unproc format for the hs module.
     """
 
-    # Function Constants
-    # Regular expressions for log format
-    in_re = re.compile(r"^\[IN=[0-9]+\]$")
-    sz_re = re.compile(r"^\[SZ=[0-9]+\]$")
-
-    # PanCam logical address
-    pc_log_addr = 0x41
-    pc_hs_rowlen = 45
-
     logger.info("Processing SWIS NSVF log")
 
     logger.info("Searching for Router_A_packet.log file")
@@ -212,94 +402,271 @@ def nsvf_parse(swis_dir):
     if not proc_dir.is_dir():
         proc_dir.mkdir()
 
-    # Next prepare files to be written
-    file = {}
-    f_acc = {}
-    f_wri = {}
+    # Text file and packet store, if any, of each stream
+    files = {}
+    for stream, (text_name, store_name) in NSVF_STREAMS.items():
+        bin_file = (proc_dir / store_name).with_suffix('.bin') if store_name else None
+        files[stream] = (proc_dir / text_name, bin_file)
+        for file in files[stream]:
+            if file:
+                pancam_fns.exist_unlink(file)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    # Daemonic pool workers cannot start a pool of their own
+    if multiprocessing.current_process().daemon:
+        workers = 1
+
+    logger.info("Reading file %s", packet_log.name)
+    if workers == 1:
+        chunks = [(0, packet_log.stat().st_size)]
+    else:
+        chunks = nsvf_chunks(packet_log, NSVF_CHUNK)
+    workers = max(1, min(workers, len(chunks)))
 
-    file['hs'] = proc_dir / 'H+S.txt'
-    file['hk'] = proc_dir / 'nsvfHK.txt'
-    file['tc'] = proc_dir / 'TC_Responses.txt'
-    file['sc'] = proc_dir / 'Sci.txt'
+    if workers == 1:
+        found = [nsvf_split(packet_log, start, end, files)
+                 for start, end in chunks]
+    else:
+        found = nsvf_split_parallel(packet_log, chunks, files, proc_dir, workers)
 
-    for key, value in file.items():
-        pancam_fns.exist_unlink(value)
-        f_acc[key] = open(value, 'w')
-        f_wri[key] = csv.writer(f_acc[key], delimiter=' ',
-                                lineterminator='\r')
+    # Packet stores of the found times and lengths
+    for stream, (_, store_name) in NSVF_STREAMS.items():
+        times = [time for part in found for time in part[stream][0]]
+        logger.info("%d %s packets found", len(times), stream)
+        if not store_name:
+            continue
+        lengths = np.concatenate([part[stream][1] for part in found])
+        tm = pd.DataFrame({'Time': pd.to_numeric(pd.Series(times, dtype=object),
+                                                 errors='ignore')})
+        pancam_fns.write_unproc_tm(tm, lengths, proc_dir / store_name)
+    logger.info("PanCam H+S pickled.")
 
-    # Open file and check format is as expcted
-    # Contains ..[IN=..].. and ..[SZ=..].., ..[EOP] at the end of each line
+    # Rename HK file with Unix time
+    hk_time = hk_nsvf_epoch(swis_dir)
+    hk_unix = proc_dir / ("nsvfHK_Unix" + hk_time + ".txt")
+    pancam_fns.exist_unlink(hk_unix)
+    logger.info("Renaming HK file to %s", hk_unix.name)
+    files['hk'][0].rename(hk_unix)
 
-    with open(packet_log, 'r') as logfile:
-        reader = csv.reader(logfile, delimiter=' ')
-        logger.info("Reading file %s", packet_log.name)
-        for row in reader:
-            # First check that row ends in [EOP]
-            if row[-1] != '[EOP]':
-                logger.error("Row does not end in '[EOP]': %s", row)
-                continue
+    logger.info("--Parsing SWIS NSVF log completed.")
 
-            # Verify row contains [IN=..] in correct position
-            if not in_re.match(row[1]):
-                logger.error("Row no match for '[IN..]': %s", row)
-                continue
+    return True
 
-            # Verify row contains [SZ=..] in correct position
-            if not sz_re.match(row[2]):
-                logger.error("Row no match for '[SZ..]': %s", row)
-                continue
 
-            # Verify row size matches that stated in [SZ=..]
-            row_size = int(row[2][4:-1])
-            if row_size != len(row[4:-1]):
-                logger.error(
-                    "Row row does not match expected length %d bytes: %s", row_size, row)
-                continue
+def nsvf_chunks(log_file, chunk_size):
+    """Returns line aligned byte ranges of about chunk_size covering a log.
+
+    Arguments:
+        log_file {Path} -- the log file.
+        chunk_size {int} -- minimum bytes in each range but the last.
+
+    Returns:
+        list -- of (start, end) byte offsets.
+    """
+
+    size = log_file.stat().st_size
+    chunks = []
+    start = 0
+    with open(log_file, 'rb') as f:
+        while start < size:
+            end = start + chunk_size
+            f.seek(end)
+            while end < size:
+                block = f.read(NSVF_BLOCK)
+                if not block:
+                    end = size
+                    break
+                line_end = NSVF_EOL.search(block)
+                if line_end:
+                    end += line_end.end()
+                    break
+                end += len(block)
+            end = min(end, size)
+            chunks.append((start, end))
+            start = end
+    return chunks
+
+
+def nsvf_blocks(log_file, start, end):
+    """Generates blocks of whole lines from a byte range of a log.
+
+    Arguments:
+        log_file {Path} -- the log file.
+        start {int} -- byte offset of the first line.
+        end {int} -- byte offset the range ends at.
+
+    Generates:
+        bytes -- up to NSVF_BLOCK bytes of lines, longer lines whole.
+    """
+
+    with open(log_file, 'rb') as f:
+        f.seek(start)
+        remaining = end - start
+        tail = b''
+        while True:
+            data = f.read(min(NSVF_BLOCK, remaining)) if remaining else b''
+            remaining = (remaining - len(data)) if data else 0
+            block, tail = tail + data, b''
+            if remaining:
+                last = max(block.rfind(b'\n'), block.rfind(b'\r')) + 1
+                block, tail = block[:last], block[last:]
+            yield block
+            if not remaining:
+                break
+
+
+def nsvf_split(log_file, start, end, files):
+    """Splits the PanCam rows of a byte range of Router_A_packet.log into streams.
+
+    Each row is '<time> [IN=..] [SZ=n] : <n hex bytes> [EOP]', those sent to
+    NSVF_PC_ADDR are assigned to the stream of their size in NSVF_SIZES, else
+    'sc'. Rows are copied to the text file of their stream, H+S rows
+    reduced to '<time>; <hex bytes>', and their bytes written to its binary
+    store if it has one. Rows not in this format are logged and skipped.
+
+    Arguments:
+        log_file {Path} -- the Router_A_packet.log.
+        start {int} -- byte offset of the first line.
+        end {int} -- byte offset the range ends at.
+        files {dict} -- stream to the text file and .bin file, or None, written.
+
+    Returns:
+        dict -- stream to the list of packet times and np.ndarray of packet lengths.
+    """
 
-            # Filter by Logical address
-            log_addr = int(row[8], 16)
+    times = {stream: [] for stream in files}
+    lengths = {stream: [] for stream in files}
 
-            if log_addr == pc_log_addr:
-                # Assume 45 byte lines are H+S
-                if row_size == pc_hs_rowlen:
-                    row_red = row
-                    row_red[1:4] = []
-                    row_red[-1:] = []
-                    row_red[0] += ';'
-                    f_wri['hs'].writerow(row_red)
+    with ExitStack() as stack:
+        text_files = {}
+        bin_files = {}
+        for stream, (text_file, bin_file) in files.items():
+            text_files[stream] = stack.enter_context(open(text_file, 'wb'))
+            if bin_file:
+                bin_files[stream] = stack.enter_context(open(bin_file, 'wb'))
 
-                # If 8 byte line assume TC
-                elif row_size == 8:
-                    f_wri['tc'].writerow(row)
+        for block in nsvf_blocks(log_file, start, end):
+            texts = {stream: [] for stream in files}
+            packets = {stream: [] for stream in files}
 
-                # If 85 or 101 byte line assume HK
-                elif (row_size == 85) | (row_size == 101):
-                    f_wri['hk'].writerow(row)
+            for line in block.splitlines():
+                if not line:
+                    continue
+
+                # First check that row ends in [EOP]
+                if not line.endswith(NSVF_EOP):
+                    logger.error(
+                        "Row does not end in '[EOP]': %s", line.decode(errors='replace'))
+                    continue
+
+                # Verify row contains [IN=..] and [SZ=..] in correct position
+                head = NSVF_HEAD.match(line)
+                if (not head) or (not NSVF_IN.fullmatch(head[2])):
+                    logger.error(
+                        "Row no match for '[IN..]': %s", line.decode(errors='replace'))
+                    continue
+
+                row_size = NSVF_SZ.fullmatch(head[3])
+                if not row_size:
+                    logger.error(
+                        "Row no match for '[SZ..]': %s", line.decode(errors='replace'))
+                    continue
 
-                # Else assume Sci
+                # Verify row size matches that stated in [SZ=..], each byte
+                # is followed by a space
+                row_size = int(row_size[1])
+                if line.count(b' ', head.end()) != row_size:
+                    logger.error(
+                        "Row row does not match expected length %d bytes: %s",
+                        row_size, line.decode(errors='replace'))
+                    continue
+
+                # Filter by Logical address
+                log_addr = NSVF_ADDR.match(line, head.end())
+                if (not log_addr) or (int(log_addr[1], 16) != NSVF_PC_ADDR):
+                    continue
+
+                content = line[head.end():len(line) - len(NSVF_EOP)]
+                try:
+                    packet = bytes.fromhex(content.decode())
+                except ValueError:
+                    logger.error(
+                        "Row contains bytes not in hex: %s", line.decode(errors='replace'))
+                    continue
+
+                stream = NSVF_SIZES.get(row_size, 'sc')
+                if stream == 'hs':
+                    texts[stream].append(head[1] + b'; ' + content + b'\r')
                 else:
-                    f_wri['sc'].writerow(row)
+                    texts[stream].append(line + b'\r')
+                if stream in bin_files:
+                    packets[stream].append(packet)
+                times[stream].append(head[1].decode())
+                lengths[stream].append(len(packet))
 
-    for key, value in f_acc.items():
-        value.close()
+            for stream in files:
+                text_files[stream].write(b''.join(texts[stream]))
+                if stream in bin_files:
+                    bin_files[stream].write(b''.join(packets[stream]))
 
-    # Create a H&S Pickle File
-    hs_head = ['Time', 'RAW']
-    hs = pd.read_csv(file['hs'], sep=';', header=None, names=hs_head)
-    hs.to_pickle(proc_dir / "hs_raw.pickle")
-    logger.info("PanCam H+S pickled.")
+    return {stream: (times[stream], np.array(lengths[stream], dtype=np.int64))
+            for stream in files}
 
-    # Rename HK file with Unix time
-    hk_time = hk_nsvf_epoch(swis_dir)
-    hk_unix = proc_dir / ("nsvfHK_Unix" + hk_time + ".txt")
-    pancam_fns.exist_unlink(hk_unix)
-    logger.info("Renaming HK file to %s", hk_unix.name)
-    file['hk'].rename(hk_unix)
 
-    logger.info("--Parsing SWIS NSVF log completed.")
+def _init_nsvf_worker():
+    """Ensures a pool worker has the console loggers."""
+    if not logging.getLogger().handlers:
+        pancam_fns.setup_logging()
 
-    return True
+
+def nsvf_split_parallel(log_file, chunks, files, proc_dir, workers):
+    """Splits the chunks of a Router_A_packet.log on a process pool.
+
+    Each chunk is split by nsvf_split into its own part files, these are
+    appended in chunk order to files as their results arrive.
+
+    Arguments:
+        log_file {Path} -- the Router_A_packet.log.
+        chunks {list} -- of (start, end) line aligned byte ranges.
+        files {dict} -- stream to the text file and .bin file, or None, written.
+        proc_dir {Path} -- the PROC directory.
+        workers {int} -- size of the process pool.
+
+    Returns:
+        list -- of the nsvf_split result of each chunk.
+    """
+
+    status.info("Reading %s in %d chunks with %d workers",
+                log_file.name, len(chunks), workers)
+
+    found = []
+    with tempfile.TemporaryDirectory(prefix="nsvf_parts_", dir=proc_dir) as tmp_dir, \
+            ProcessPoolExecutor(max_workers=workers,
+                                initializer=_init_nsvf_worker) as pool, \
+            ExitStack() as stack:
+        parts = [{stream: (Path(tmp_dir) / f"{num:06d}_{stream}.txt",
+                           Path(tmp_dir) / f"{num:06d}_{stream}.bin" if bin_file else None)
+                  for stream, (_, bin_file) in files.items()}
+                 for num in range(len(chunks))]
+        futures = [pool.submit(nsvf_split, log_file, start, end, part_files)
+                   for (start, end), part_files in zip(chunks, parts)]
+
+        outputs = {stream: [stack.enter_context(open(file, 'wb')) if file else None
+                            for file in stream_files]
+                   for stream, stream_files in files.items()}
+
+        for part_files, future in zip(parts, futures):
+            found.append(future.result())
+            for stream, stream_files in part_files.items():
+                for part_file, output in zip(stream_files, outputs[stream]):
+                    if not part_file:
+                        continue
+                    with open(part_file, 'rb') as f:
+                        copyfileobj(f, output)
+                    part_file.unlink()
+
+    return found
 
 
 def nsvf_lb_extract(swis_dir):
@@ -373,6 +740,10 @@ def nsvf_lb_extract(swis_dir):
 def nsvf_tc_extract(swis_dir):
     """Locates sent TCs from the contents of the TC_Responses.txt file.
 
+    Potential TCs of the packet log are indexed by their transaction ID and
+    time prefix, so each response is matched by a single lookup. Those
+    matched are decoded by nsvf_tc_decode.
+
     Arguments:
         swis_dir {Path} -- Path of directory to file to search for Router_A_packet.log
 
@@ -381,6 +752,7 @@ def nsvf_tc_extract(swis_dir):
 
     Generates:
         TC.txt -- ASCII txt file of all TCs sent to PanCam.
+        Unproc_TC.pickle -- The matched TCs in the format for tc_cal.
     """
 
     logger.info('Extracting SWIS NSVF TCs')
@@ -408,51 +780,125 @@ def nsvf_tc_extract(swis_dir):
     if not proc_dir.is_dir():
         proc_dir.mkdir()
 
-    # Create a list of all relevant packets from packet.log
-    tc_list = []
-    with open(file_logbook, 'r') as packets:
-        log_reader = csv.reader(packets, delimiter=' ')
-        logger.info("Extracting potential TCs from packet log %s",
-                    file_logbook.name)
-        for row in log_reader:
-            if row[1] != '[IN=08]':
+    # Index all relevant packets from packet.log by transaction ID and time prefix
+    tc_lines = []
+    tc_index = {}
+    logger.info("Extracting potential TCs from packet log %s",
+                file_logbook.name)
+    for block in nsvf_blocks(file_logbook, 0, file_logbook.stat().st_size):
+        for line in block.splitlines():
+            head = NSVF_TC_HEAD.match(line)
+            if not head:
                 continue
-            if len(row) < 32:  # Minimum PanCam command is Spw header and 5 bytes
+            if line.count(b' ') + 1 < NSVF_TC_MIN:
                 continue
-            tc_list.append(row)
+            tc_index.setdefault((head[2], head[1][:2]), []).append(len(tc_lines))
+            tc_lines.append(line)
 
     # File to write too
     f_tc = proc_dir / 'TC.txt'
-
     pancam_fns.exist_unlink(f_tc)
-    f_acc = open(f_tc, 'w')
-    f_wri = csv.writer(f_acc, delimiter=' ',
-                       lineterminator='\r')
-
-    with open(file_responses, 'r') as resp:
-        reader = csv.reader(resp, delimiter=' ')
-        for tc_resp in reader:
-            trans_id = tc_resp[10]
-            trans_time = tc_resp[0][:2]
-            count = 0
-            for tc in tc_list:
-                if tc[10] != trans_id:
-                    continue
-                if tc[0][:2] != trans_time:
-                    continue
-                count += 1
-                f_wri.writerow(tc)
 
-                if count != 1:
-                    logger.error("Multiple potential TC matches found!")
+    matched = set()
+    with open(file_responses, 'rb') as resp, open(f_tc, 'wb') as f_acc:
+        for tc_resp in resp.read().splitlines():
+            tc_resp = tc_resp.split(b' ')
+            if len(tc_resp) <= 10:
+                continue
+            found = tc_index.get((tc_resp[10], tc_resp[0][:2]), [])
+            if len(found) > 1:
+                logger.error("Multiple potential TC matches found! %d for response %s",
+                             len(found), b' '.join(tc_resp).decode(errors='replace'))
+            f_acc.write(b''.join(tc_lines[num] + b'\r' for num in found))
+            matched.update(found)
+
+    # Unix epoch of the log as given to the HK by nsvf_parse
+    epoch = None
+    hk_files = pancam_fns.Find_Files(proc_dir, 'nsvfHK_Unix*.txt', SingleFile=True)
+    if hk_files:
+        epoch = int(hk_files[0].stem.split('_')[1][4:])
+    else:
+        logger.warning("No nsvfHK_Unix file found - TC times not determined")
 
-    f_acc.close()
+    tc = nsvf_tc_decode([tc_lines[num] for num in sorted(matched)], epoch)
+    if tc.empty:
+        logger.info("PanCam TC Empty. -- Finished")
+    else:
+        tc.to_pickle(proc_dir / "Unproc_TC.pickle")
+        logger.info("PanCam TC pickled.")
 
     logger.info("--Extracting SWIS NSVF TCs completed.")
 
     return
 
 
+def nsvf_tc_decode(tc_lines, epoch=None):
+    """Decodes NSVF packet log TCs into the Unproc_TC format.
+
+    The RMAP header is followed by the data bytes, its length given by the
+    header, the first 11 of which are the columns 0 to 10, NaN where the
+    command is shorter. The time is the elapsed time of the row plus the
+    epoch, as the NSVF HK.
+
+    Arguments:
+        tc_lines {list} -- packet log rows of the TCs, as matched by
+                           NSVF_TC_HEAD.
+
+    Keyword Arguments:
+        epoch {int} -- Unix time of the start of the log in seconds, times
+                       are NaT if None. (default: {None})
+
+    Returns:
+        pd.DataFrame -- with Time, Unix_Time, DT, 0 to 10, BID and ACTION
+                        columns, empty if no TC is decoded.
+    """
+
+    times = []
+    data = np.full((len(tc_lines), TC_DATA_COLS), np.nan)
+
+    for line in tc_lines:
+        head = NSVF_HEAD.match(line)
+        content = line[head.end():]
+        if content.endswith(NSVF_EOP[1:]):
+            content = content[:-len(NSVF_EOP[1:])]
+        try:
+            packet = bytes.fromhex(content.decode())
+        except ValueError:
+            logger.error("TC contains bytes not in hex: %s",
+                         line.decode(errors='replace'))
+            continue
+
+        length = int.from_bytes(packet[12:15], 'big')
+        cmd = packet[RMAP_HEADER_LEN:RMAP_HEADER_LEN + length][:TC_DATA_COLS]
+        data[len(times), :len(cmd)] = np.frombuffer(cmd, dtype=np.uint8)
+        times.append(head[1].decode())
+
+    if not times:
+        return pd.DataFrame()
+
+    tc = pd.DataFrame(data[:len(times)])
+    tc.insert(0, 'Time', times)
+
+    # Elapsed time '[s:ms:us:ns]' in seconds
+    parts = tc['Time'].str[1:-1].str.split(':')
+    elapsed = pd.to_numeric(parts.str[0] + '.' + parts.str[1:].str.join(''),
+                            errors='coerce')
+    if epoch is None:
+        tc['Unix_Time'] = np.nan
+    else:
+        tc['Unix_Time'] = elapsed + epoch
+    tc['DT'] = pd.to_datetime(tc['Unix_Time'], unit='s')
+
+    # Commands with fewer than 2 bytes have no BID
+    first = tc[0]*256 + tc[1]
+    bid = (first.fillna(0).to_numpy(dtype=np.int64) & 0x7F8) >> 3
+    tc['BID'] = pd.Series(bid, index=tc.index, dtype='Int64').where(first.notna())
+    tc['ACTION'] = tc['BID'].map(lambda bid: TC_ACTIONS.get(bid, f"BID {bid} "),
+                                 na_action='ignore')
+
+    return tc
+
+
 def hk_nsvf_epoch(swis_dir):
     """Determines the elsapsed time of the first nsvf hk packet and returns the Unix time.
 
@@ -496,12 +942,13 @@ def hk_nsvf_epoch(swis_dir):
     return epoch_str
 
 
-def sci_extract(swis_dir, nsvf=False):
+def sci_extract(swis_dir, nsvf=False, sess=None):
     """Creates pci_raw files from the generated Sci.txt file. HS must be decoded and verified first
 
     Arguments:
         swis_dir {Path} -- If using NSVF path is within the Proc directory. Otherwise the source path is used.
         nsvf {bool} -- Set to true if from nsvf log (default: {False})
+        sess {Session} -- session holding the decoded hs. (default: {None})
 
     Generates:
         Multiple pci.raw -- For each sci image found
@@ -531,7 +978,7 @@ def sci_extract(swis_dir, nsvf=False):
     # Calculate number of lines in text file and ensure matches expected
     num_pkts = sum(1 for line in open(sci_file))
     num_imgs = num_pkts // 7
-    num_expt = hs.sci_cnt(cur_dir)
+    num_expt = hs.sci_cnt(cur_dir, sess=sess)
     if num_imgs != num_expt:
         logger.error("Missing Sci Parts Detected! %s", sci_file.name)
 
@@ -814,6 +1261,137 @@ def get_instances(swis_dir: Path):
     return [inst for inst in swis_dir.iterdir() if inst.is_dir()]
 
 
+class LevelCounter(logging.Handler):
+    """Logging handler counting the warnings and errors logged."""
+
+    def __init__(self):
+        super().__init__(level=logging.WARNING)
+        self.counts = {'WARNING': 0, 'ERROR': 0}
+
+    def emit(self, record):
+        if record.levelno >= logging.ERROR:
+            self.counts['ERROR'] += 1
+        else:
+            self.counts['WARNING'] += 1
+
+
+def process_instance(inst):
+    """Runs the full processing of a single SWIS instance.
+
+    Whilst running, messages are logged to the processing.log in the
+    instance's PROC folder instead of any other processing.log.
+
+    Arguments:
+        inst {Path} -- the instance folder as returned by create_instances.
+
+    Returns:
+        dict -- summary with the instance 'Name', 'Result', 'Time' in seconds
+                and the number of 'Errors' and 'Warnings' logged.
+    """
+
+    proc_dir = inst / "PROC"
+    if not proc_dir.is_dir():
+        proc_dir.mkdir()
+
+    # Swap the file handler for the instance's own log
+    root = logging.getLogger()
+    old_handlers = [h for h in root.handlers
+                    if isinstance(h, logging.FileHandler)]
+    for handler in old_handlers:
+        root.removeHandler(handler)
+    pancam_fns.setup_proc_logging(root, proc_dir)
+    inst_handler = root.handlers[-1]
+    counter = LevelCounter()
+    root.addHandler(counter)
+
+    summary = {'Name': inst.name, 'Result': 'Completed'}
+    start = time.perf_counter()
+    try:
+        status.info("Analysing %s", inst.name)
+        hk_extract(inst)
+        hs_extract(inst)
+        sess = session.Session(proc_dir)
+        hs.decode(proc_dir, True, sess=sess)
+        hs.verify(inst, sess=sess)
+        sci_extract(inst, sess=sess)
+        sci_compare(inst)
+
+        # Instances are already run in parallel so stages and plots are run
+        # one at a time
+        results = stages.run_stages(
+            stages.secondary_stages(proc_dir, 'SWIS', plot_workers=1),
+            proc_dir, workers=1, sess=sess)
+        sess.save()
+        if any(res in ('failed', 'blocked') for res in results.values()):
+            summary['Result'] = 'Stage failed'
+
+    except Exception:
+        logger.exception("Processing of instance %s failed", inst.name)
+        summary['Result'] = 'Failed'
+
+    finally:
+        summary['Time'] = time.perf_counter() - start
+        summary['Errors'] = counter.counts['ERROR']
+        summary['Warnings'] = counter.counts['WARNING']
+
+        root.removeHandler(counter)
+        root.removeHandler(inst_handler)
+        inst_handler.close()
+        for handler in old_handlers:
+            root.addHandler(handler)
+
+    return summary
+
+
+def _init_instance_worker():
+    """Ensures a pool worker has the console loggers."""
+    if not logging.getLogger().handlers:
+        pancam_fns.setup_logging()
+
+
+def process_instances(instances, workers=None):
+    """Processes SWIS instances across a process pool then reports a summary.
+
+    Instances share no files so each is run by process_instance in its own
+    worker, logging to its own processing.log.
+
+    Arguments:
+        instances {list} -- of instance folders.
+
+    Keyword Arguments:
+        workers {int} -- size of the process pool, instances are processed
+                         one at a time in this process if 1.
+                         (default: {cpu count})
+
+    Returns:
+        list -- of summary dicts as returned by process_instance.
+    """
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(instances)))
+
+    status.info("Processing %d SWIS instances with %d workers",
+                len(instances), workers)
+
+    if workers == 1:
+        summaries = [process_instance(inst) for inst in instances]
+    else:
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=_init_instance_worker) as pool:
+            summaries = list(pool.map(process_instance, instances))
+
+    msg = "SWIS instance summary:\n"
+    for summ in summaries:
+        msg += (f"\t\t{summ['Name']}: {summ['Result']} in {summ['Time']:.1f} s, "
+                f"{summ['Errors']} errors, {summ['Warnings']} warnings\n")
+    failed = sum(summ['Result'] != 'Completed' for summ in summaries)
+    msg += f"\t\t{len(summaries) - failed} of {len(summaries)} instances completed"
+    status.info(msg)
+
+    return summaries
+
+
 if __name__ == "__main__":
     dir = Path(
         input("Type the path to the folder where the SWIS files are stored: "))
@@ -14,6 +14,7 @@ import logging
 import pandas as pd
 
 import pancam_fns
+import session
 
 logger = logging.getLogger(__name__)
 status = logging.getLogger('status')
@@ -47,33 +48,43 @@ hrc_cmd_dict = {0x00: "RST",
                 0xF6: "Enc Inver"}
 
 
-def decode_all(proc_dir):
+def decode_all(proc_dir, sess=None):
     """Decodes all commands into thier specific functions
 
     Arguments:
         proc_dir {Path} -- Path to Unproc_TC.pickle file generated
 
+    Keyword Arguments:
+        sess {Session} -- session keeping the decoded table. (default: {None})
+
     Generates:
         Cal_TC.pickle -- Containing the decoded Cam_Cmd dataframe.
     """
 
     logger.info("Decoding TCs")
 
-    files_tc = pancam_fns.Find_Files(
-        proc_dir, "Unproc_TC.pickle", SingleFile=True)
+    sess = session.Session.use(proc_dir, sess)
+    tc = sess.get('Unproc_TC', filt="Unproc_TC.pickle")
 
-    if not files_tc:
+    if tc is None:
         return
 
-    tc = pd.read_pickle(files_tc[0])
-
     tc = cam_decode(tc)
 
-    tc.to_pickle(proc_dir / "Cal_TC.pickle")
+    sess.put('Cal_TC', tc, proc_dir / "Cal_TC.pickle")
     logger.info("PanCam Decoded TC Pickled.")
     logger.info("--TC Camera Decode Completed")
 
 
+def cmd_byte(column):
+    """Returns the command bytes of a column present in the command.
+
+    Bytes beyond the end of a shorter command are NaN or -1 depending on the
+    source, these rows are dropped so they are given no Cam_Cmd.
+    """
+    return column[column.notna() & (column >= 0)].astype(int)
+
+
 def cam_decode(tc):
     """Decodes the camera specific telecommands
 
@@ -93,13 +104,13 @@ def cam_decode(tc):
 
     if not wac.empty:
         logger.info("WAC Commands Found")
-        wac_cid = wac[5].apply(lambda x: ((x & 0xC0) >> 6))
+        wac_cid = cmd_byte(wac[5]).apply(lambda x: ((x & 0xC0) >> 6))
         wac_cmd = wac_cid.replace(wac_cmd_dict)
         tc['Cam_Cmd'] = wac_cmd
 
     if not hrc.empty:
         logger.info("HRC Commands Found")
-        hrc_cmd = hrc[5].replace(hrc_cmd_dict)
+        hrc_cmd = cmd_byte(hrc[5]).replace(hrc_cmd_dict)
         tc['Cam_Cmd'] = hrc_cmd
 
     if (not wac.empty) and (not hrc.empty):
@@ -0,0 +1,49 @@
+"""Tests of the rover .ha scan, run with pytest from the pancam folder."""
+
+import logging
+import sys
+from pathlib import Path
+
+import bitstruct
+
+sys.path.insert(0, str(Path(__file__).parent))
+import rover_ha  # noqa: E402
+
+
+def ldt_packets(unit_id, file_id, content):
+    """Returns the (packet ID, bytes) of an LDT file sent as first, one middle and end part."""
+
+    header = bytes(16)
+    first = bitstruct.pack('u16u16u8u16u32u8u8', unit_id, 0, 1, file_id, len(content), 0, 0)
+    return [("AB.TM.MRSS0697", header + first + content + bytes(2)),
+            ("AB.TM.MRSS0698", header + bitstruct.pack('u16u16', unit_id, 1) + bytes(2)),
+            ("AB.TM.MRSS0699", header + bitstruct.pack('u16u16', unit_id, 2) + bytes(2))]
+
+
+def write_ha(file, packets):
+    """Writes packets to a .ha file with 32 bytes of hex per line."""
+
+    lines = [f"<HEADER_{num}> x" for num in range(4)] + ["<BEGIN_DATA_BLOCK>"]
+    for pkt_id, pkt in packets:
+        lines += ["<TIME> 2021-01-01", "<SOURCE> ROVER",
+                  "<PACKET_ID> " + pkt_id, "<LENGTH>" + str(len(pkt))]
+        pkt_hex = pkt.hex().upper()
+        lines += [pkt_hex[i:i + 64] for i in range(0, len(pkt_hex), 64)]
+    lines.append("<END_DATA_BLOCK>")
+    file.write_text("\n".join(lines) + "\n")
+
+
+def test_rescan_skipped_after_hk_processed(tmp_path, caplog):
+    # PanCam HK ES LDT not a whole number of packets, renamed as incomplete
+    hkes_id = bitstruct.unpack('u16', bitstruct.pack('u1u4u2u1u8', 0, 5, 1, 0, 3))[0]
+    write_ha(tmp_path / "log_000.ha",
+             ldt_packets(13, hkes_id, bytes(72 * 5 + 10)))
+    (tmp_path / "PROC").mkdir()
+
+    rover_ha.ha_scan(tmp_path, workers=1)
+    rover_ha.hkraw2unproc_pickle(tmp_path / "PROC")
+    assert list((tmp_path / "PROC").glob("*.HKES_raw.incomplete"))
+
+    with caplog.at_level(logging.INFO, logger=rover_ha.logger.name):
+        rover_ha.ha_scan(tmp_path, workers=1)
+    assert "keeping previous scan" in caplog.text